@@ -20,6 +20,22 @@ The toolbox is sorted into the following modules:
 +----------------------------------+----------------------------------------+
 | :py:mod:`~matlab2cpp.rules`      | Translation rules                      |
 +----------------------------------+----------------------------------------+
+| :py:mod:`~matlab2cpp.dispatch`   | Lookup tables for configuration and    |
+|                                  | translation rules                      |
++----------------------------------+----------------------------------------+
+| :py:mod:`~matlab2cpp.stats`      | Time spent in conversion phases and    |
+|                                  | rules                                  |
++----------------------------------+----------------------------------------+
+| :py:mod:`~matlab2cpp.manifest`   | Record of converted files for          |
+|                                  | incremental conversion                 |
++----------------------------------+----------------------------------------+
+| :py:mod:`~matlab2cpp.searchpath` | Index of functions in the search path  |
++----------------------------------+----------------------------------------+
+| :py:mod:`~matlab2cpp.server`     | Long running conversion server         |
++----------------------------------+----------------------------------------+
+| :py:mod:`~matlab2cpp.summaries`  | Datatypes of functions from earlier    |
+|                                  | runs                                   |
++----------------------------------+----------------------------------------+
 | :py:mod:`~matlab2cpp.supplement` | Functions for inserting and extraction |
 |                                  | datatypes                              |
 +----------------------------------+----------------------------------------+
@@ -37,7 +53,7 @@ __version__ = 0.5
 import time
 from datetime import datetime as date
 import os
-from os.path import sep
+from collections import deque
 import imp
 
 import supplement
@@ -48,7 +64,12 @@ import qfunctions
 import collection
 import configure
 import rules
-import manual
+import dispatch
+import stats
+import manifest
+import searchpath
+import summaries
+import server
 
 
 __all__ = ["main"]
@@ -66,111 +87,534 @@ from collection import *
 __all__ += collection.__all__
 
 
-def main(args):
+def load(builder, filename, reset=False):
     """
-Initiate the interpretation and conversion process.
+Load a Matlab file into the builder, including the datatypes, structs and
+includes stored in the supplement file `<filename>.py`.
 
 Args:
-    args (ArgumentParser): arguments parsed through mconvert
+    builder (Builder): Code constructor
+    filename (str): Path to Matlab file
+    reset (bool): Ignore the supplement file
+
+Returns:
+    Node: The loaded program
     """
 
-    builder = tree.builder.Builder(disp=args.disp, comments=args.comments, original=args.original)
+    assert os.path.isfile(filename)
 
-    if os.path.isfile(args.filename):
+    f = open(filename, "rU")
+    code = f.read()
+    f.close()
 
-        paths = [os.path.abspath(os.path.dirname(args.filename))]
+    if os.path.isfile(filename + ".py") and not reset:
 
-        if args.disp:
-            print "building tree..."
+        # a fresh module for every file, such that nothing is left from
+        # earlier loads of the same or other supplement files
+        cfg = imp.new_module("cfg")
+        try:
+            execfile(filename + ".py", cfg.__dict__)
 
-        filenames = [os.path.abspath(args.filename)]
-        stack = []
-        while filenames:
+        except:
+            raise ImportError("""Supplement file:
+    %s.py
+    is formated incorrectly. Change the format or convert with '-r' option to create
+    a new file.""" % filename)
 
-            filename = filenames.pop(0)
-            assert os.path.isfile(filename)
+        if "verbatims" in cfg.__dict__ and cfg.verbatims:
+            verbatims = cfg.verbatims
+            code = supplement.verbatim.set(verbatims, code)
 
-            if filename in stack:
-                continue
+        builder.load(filename, code)
+        program = builder[-1]
 
-            if args.disp:
-                print "loading", filename
+        if "functions" in cfg.__dict__:
 
-            stack.append(filename)
+            funcs = program.ftypes
 
-            f = open(filename, "rU")
-            code = f.read()
-            f.close()
+            for name in funcs.keys():
+                if name in cfg.functions:
+                    for key in cfg.functions[name].keys():
+                        funcs[name][key] = cfg.functions[name][key]
 
-            if os.path.isfile(filename + ".py") and not args.reset:
+            program.ftypes = funcs
 
-                try:
-                    cfg = imp.load_source("cfg", filename + ".py")
+        if "structs" in cfg.__dict__:
 
-                except:
-                    raise ImportError("""Supplement file:
-    %s.py
-    is formated incorrectly. Change the format or convert with '-r' option to create
-    a new file.""" % filename)
+            structs = program.stypes
 
-                if "verbatims" in cfg.__dict__ and cfg.verbatims:
-                    verbatims = cfg.verbatims
-                    code = supplement.verbatim.set(verbatims, code)
+            for name in structs.keys():
+                if name in cfg.structs:
+                    for key in cfg.structs[name].keys():
+                        structs[name][key] = cfg.structs[name][key]
 
-                builder.load(filename, code)
-                program = builder[-1]
+            program.stypes = structs
 
-                if "functions" in cfg.__dict__:
+        if "includes" in cfg.__dict__:
 
-                    funcs = program.ftypes
+            includes = program.itypes
 
-                    for name in funcs.keys():
-                        if name in cfg.functions:
-                            for key in cfg.functions[name].keys():
-                                funcs[name][key] = cfg.functions[name][key]
+            for key in cfg.includes:
+                if key not in includes:
+                    includes.append(key)
 
-                    program.ftypes = funcs
+            program.itypes = includes
 
-                if "structs" in cfg.__dict__:
+    else:
+        builder.load(filename, code)
+        program = builder[-1]
 
-                    structs = program.stypes
+    return program
 
-                    for name in structs.keys():
-                        if name in cfg.structs:
-                            for key in cfg.structs[name].keys():
-                                structs[name][key] = cfg.structs[name][key]
 
-                    program.stypes = structs
+def dependencies(builder, program, index):
+    """
+Find unknown names in a program that exist as files in the search path. The
+files are included in the program and removed from its unknowns.
 
-                if "includes" in cfg.__dict__:
+Args:
+    builder (Builder): Code constructor
+    program (Node): Program loaded through :py:func:`~matlab2cpp.load`
+    index (Index): Search path (see :py:mod:`~matlab2cpp.searchpath`)
 
-                    includes = program.itypes
+Returns:
+    list: Paths to the files found, in the order they should be loaded
+    """
 
-                    for key in cfg.includes:
-                        if key not in includes:
-                            includes.append(key)
+    filenames = []
+    unknowns = builder.get_unknowns(program.name)
 
-                    program.itypes = includes
+    for i in xrange(len(unknowns)-1, -1, -1):
 
-            else:
-                builder.load(filename, code)
-                program = builder[-1]
+        filename = index.find(unknowns[i], program.name)
+        if filename is not None:
+            program.include(filename)
+            filenames.append(filename)
+            del unknowns[i]
 
-            # add unknown variables to stack if they exists as files
-            unknowns = builder.get_unknowns(filename)
+    return filenames
+
+
+def load_worker(job):
+    """
+Load a Matlab file in a separate process. Used by
+:py:func:`~matlab2cpp.load_parallel`.
+
+Args:
+    job (tuple): filename, reset and keyword arguments to the builder
+
+Returns:
+    tuple: filename, serialized program and exception (if any)
+    """
+
+    filename, reset, kws = job
+    try:
+        builder = tree.builder.Builder(**kws)
+        program = load(builder, filename, reset)
+        return filename, tree.cache.dumps(program), None
 
-            for i in xrange(len(unknowns)-1, -1, -1):
+    except Exception as error:
+        return filename, None, error
+
+
+def load_parallel(builder, filename, index, jobs, reset=False):
+    """
+Load a Matlab file and all its dependencies using a pool of processes. Each
+file is loaded in a worker, and the dependencies are resolved as the programs
+arrive, such that independent files are loaded at the same time. The programs
+are ordered in the project as if loaded one by one.
+
+Args:
+    builder (Builder): Code constructor
+    filename (str): Path to main Matlab file
+    index (Index): Search path for dependencies (see
+        :py:mod:`~matlab2cpp.searchpath`)
+    jobs (int): Number of processes
+    reset (bool): Ignore supplement files
+    """
 
-                for path in paths:
-                    if os.path.isfile(path + sep + unknowns[i] + ".m"):
-                        unknowns[i] = unknowns[i] + ".m"
-                    if os.path.isfile(path + sep + unknowns[i]):
-                        program.include(path + sep + unknowns[i])
-                        filenames.append(path + sep + unknowns.pop(i))
+    import multiprocessing
+    import Queue
+
+    kws = dict(disp=builder.disp, comments=builder.comments,
+            original=builder.original, cache=builder.cache)
+    results = Queue.Queue()
+    pool = multiprocessing.Pool(jobs)
+
+    def submit(filename):
+        if builder.disp:
+            print "loading", filename
+        pool.apply_async(load_worker, ((filename, reset, kws),),
+                callback=results.put)
+
+    programs = {}
+    found = {}
+    submit(filename)
+    pending = 1
+
+    try:
+        while pending:
+
+            name, data, error = results.get()
+            pending -= 1
+            if error is not None:
+                raise error
+
+            programs[name] = program = tree.cache.loads(data, builder.project)
+            found[name] = dependencies(builder, program, index)
+
+            for name in found[name]:
+                if name not in programs and name not in found:
+                    found[name] = []
+                    submit(name)
+                    pending += 1
+
+    finally:
+        pool.terminate()
+        pool.join()
+
+    # same order as sequential loading
+    order = []
+    seen = set()
+    filenames = deque([filename])
+    while filenames:
+        filename = filenames.popleft()
+        if filename not in seen:
+            seen.add(filename)
+            order.append(filename)
+            filenames.extend(found[filename])
+
+    children = builder.project.children
+    children[-len(order):] = [programs[name] for name in order]
+
+
+def write(filename, text, keep=False, stamped=False):
+    """
+Write text to file.
 
+Args:
+    filename (str): Path to file
+    text (str, Rope): Content of file. Ropes (see
+        :py:mod:`~matlab2cpp.node.rope`) are written piece by piece.
+    keep (bool): Leave the file as is if its content is the same as `text`
+    stamped (bool): Ignore the first line, the header with the time stamp,
+        when comparing content
+
+Example:
+    >>> import tempfile
+    >>> filename = tempfile.mktemp()
+    >>> write(filename, node.rope.Rope(["a ;", "\\n", node.rope.Rope(["b ;"])]))
+    >>> print open(filename).read()
+    a ;
+    b ;
+    >>> os.remove(filename)
+    """
 
+    if keep and os.path.isfile(filename):
+        f = open(filename)
+        old = f.read()
+        f.close()
+        text_ = node.rope.text(text)
+        if stamped:
+            old = old.split("\n", 1)[1:]
+            text_ = text_.split("\n", 1)[1:]
+        if old == text_:
+            return
+
+    f = open(filename, "w")
+    if isinstance(text, node.rope.Rope):
+        text.write(f)
     else:
-        builder.load("unnamed", args.filename)
+        f.write(text)
+    f.close()
+
+
+def write_files(name, files, stamp="", keep=False, reset=False):
+    """
+Write the files of a translated program, with headers.
+
+Args:
+    name (str): Path to Matlab file
+    files (tuple): Content of the `.cpp`, `.hpp`, `.py` and `.log` files (see
+        :py:func:`~matlab2cpp.emit`)
+    stamp (str): Time stamp in headers, like ``" on 2016-01-01 12:00:00"``
+    keep (bool): Leave files with unchanged content as they are
+    reset (bool): Remove existing files first
+
+Returns:
+    list: Paths to the files written
+    """
+
+    cpp, hpp, py, log = files
+
+    if reset:
+        for ext in [".cpp", ".hpp", ".log", ".py"]:
+            if os.path.isfile(name+ext):
+                os.remove(name+ext)
+
+    stamped = bool(stamp)
+    written = []
+
+    if cpp:
+        cpp = node.rope.Rope(["""// Automatically translated using Matlab2cpp %g%s
+
+""" % (__version__, stamp), cpp])
+        write(name+".cpp", cpp, keep, stamped)
+        written.append(name+".cpp")
+
+    if hpp:
+        hpp = node.rope.Rope(["""// Automatically translated using Matlab2cpp %g%s
+            
+""" % (__version__, stamp), hpp])
+        write(name+".hpp", hpp, keep, stamped)
+        written.append(name+".hpp")
+
+    if log:
+        log = "Automatically translated using Matlab2cpp %g%s\n\n%s"\
+                % (__version__, stamp, log)
+        write(name+".log", log, keep, stamped)
+        written.append(name+".log")
+
+    write(name+".py", py, keep)
+    written.append(name+".py")
+
+    if os.path.isfile(name+".pyc"):
+        os.remove(name+".pyc")
+
+    return written
+
+
+def missing(builder, index):
+    """
+Paths where the unknown names of the programs were searched for as files,
+without being found (see :py:func:`~matlab2cpp.dependencies`).
+
+Args:
+    builder (Builder): Code constructor
+    index (Index): Search path
+
+Returns:
+    list: Paths to files that did not exist
+    """
+
+    out = []
+    for program in builder.project:
+        for name in program.unassigned:
+            out.extend(index.candidates(name, program.name))
+    return out
+
+
+def emit(program):
+    """
+Create the content of the files written for a translated program.
+
+Args:
+    program (Node): Program node
+
+Returns:
+    tuple: Content of the `.cpp`, `.hpp`, `.py` and `.log` files. The C++ code
+    is kept as ropes (see :py:mod:`~matlab2cpp.node.rope`), such that it is
+    written to file without being put together first.
+
+Example:
+    >>> program = build("a = 1", retall=True)[0]
+    >>> program.translate()
+    >>> cpp, hpp, py, log = emit(program)
+    >>> print isinstance(cpp, node.rope.Rope), hpp == ""
+    True True
+    """
+
+    if not program.str:
+        program.translate()
+
+    name = program.name
+    funcs = program[1]
+    main = funcs and funcs[0].name == "main"
+    cpp = hpp = ""
+    with stats.phase("qcpp", name):
+        if main:
+            cpp = qfunctions.source(program, join=False)
+    with stats.phase("qhpp", name):
+        if not main:
+            hpp = qfunctions.source(program, join=False)
+    with stats.phase("qpy", name):
+        py = qfunctions.qpy(program, prefix=True)
+    with stats.phase("qlog", name):
+        log = qfunctions.qlog(program)
+
+    return cpp, hpp, py, log
+
+
+# configured builder of a translation worker, see translate_init
+translation_builder = None
+
+
+def translate_init(options, data, record):
+    """
+Set up a translation worker. Used by
+:py:func:`~matlab2cpp.translate_parallel`.
+
+Args:
+    options (dict): Keyword arguments to the builder
+    data (list): Serialized programs of the configured project
+    record (bool): Record time spent, see :py:mod:`~matlab2cpp.stats`
+    """
+
+    global translation_builder
+    translation_builder = tree.builder.Builder(**options)
+    for item in data:
+        tree.cache.loads(item, translation_builder.project)
+    translation_builder.configured = True
+
+    if record:
+        stats.enable()
+
+
+def translate_worker(index):
+    """
+Translate a program of `translation_builder` in a separate process. Used by
+:py:func:`~matlab2cpp.translate_parallel`.
+
+Args:
+    index (int): Position of program in project
+
+Returns:
+    tuple: Index, file contents (see :py:func:`~matlab2cpp.emit`),
+    translation of the program functions, recorded numbers (see
+    :py:func:`~matlab2cpp.stats.collect`) and exception (if any)
+    """
+
+    try:
+        program = translation_builder[index]
+        program.translate()
+        output = emit(program)
+        return index, output, program[1].str, stats.collect(), None
+
+    except Exception as error:
+        return index, None, None, None, error
+
+
+def translate_parallel(builder, jobs, indices=None):
+    """
+Translate the programs of a configured builder and create their file contents
+using a pool of processes. After configuration, a program's translation only
+changes the program itself, so each program is translated in its own worker.
+Every worker gets a copy of the serialized project when started, and only the
+file contents are sent back, together with the recorded time if
+:py:mod:`~matlab2cpp.stats` is recording. The trees in this process are left
+untranslated.
+
+Args:
+    builder (Builder): Configured code constructor
+    jobs (int): Number of processes
+    indices (list, optional): Positions of the programs to translate. All if
+        omitted.
+
+Returns:
+    list: File contents of each program (see :py:func:`~matlab2cpp.emit`) and
+    translation of the functions of each program, or None if not translated
+    """
+
+    import multiprocessing
+
+    options = dict(builder.project.kws, disp=builder.disp,
+            comments=builder.comments, original=builder.original)
+    data = [tree.cache.dumps(program) for program in builder.project]
+    pool = multiprocessing.Pool(jobs, translate_init,
+            (options, data, stats.enabled))
+
+    try:
+        if indices is None:
+            indices = range(len(builder.project))
+        results = pool.map(translate_worker, indices)
+
+    finally:
+        pool.terminate()
+        pool.join()
+
+    outputs = [None]*len(builder.project)
+    for index, output, funcs, numbers, error in results:
+        if error is not None:
+            raise error
+        outputs[index] = output, funcs
+        stats.merge(numbers)
+
+    return outputs
+
+
+def main(args):
+    """
+Initiate the interpretation and conversion process.
+
+Args:
+    args (ArgumentParser): arguments parsed through mconvert
+    """
+
+    # nothing to do if no input has changed since last run
+    record = None
+    if args.incremental and os.path.isfile(args.filename):
+        options = repr([args.suggest, args.matlab_suggest, args.reset,
+            args.comments, args.original, args.nargin, args.deterministic,
+            args.path])
+        record = manifest.Manifest(os.path.abspath(args.filename) +
+                ".manifest", options)
+        if record.current() and not (args.tree_full or args.tree or args.line):
+            if args.disp:
+                print "nothing to convert"
+            return
+
+    if args.stats or args.profile:
+        stats.enable()
+
+    cache = not args.no_cache and args.cache_dir or None
+    builder = tree.builder.Builder(disp=args.disp, comments=args.comments,
+            original=args.original, cache=cache)
+
+    if os.path.isfile(args.filename):
+        with stats.phase("index"):
+            search = searchpath.Index(
+                    [os.path.dirname(os.path.abspath(args.filename))] +
+                    (args.path or []))
+
+    if os.path.isfile(args.filename) and args.jobs > 1:
+
+        if args.disp:
+            print "building tree..."
+
+        with stats.phase("load"):
+            load_parallel(builder, os.path.abspath(args.filename), search,
+                    args.jobs, args.reset)
+
+    elif os.path.isfile(args.filename):
+
+        if args.disp:
+            print "building tree..."
+
+        filenames = deque([os.path.abspath(args.filename)])
+        stack = set()
+        while filenames:
+
+            filename = filenames.popleft()
+            assert os.path.isfile(filename)
+
+            if filename in stack:
+                continue
+
+            if args.disp:
+                print "loading", filename
+
+            stack.add(filename)
+
+            with stats.phase("load", filename):
+                program = load(builder, filename, args.reset)
+
+            # add unknown variables to stack if they exists as files
+            filenames.extend(dependencies(builder, program, search))
+
+
+    else:
+        with stats.phase("load", "unnamed"):
+            builder.load("unnamed", args.filename)
         program = builder[-1]
 
     #--- work in progress ---
@@ -191,72 +635,101 @@ Args:
     if args.disp:
         print "configure tree"
 
-    builder.configure(suggest=2*args.suggest)
+    store = None
+    with stats.phase("configure"):
+        if args.summaries:
+            store = summaries.Summaries(args.summaries,
+                    repr([args.suggest, args.matlab_suggest]), args.reset)
+            store.configure(builder, suggest=2*args.suggest,
+                    limit=args.configure_limit)
+            if args.disp:
+                print "datatypes of %d functions from %s, %d changed" % (
+                        store.seeded, args.summaries, store.stale)
+        else:
+            builder.configure(suggest=2*args.suggest,
+                    limit=args.configure_limit)
 
     #--- work in progress ---
     #Modify the Abstract Syntax Tree (AST)
-    builder.modify(args.nargin)
+    with stats.phase("modify"):
+        builder.modify(args.nargin)
     #------------------------
+
+    # programs with unchanged inputs and datatypes are not converted again
+    skipped = set()
+    if record is not None:
+        signatures = manifest.signatures(builder.project)
+        for program in builder.project:
+            key = record.key(program.name, signatures[program.name])
+            if record.fresh(program.name, key):
+                skipped.add(program.name)
     
     if args.disp:
         print builder.project.summary()
         print "generate translation"
 
-    builder.project.translate(args)
+    indices = [index for index, program in enumerate(builder.project)
+            if program.name not in skipped]
 
-    t = time.time()
-    stamp = date.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S')
+    outputs = None
+    with stats.phase("translate"):
+        if args.jobs > 1 and len(indices) > 1:
+            outputs = translate_parallel(builder, args.jobs, indices)
+        elif skipped:
+            for index in indices:
+                builder[index].translate()
+        else:
+            builder.project.translate(args)
 
-    for program in builder.project:
+    if args.deterministic:
+        stamp = ""
+    else:
+        t = time.time()
+        stamp = " on " + date.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S')
+
+    for index, program in enumerate(builder.project):
 
         name = program.name
 
-        cpp = qfunctions.qcpp(program)
-        hpp = qfunctions.qhpp(program)
-        py = qfunctions.qpy(program, prefix=True)
-        log = qfunctions.qlog(program)
+        if name in skipped:
+            if args.disp:
+                print "Unchanged", name
+            continue
+
+        stats.count(program)
+        if outputs is None:
+            cpp, hpp, py, log = emit(program)
+        else:
+            cpp, hpp, py, log = outputs[index][0]
 
         if args.disp:
             print "Writing files..."
 
-        if args.reset:
-            for ext in [".cpp", ".hpp", ".log", ".py"]:
-                if os.path.isfile(name+ext):
-                    os.remove(name+ext)
+        written = write_files(name, (cpp, hpp, py, log), stamp,
+                keep=record is not None, reset=args.reset)
 
-        if cpp:
-            cpp = """// Automatically translated using Matlab2cpp %g on %s
+        if record is not None:
+            record.update(name, record.key(name, signatures[name]), written)
 
-%s""" % (__version__, stamp, cpp)
-            f = open(name+".cpp", "w")
-            f.write(cpp)
-            f.close()
+        if store is not None:
+            store.written(name)
 
-        if hpp:
-            hpp = """// Automatically translated using Matlab2cpp %g on %s
-            
-%s""" % (__version__, stamp, hpp)
-            f = open(name+".hpp", "w")
-            f.write(hpp)
-            f.close()
-
-        if log:
-            log = "Automatically translated using Matlab2cpp %g on %s\n\n%s"\
-                    % (__version__, stamp, log)
-            f = open(name+".log", "w")
-            f.write(log)
-            f.close()
-
-        f = open(name+".py", "w")
-        f.write(py)
-        f.close()
+    if store is not None:
+        store.save()
 
-        if os.path.isfile(name+".pyc"):
-            os.remove(name+".pyc")
+    if record is not None:
+        record.missing = missing(builder, search)
+        record.save([program.name for program in builder.project])
 
 
     program = builder[0]
 
+    # translation changes the tree, so repeat the steps of the workers
+    if (outputs is not None or program.name in skipped) and\
+            (args.tree_full or args.tree or args.line):
+        program.translate()
+        emit(program)
+
     if args.tree_full:
         print program.summary(args)
 
@@ -267,12 +740,29 @@ Args:
             print program[1].summary(args)
 
     elif args.line:
-        nodes = program[1].flatten(False, False, False)
-        for node_ in nodes:
-            if node_.line == args.line and node_.cls != "Block":
+        start, end = program.lines.line_span(args.line)
+        for node_ in program[1].walk():
+            if start <= node_.cur <= end and node_.line == args.line \
+                    and node_.cls != "Block":
                 print node_.str.replace("__percent__", "%")
                 break
-    else:
-        print program[1].str.replace("__percent__", "%")
+    elif program.name not in skipped:
+        if outputs is None:
+            funcs = program[1].str
+        else:
+            funcs = outputs[0][1]
+        funcs = rules._program.layout(funcs, fix=False, indent=False)
+        print funcs.replace("__percent__", "%")
+
+    if args.stats:
+        print stats.table()
+
+    if args.profile:
+        f = open(args.profile, "w")
+        f.write(stats.dumps())
+        f.close()
+
+    if args.stats or args.profile:
+        stats.disable()
 
 
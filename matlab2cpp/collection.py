@@ -191,6 +191,7 @@ A full summary of all nodes.
 """
 
 from node import Node
+from node import reference
 
 __all__ = [
 "All", "Assign", "Assigns", "Band", "Bcomment", "Block", "Bor", "Branch",
@@ -209,6 +210,8 @@ __all__ = [
 ]
 
 class Project(Node):
+    __slots__ = ("builder", "kws", "translation", "symbols")
+
     def __init__(self, name="", cur=0, line=0, code="", **kws):
         """
 Root of the node tree. Every other node should inherant from this one.
@@ -223,10 +226,13 @@ All keyword arguments are passed to `mc.Node.__init__`.
         assert "parent" not in kws
         self.parent = self
         self._program = self
+        self.symbols = reference.Symbols(self)
         Node.__init__(self, self, name=name, cur=cur,
                 line=line, code=code, **kws)
 
 class Program(Node):
+    __slots__ = ("lines", "unassigned", "unstable")
+
     def __init__(self, parent, name, **kws):
         """
 Represents one stand-alone script or program. Each child represents the various
@@ -238,6 +244,7 @@ Children:
 All keyword arguments are passed to `mc.Node.__init__`.
     """
         self._program = self
+        self.unstable = []
         Node.__init__(self, parent, name=name, **kws)
 
 class Includes(Node):
@@ -4,77 +4,97 @@ import matlab2cpp as mc
 import datatypes
 import backends
 import reserved
+from worklist import Worklist
 
-def configure(root, suggest=True, **kws):
+def configure(root, suggest=True, limit=None, **kws):
     """
 configure backend
 
+Args:
+    root (Builder, Node): Tree to configure
+    suggest (bool): Uses suggestion engine to fill in types
+    limit (int, optional): Maximum number of passes, see
+        :py:class:`~matlab2cpp.configure.worklist.Worklist`. Declared variables
+        still changing when it is reached are reported as warnings in the log.
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("prg.m", "a = 1; b = a; c = b")
+    >>> configure(builder, limit=1)
+    >>> print mc.qlog(builder[0])
+    Warning in class Var on line 1:
+    a = 1; b = a; c = b
+    ^
+    datatype of a not settled after 1 configuration passes
+    <BLANKLINE>
+    Warning in class Var on line 1:
+    a = 1; b = a; c = b
+           ^
+    datatype of b not settled after 1 configuration passes
+
 See also:
     :py:func:`matlab2cpp.Builder.configure <Builder.configure>`
     """
     if isinstance(root, mc.Builder):
         root = root.project
 
-    loop(root, suggest)
-    loop(root, suggest)
-
-def loop(root, suggest):
-
-    nodes = root.flatten(False, True, True)
-
-    while True:
-        
-        # loop and configure
-        for node in nodes:
-
-            # reserved stuff
-            if node.cls + "_" + node.name in reserved.__dict__:
-                rule = reserved.__dict__[node.cls+"_"+node.name]
-                if isinstance(rule, str):
-                    node.type = rule
-                else:
-                    rule(node)
+    worklist = Worklist(limit)
+    loop(root, suggest, worklist)
+    loop(root, suggest, worklist)
 
-            # Datatype stuff
-            if node.prop["type"] != "TYPE":
-                pass
+    mc.stats.configuration(worklist.history)
 
-            elif node.cls in datatypes.__dict__:
-                datatype = datatypes.__dict__[node.cls]
-                if isinstance(datatype, str):
-                    node.type = datatype
-                else:
-                    datatype(node)
+    # one warning per variable, placed at the parameter or return value if any
+    found = {}
+    for var in worklist.unstable.values():
+        key = id(var.parent.parent), var.name
+        if key not in found or found[key].parent.cls == "Declares":
+            found[key] = var
 
-            # Backend stuff
-            if node.backend != "unknown":
-                pass
+    nodes = [located(var) for var in found.values()]
+    nodes.sort(key=lambda node: (node.program.name, node.cur))
+    for node in nodes:
+        msg = "datatype of %(name)s not settled after " + str(limit) +\
+                " configuration passes"
+        node.program.unstable.append((node, msg))
+        node.warning(msg)
 
-            elif node.cls in backends.__dict__:
-                backend = backends.__dict__[node.cls]
-                if isinstance(backend, str):
-                    node.backend = backend
-                else:
-                    backend(node)
+def located(var):
+    """
+First use of a declared variable in its function, as declarations are not
+placed in the code.
 
-        # determine if done
-        if suggest:
+Args:
+    var (Node): Declared variable
 
-            complete = True
+Returns:
+    Node: Node with the same name in the function body, or `var` if none
+    """
+    if var.parent.cls != "Declares":
+        return var
+    for node in var.parent.parent[3].flatten(False, False, False):
+        if node.name == var.name and node.cls != "Block":
+            return node
+    return var
+
+def loop(root, suggest, worklist=None):
+    """
+Apply the configuration rules until no suggestions remain.
 
-            for program in root.project:
-                
-                suggests = program.suggest
-                program.stypes = suggests
-                program.ftypes = suggests
-                complete = complete and not any([any(v) for v in suggests.values()])
+Args:
+    root (Node): Root of tree to configure
+    suggest (bool): Insert suggested datatypes between passes
+    worklist (Worklist, optional): Queue of nodes to configure from an earlier
+        round. If omitted, all nodes are configured.
 
-            if complete:
-                break
+See also:
+    :py:class:`~matlab2cpp.configure.worklist.Worklist`
+    """
 
-        else:
-            break
+    if worklist is None:
+        worklist = Worklist()
+    worklist.loop(root, suggest)
 
     # delete log, if any (create on translate)
     for program in root.project:
-        program[-1].children = []
+        del program[-1].children[:]
@@ -1,31 +1,9 @@
-import os
-
 def funcs(node):
 
-    func = None
-
-    # lambda scope
-    if "_" + node.name in node.program[1]:
-        func = node.program[1]["_" + node.name]
-    
-    # local scope
-    elif node in node.program[1]:
-        func = node.program[1][node]
-
-    # external file in same folder
-    else:
-
-        for program in node.project:
-
-            # don't use the file your in as external library
-            if program is node.program:
-                continue
-
-            if os.path.basename(program.name) == node.name+".m":
-                func = program[1][0]
-                break
-        else:
-            return False
+    # lambda scope, local scope, or external file in project
+    func = node.project.symbols.find(node.name, node.program)
+    if func is None:
+        return False
 
     node.backend = func.backend
 
@@ -0,0 +1,585 @@
+"""
+Worklist driven configuration of node trees.
+
++-------------------------------------------------------+----------------------+
+| Name                                                  | Description          |
++=======================================================+======================+
+| :py:class:`~matlab2cpp.configure.worklist.Worklist`   | Dependency index and |
+|                                                       | queue of nodes to    |
+|                                                       | configure            |
++-------------------------------------------------------+----------------------+
+| :py:func:`~matlab2cpp.configure.worklist.apply`       | Apply reserved,      |
+|                                                       | datatype and backend |
+|                                                       | rules to a node      |
++-------------------------------------------------------+----------------------+
+
+The configuration rules are applied to the nodes in passes, in the same order
+as :py:func:`~matlab2cpp.configure.loop` originally did. Only the first pass
+visits every node. While a rule is applied, the node frontends report every
+node where type, backend, suggestion, value or name changes (see
+`matlab2cpp.node.reference.changes`). The dependents of those nodes are then
+queued:
+
+* The node itself, its parent and grandparent, and its siblings if they are
+  part of the same expression. Rules read the datatypes of their children
+  and siblings, but not of their parents.
+* Nodes with rules that look further up in their expression (the nodes
+  between two block level nodes), like `Colon` and the reserved names.
+* For changes to declared variables, the same nodes around every node with the
+  same name or field name.
+* For changes to function signatures, the same nodes around every node with
+  the function name.
+
+`Lambda` nodes configure their anonymous function on the fly, and are visited
+in every pass.
+
+Dependents placed after the current node are visited later in the same pass,
+while the others are visited in the next pass. At the end of each pass the
+suggested datatypes are inserted into the declarations, like before, and the
+passes stop when there are no suggestions left. Nodes still queued are kept
+for the next call to `loop`, such that the second round of configuration only
+visits nodes that changed since the first.
+
+With suggestions, new nodes are first configured one function at the time,
+following the call graph from the callees up (see `components`). Functions
+calling each other are configured together. The passes of a group of
+functions only visit the nodes of the group, until nothing in it changes.
+Return datatypes then reach the callers in the same round instead of one
+pass per call level. Dependents outside the group, and the nodes outside any
+function, are left to the passes over the whole tree that follow.
+
+Since the callees of a group are settled before its calls are visited, a call
+keeps passing the datatypes of its arguments on to the parameters after the
+datatype of the call itself is known. Arguments typed late, like the `n - 1`
+in two mutually recursive functions, then still reach the parameters. When
+the calls to a function pass different datatypes to the same parameter, the
+suggestion is the one from the call visited last, which follows the call
+graph order and may differ from what passes over the whole tree give.
+
+Every pass is recorded with its time, number of visits, number of nodes with
+new datatype or backend, and the declared variables with new datatype or
+suggestion, such that slow configurations can be traced to the variables that
+keep changing (see ``mconvert --stats``). The number of passes can be limited.
+Declared variables changed in the last pass before the limit is reached are
+reported as warnings in the log (see :py:func:`~matlab2cpp.configure.configure`).
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("prg.m", "a = 1; b = a; c = b")
+    >>> worklist = Worklist()
+    >>> worklist.loop(builder.project, True)
+    >>> print len(builder.project.flatten()), worklist.visits
+    25 64
+    >>> worklist.loop(builder.project, True)
+    >>> print worklist.visits
+    77
+    >>> print mc.qscript(builder[0])
+    a = 1 ;
+    b = a ;
+    c = b ;
+"""
+
+import os
+import time
+import heapq
+
+import matlab2cpp as mc
+import matlab2cpp.node.reference as ref
+from funcs import funcs
+
+# Nodes starting a new expression below them
+boundaries = ("Project", "Program", "Includes", "Funcs", "Inlines", "Structs",
+        "Headers", "Log", "Func", "Main", "Declares", "Returns", "Params",
+        "Struct", "Block")
+
+# Nodes where variables are declared
+declarations = ("Declares", "Returns", "Params", "Struct")
+
+# Nodes with rules reading outside their dependencies, visited every pass
+volatile = ("Lambda",)
+
+# Nodes with rules reading their group, visited on any change in expression
+watching = ("Colon",)
+
+
+def apply(node):
+    """
+Apply the reserved, datatype and backend rules to a node.
+
+Args:
+    node (Node): Node to configure
+
+See also:
+    :py:class:`~matlab2cpp.dispatch.Configuration`
+    """
+
+    reserved, datatype, backend = mc.dispatch.configuration[node.cls, node.name]
+
+    # reserved stuff
+    if reserved is not None:
+        if isinstance(reserved, str):
+            node.type = reserved
+        else:
+            reserved(node)
+
+    # Datatype stuff
+    if node.prop_type != "TYPE":
+
+        # calls pass on the datatypes of their arguments, also those known
+        # after the datatype of the call
+        if node.prop_backend in ("func_return", "func_returns") and\
+                node.cls in ("Get", "Var"):
+            funcs(node)
+
+    elif datatype is not None:
+        if isinstance(datatype, str):
+            node.type = datatype
+        else:
+            datatype(node)
+
+    # Backend stuff
+    if node.backend != "unknown":
+        pass
+
+    elif backend is not None:
+        if isinstance(backend, str):
+            node.backend = backend
+        else:
+            backend(node)
+
+
+class Worklist(object):
+    """
+Queue of nodes to configure, kept between rounds of configuration.
+
+Args:
+    limit (int, optional): Maximum number of passes over the queued nodes of
+        the whole tree or a group of functions, in each round
+
+Attributes:
+    known (dict): Nodes configured at least once, by id
+    pending (dict): Nodes with changed dependencies not yet visited, by id
+    visits (int): Number of rule applications
+    limit (int, None): Maximum number of passes
+    history (list): Time, number of visits, number of visited nodes with new
+        datatype or backend, and names of declared variables with new datatype
+        or suggestion, for each pass
+    unstable (dict): Declared variables still changing when the passes were
+        stopped by `limit`, by id
+    """
+
+    def __init__(self, limit=None):
+        self.known = {}
+        self.pending = {}
+        self.visits = 0
+        self.limit = limit
+        self.history = []
+        self.unstable = {}
+
+    def index(self, nodes):
+        """
+Create dependency index of nodes.
+
+Args:
+    nodes (list): Nodes in the order they are configured
+        """
+
+        self.position = position = {}
+        self.names = names = {}
+        self.parent_at = parent_at = []
+        self.children_at = children_at = []
+        self.watch_at = watch_at = []
+        self.bound_at = bound_at = []
+
+        for i, node in enumerate(nodes):
+            position[id(node)] = i
+
+        configuration = mc.dispatch.configuration
+        islands = {}
+        for i, node in enumerate(nodes):
+
+            parent_at.append(position.get(id(node.parent)))
+            bound_at.append(node.cls in boundaries)
+            children_at.append([position[id(child)] for child in node.children
+                if id(child) in position])
+
+            # nodes of the same expression share one list of watchers
+            path = []
+            top = node
+            while id(top) not in islands:
+                parent = top.parent
+                if parent is None or parent is top or\
+                        top.cls in boundaries or parent.cls in boundaries:
+                    islands[id(top)] = []
+                    break
+                path.append(top)
+                top = parent
+            watchers = islands[id(top)]
+            for top in path:
+                islands[id(top)] = watchers
+            watch_at.append(watchers)
+
+            if node.cls in watching or\
+                    configuration[node.cls, node.prop_name][0] is not None:
+                watchers.append(i)
+
+            names.setdefault(node.prop_name, []).append(i)
+            if node.cls in ref.structvars and node.prop_value:
+                names.setdefault(node.prop_value, []).append(i)
+
+    def near(self, i):
+        """
+Positions of nodes reading the properties of a node through the tree.
+
+Args:
+    i (int): Position of node
+
+Returns:
+    list: Position of node, parent, grandparent, siblings within expression
+    and the watchers of the expression
+        """
+
+        out = [i]
+        parent = self.parent_at[i]
+        if parent is not None:
+            out.append(parent)
+            if not self.bound_at[parent]:
+                out.extend(self.children_at[parent])
+            grandparent = self.parent_at[parent]
+            if grandparent is not None:
+                out.append(grandparent)
+        out.extend(self.watch_at[i])
+        return out
+
+    def dependents(self, node):
+        """
+Positions of the nodes depending on the properties of a node.
+
+Args:
+    node (Node): Changed node
+
+Returns:
+    list: Positions in current index
+        """
+
+        out = []
+        i = self.position.get(id(node))
+        parent = node.parent
+        if i is not None:
+            out.extend(self.near(i))
+        elif parent is not None and id(parent) in self.position:
+            out.extend(self.near(self.position[id(parent)]))
+
+        # nodes without own datatype read it from their declaration
+        if parent is not None and parent.cls in declarations:
+            for j in self.names.get(node.prop_name, ()):
+                out.extend(self.near(j))
+            if parent.cls in ("Returns", "Params"):
+                node = parent.parent
+
+        if node.cls in ("Func", "Main"):
+            names = [node.prop_name]
+            if names[0][:1] == "_":
+                names.append(names[0][1:])
+
+            # the first function is called by file name from other files
+            funcs = node.parent
+            if funcs is not None and funcs.cls == "Funcs" and funcs[0] is node:
+                names.append(os.path.basename(funcs.parent.name)[:-2])
+
+            for name in names:
+                for j in self.names.get(name, ()):
+                    out.extend(self.near(j))
+
+        return out
+
+    def loop(self, root, suggest):
+        """
+Configure nodes until no suggestions remain.
+
+Args:
+    root (Node): Root of tree to configure
+    suggest (bool): Insert suggested datatypes between passes
+        """
+
+        nodes = root.flatten(False, True, True)
+        self.index(nodes)
+
+        known, pending = self.known, self.pending
+        queue = [i for i, node in enumerate(nodes)
+                if id(node) not in known or id(node) in pending
+                or node.cls in volatile]
+        always = [i for i, node in enumerate(nodes) if node.cls in volatile]
+        for node in nodes:
+            known[id(node)] = node
+        self.pending = {}
+
+        # nested configuration reports back to the enclosing one
+        outer = ref.changes
+        ref.changes = changes = []
+        changed = {}
+        try:
+            left = ()
+            if suggest and queue:
+                queue, left = self.scheduled(nodes, root, always, queue,
+                        changes, changed)
+            later = self.passes(nodes, root, suggest, always, queue, changes,
+                    changed)
+            later.update(left)
+        finally:
+            ref.changes = outer
+            if outer is not None:
+                outer.extend(changed.values())
+
+        for j in later:
+            node = nodes[j]
+            self.pending[id(node)] = node
+
+    def components(self, nodes, root):
+        """
+Functions grouped by the call graph, with callees before callers.
+
+A call is a `Get` or `Var` node with the name of a function (see
+:py:class:`~matlab2cpp.node.reference.Symbols`). Functions calling each other,
+directly or through other functions, end up in the same group.
+
+Args:
+    nodes (list): Nodes in the order they are configured
+    root (Node): Root of tree
+
+Returns:
+    list: Groups of functions, each a list of positions of their nodes
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("prg.m", "function f()\\ng()\\nend\\nfunction g()\\nh()\\n"
+    ...     "end\\nfunction h()\\ng()\\nk()\\nend\\nfunction k()\\nend")
+    >>> nodes = builder.project.flatten(False, True, True)
+    >>> for group in Worklist().components(nodes, builder.project):
+    ...     print sorted(set(nodes[i].func.name for i in group))
+    ['k']
+    ['g', 'h']
+    ['f']
+        """
+
+        symbols = root.project.symbols
+
+        # function of each node, None outside functions
+        owner = {}
+        def function(node):
+            path = []
+            while id(node) not in owner:
+                parent = node.parent
+                if node.cls in ("Func", "Main") and parent.cls == "Funcs":
+                    owner[id(node)] = node
+                    break
+                if parent is None or parent is node or\
+                        node.cls in ("Program", "Project"):
+                    owner[id(node)] = None
+                    break
+                path.append(node)
+                node = parent
+            func = owner[id(node)]
+            for node in path:
+                owner[id(node)] = func
+            return func
+
+        members = {}
+        calls = {}
+        for i, node in enumerate(nodes):
+
+            func = function(node)
+            if func is None:
+                continue
+
+            key = id(func)
+            if key not in members:
+                members[key] = []
+                calls[key] = []
+            members[key].append(i)
+
+            if node.cls in ("Get", "Var"):
+                callee = symbols.find(node.prop_name, node.program)
+                if callee is not None and callee is not func:
+                    calls[key].append(id(callee))
+
+        # Tarjan's algorithm, without recursion. Groups are completed with
+        # their callees first.
+        number = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        groups = []
+        counter = 0
+
+        for start in members:
+            if start in number:
+                continue
+
+            work = [(start, iter(calls[start]))]
+            number[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+
+            while work:
+                key, edges = work[-1]
+                for callee in edges:
+                    if callee not in members:
+                        continue
+                    if callee not in number:
+                        number[callee] = low[callee] = counter
+                        counter += 1
+                        stack.append(callee)
+                        on_stack.add(callee)
+                        work.append((callee, iter(calls[callee])))
+                        break
+                    if callee in on_stack:
+                        low[key] = min(low[key], number[callee])
+                else:
+                    work.pop()
+                    if work:
+                        caller = work[-1][0]
+                        low[caller] = min(low[caller], low[key])
+                    if low[key] == number[key]:
+                        group = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            group.extend(members[member])
+                            if member == key:
+                                break
+                        groups.append(sorted(group))
+
+        return groups
+
+    def scheduled(self, nodes, root, always, queue, changes, changed):
+        """
+Configure the queued nodes of each group of functions until the group
+settles, callees first (see `components`).
+
+Returns:
+    tuple: Positions of nodes left for the passes over the whole tree, and
+    positions of nodes with changed dependencies left for the next round,
+    like the return value of `passes`
+        """
+
+        queue = set(queue)
+        always = set(always)
+        rest = set(queue)
+        left = set()
+
+        for group in self.components(nodes, root):
+
+            scope = set(group)
+            start = sorted(scope & queue)
+            if not start:
+                continue
+            rest.difference_update(scope)
+
+            outside = set()
+            left.update(self.passes(nodes, root, True, sorted(scope & always),
+                    start, changes, changed, scope, outside))
+            rest.update(outside)
+
+        return sorted(rest), left
+
+    def passes(self, nodes, root, suggest, always, queue, changes, changed,
+            scope=None, outside=None):
+        """
+Visit queued nodes in passes until no suggestions remain.
+
+With `scope`, only nodes with positions in it are visited, and stop when no
+node in it has changed dependencies. Others are collected in `outside`.
+
+Each pass is recorded in `history`. After `limit` passes the remaining nodes
+are left for the next round, and the declared variables changed in the last
+pass are recorded in `unstable`.
+
+Returns:
+    set: Positions of nodes with changed dependencies not yet visited
+        """
+
+        count = 0
+        while True:
+
+            start = time.time()
+            visits = self.visits
+            moved = 0
+            declared = {}
+
+            queued = set(queue)
+            later = set()
+
+            while queue:
+
+                i = heapq.heappop(queue)
+                node = nodes[i]
+                before = node.prop_type, node.prop_backend
+                apply(node)
+                self.visits += 1
+                if before != (node.prop_type, node.prop_backend):
+                    moved += 1
+
+                if not changes:
+                    continue
+
+                for node in changes:
+                    changed[id(node)] = node
+                    parent = node.parent
+                    if parent is not None and parent.cls in declarations:
+                        declared[id(node)] = node
+                    for j in self.dependents(node):
+                        if scope is not None and j not in scope:
+                            outside.add(j)
+                        elif j > i:
+                            if j not in queued:
+                                queued.add(j)
+                                heapq.heappush(queue, j)
+                        else:
+                            later.add(j)
+                del changes[:]
+
+            # determine if done
+            complete = True
+            if suggest:
+                for program in root.project:
+
+                    suggests = program.suggest
+                    program.stypes = suggests
+                    program.ftypes = suggests
+                    complete = complete and\
+                            not any([any(v) for v in suggests.values()])
+
+            for node in changes:
+                changed[id(node)] = node
+                parent = node.parent
+                if parent is not None and parent.cls in declarations:
+                    declared[id(node)] = node
+                for j in self.dependents(node):
+                    if scope is not None and j not in scope:
+                        outside.add(j)
+                    else:
+                        later.add(j)
+            del changes[:]
+
+            count += 1
+            self.history.append((time.time()-start, self.visits-visits, moved,
+                sorted(set(node.name for node in declared.values()))))
+
+            if not suggest or complete or not (later or always):
+                return later
+
+            if scope is not None and not later:
+                return later
+
+            if self.limit is not None and count >= self.limit:
+                self.unstable.update(declared)
+                return later
+
+            queue = sorted(later.union(always))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -14,76 +14,147 @@ The follwing constructor classes exists here:
 +------------------------------------------+---------------------------------------+
 | :py:class:`~matlab2cpp.datatype.Suggest` | Frontend for suggested datatype       |
 +------------------------------------------+---------------------------------------+
+
+Datatypes are stored in the nodes as names. The number of dimensions, memory
+type and numerical indicator of a name are looked up through its integer code
+(see `code`), and the common datatypes of `common_loose` and `common_strict`
+are remembered for each set of names.
 """
 
 import supplement
+from node import reference as ref
 import matlab2cpp as mc
 
-dim0 = {"int", "float", "double", "uword", "cx_double"}
-dim1 = {"ivec", "fvec", "uvec", "vec", "cx_vec"}
-dim2 = {"irowvec", "frowvec", "urowvec", "rowvec", "cx_rowvec"}
-dim3 = {"imat", "fmat", "umat", "mat", "cx_mat"}
-dim4 = {"icube", "fcube", "ucube", "cube", "cx_cube"}
-
-dims = [dim0, dim1, dim2, dim3, dim4]
+# numerical datatypes by number of dimensions and memory type
+table = (
+    ("uword", "int", "float", "double", "cx_double"),
+    ("uvec", "ivec", "fvec", "vec", "cx_vec"),
+    ("urowvec", "irowvec", "frowvec", "rowvec", "cx_rowvec"),
+    ("umat", "imat", "fmat", "mat", "cx_mat"),
+    ("ucube", "icube", "fcube", "cube", "cx_cube"),
+)
 
-mem0 = {"uword", "uvec", "urowvec", "umat", "ucube"}
-mem1 = {"int", "ivec", "irowvec", "imat", "icube"}
-mem2 = {"float", "fvec", "frowvec", "fmat", "fcube"}
-mem3 = {"double", "vec", "rowvec", "mat", "cube"}
-mem4 = {"cx_double", "cx_vec", "cx_rowvec", "cx_mat", "cx_cube"}
+dims = [set(row) for row in table]
+dim0, dim1, dim2, dim3, dim4 = dims
 
-mems = [mem0, mem1, mem2, mem3, mem4]
+mems = [set(row[mem] for row in table) for mem in xrange(5)]
+mem0, mem1, mem2, mem3, mem4 = mems
 
 others = {"char", "string", "TYPE", "func_lambda", "struct", "structs", "cell",
         "wall_clock", "SPlot"}
 
+# Datatypes are coded as small integers: `dim*5 + mem` for the numerical
+# types, followed by the other types. Pointer variants like ``mat*`` get the
+# code of their type when first seen.
+codes = {}
+dim_of = []
+mem_of = []
+num_of = []
+
+for dim, row in enumerate(table):
+    for mem, name in enumerate(row):
+        codes[name] = len(dim_of)
+        dim_of.append(dim)
+        mem_of.append(mem)
+        num_of.append(True)
+
+for name in sorted(others):
+    codes[name] = len(dim_of)
+    dim_of.append(None)
+    mem_of.append(None)
+    num_of.append(False)
+
+# common datatype of sets of names, by frozenset
+loose = {}
+strict = {}
+
+
+def code(val):
+    """
+Integer code of a datatype.
 
-def common_loose(vals):
-    """Common denominator among several names.
-Loose enforcment"""
+Args:
+    val (str): Datatype name, with or without pointer stars
+
+Returns:
+    int: Code, index of `dim_of`, `mem_of` and `num_of`
+
+Raises:
+    ValueError: Datatype not recognized
+
+Example:
+    >>> print code("vec"), code("vec*"), dim_of[code("vec")]
+    8 8 1
+    """
+    try:
+        return codes[val]
+    except KeyError:
+        pass
+
+    name = val
+    while name[-1] == "*":
+        name = name[:-1]
+    if name not in codes:
+        raise ValueError("Datatype '%s' not recognized" % name)
+
+    codes[val] = codes[name]
+    return codes[val]
+
+
+def names(vals):
+    "Datatype names of a name, a (dim, mem) pair or a list of either"
 
     if not isinstance(vals, (tuple, list)) or \
             isinstance(vals[0], int):
         vals = [vals]
-    vals = list(vals)
 
-    for i in xrange(len(vals)):
-        if isinstance(vals[i], str):
-            continue
-        if isinstance(vals[i][0], int):
-            vals[i] = get_name(*vals[i])
+    out = []
+    for val in vals:
+        if not isinstance(val, str) and isinstance(val[0], int):
+            val = get_name(*val)
+        out.append(val)
+    return frozenset(out)
 
-    vals = set(vals)
 
-    if len(vals) == 1:
-        return vals.pop()
+def common_loose(vals):
+    """Common denominator among several names.
+Loose enforcment"""
 
-    vals.discard("TYPE")
+    if isinstance(vals, str):
+        return vals
 
-    if len(vals) == 1:
-        return vals.pop()
+    key = names(vals)
+    if key in loose:
+        return loose[key]
 
-    for other in others:
-        vals.discard(other)
+    vals = set(key)
 
-    if len(vals) == 0:
-        return "TYPE"
-    elif len(vals) == 1:
-        return vals.pop()
+    if len(vals) == 1:
+        val = vals.pop()
 
-    dims_ = map(get_dim, vals)
-    if dims_:
-        dim = max(*dims_)
     else:
-        return "TYPE"
-    if dim == 2 and 1 in dims_:
-        dim = 3
+        vals.discard("TYPE")
 
-    types = map(get_mem, vals)
-    type = max(*types)
+        if len(vals) == 1:
+            val = vals.pop()
 
-    val = get_name(dim, type)
+        else:
+            vals.difference_update(others)
+
+            if len(vals) == 0:
+                val = "TYPE"
+            elif len(vals) == 1:
+                val = vals.pop()
+
+            else:
+                vals = map(code, vals)
+                dims_ = [dim_of[val] for val in vals]
+                dim = max(dims_)
+                if dim == 2 and 1 in dims_:
+                    dim = 3
+                val = table[dim][max(mem_of[val] for val in vals)]
+
+    loose[key] = val
     return val
 
 
@@ -91,36 +162,31 @@ def common_strict(vals):
     """Common denominator among several names.
 Strict enforcment"""
 
-    if not isinstance(vals, (tuple, list)) \
-            or isinstance(vals[0], int):
-        vals = [vals]
+    if isinstance(vals, str):
+        return vals
 
-    vals = list(vals)
+    key = names(vals)
+    if key in strict:
+        return strict[key]
 
-    for i in xrange(len(vals)):
-        if isinstance(vals[i], str):
-            continue
-        if isinstance(vals[i][0], int):
-            vals[i] = get_name(*vals[i])
-
-    vals = set(vals)
+    vals = set(key)
 
     if len(vals) == 1:
-        return vals.pop()
-
-    for other in others:
-        if other in vals:
-            return "TYPE"
+        val = vals.pop()
 
-    dims_ = map(get_dim, vals)
-    dim = max(*dims_)
-    if dim == 2 and 1 in dims_:
-        return "TYPE"
+    elif not others.isdisjoint(vals):
+        val = "TYPE"
 
-    types = map(get_mem, vals)
-    type = max(*types)
+    else:
+        vals = map(code, vals)
+        dims_ = [dim_of[val] for val in vals]
+        dim = max(dims_)
+        if dim == 2 and 1 in dims_:
+            val = "TYPE"
+        else:
+            val = table[dim][max(mem_of[val] for val in vals)]
 
-    val = get_name(dim, type)
+    strict[key] = val
     return val
 
 def pointer_split(name):
@@ -131,57 +197,35 @@ def pointer_split(name):
 
 
 def get_dim(val):
-
-    while val[-1] == "*":
-        val = val[:-1]
-
-    if val in dim0:     dim = 0
-    elif val in dim1:   dim = 1
-    elif val in dim2:   dim = 2
-    elif val in dim3:   dim = 3
-    elif val in dim4:   dim = 4
-    elif val in others: dim = None
-    else:
-        raise ValueError("Datatype '%s' not recognized" % val)
-    return dim
+    return dim_of[code(val)]
 
 
 def get_mem(val):
-
-    while val[-1] == "*":
-        val = val[:-1]
-
-    if val in mem0:    mem = 0
-    elif val in mem1:  mem = 1
-    elif val in mem2:  mem = 2
-    elif val in mem3:  mem = 3
-    elif val in mem4:  mem = 4
-    elif val in others: mem = None
-    else:
-        raise ValueError("Datatype '%s' not recognized" % val)
-
-    return mem
+    return mem_of[code(val)]
 
 def get_num(val):
-
-    while val[-1] == "*":
-        val = val[:-1]
-
-    if val in others:   num = False
-    else:               num = True
-
-    return num
+    try:
+        return num_of[code(val)]
+    except ValueError:
+        return True
 
 
 def get_name(dim, mem):
-    return dims[dim].intersection(mems[mem]).pop()
+    return table[dim][mem]
 
 
 def get_type(instance):
 
-    if instance.prop["type"] == "TYPE":
+    if instance.prop_type == "TYPE":
         instance = instance.declare
-    return instance.prop["type"]
+    return instance.prop_type
+
+def set_type(instance, value):
+
+    if instance.prop_type != value:
+        instance.prop_type = value
+        if ref.changes is not None:
+            ref.changes.append(instance)
 
 class Dim(object):
     """
@@ -222,7 +266,7 @@ The variable can be both read and set in real time:
 
     def __set__(self, instance, value):
         mem = get_mem(get_type(instance))
-        instance.prop["type"] = get_name(value, mem)
+        set_type(instance, get_name(value, mem))
 
 
 class Mem(object):
@@ -264,7 +308,7 @@ The variable can be both read and set in real time:
 
     def __set__(self, instance, value):
         dim = get_dim(get_type(instance))
-        instance.prop["type"] = get_name(dim, value)
+        set_type(instance, get_name(dim, value))
 
 
 class Num(object):
@@ -280,7 +324,7 @@ a boolean values which is true given that the datatype is of numerical type.
 
     def __set__(self, instance, value):
         if not value:
-            instance.prop["type"] = "TYPE"
+            set_type(instance, "TYPE")
         else:
             raise AttributeError("num can not be set True consistently")
 
@@ -340,7 +384,7 @@ inserted as placeholder through `%(type)s`.
             instance.pointer = p
         else:
             value = common_strict(value)
-        instance.prop["type"] = value
+        set_type(instance, value)
 
 
 class Suggest(object):
@@ -350,7 +394,11 @@ class Suggest(object):
     def __set__(self, instance, value):
         if value == "TYPE":
             return
-        instance.declare.prop["suggest"] = value
+        declare = instance.declare
+        if declare.prop_suggest != value:
+            declare.prop_suggest = value
+            if ref.changes is not None:
+                ref.changes.append(declare)
     def __get__(self, instance, owner):
         return supplement.suggests.get(instance)
 
@@ -0,0 +1,268 @@
+"""
+Lookup tables from node class and name to configuration and translation rules.
+
++-----------------------------------------------------+------------------------+
+| Name                                                | Description            |
++=====================================================+========================+
+| :py:data:`~matlab2cpp.dispatch.table`               | Rules from all rule    |
+|                                                     | modules by phase,      |
+|                                                     | backend, class and     |
+|                                                     | name                   |
++-----------------------------------------------------+------------------------+
+| :py:class:`~matlab2cpp.dispatch.Configuration`      | Configuration rules by |
+|                                                     | class and name         |
++-----------------------------------------------------+------------------------+
+| :py:data:`~matlab2cpp.dispatch.configuration`       | Shared instance of     |
+|                                                     | `Configuration`        |
++-----------------------------------------------------+------------------------+
+| :py:class:`~matlab2cpp.dispatch.Translation`        | Translation rules by   |
+|                                                     | backend, class and     |
+|                                                     | name, with user        |
+|                                                     | overrides              |
++-----------------------------------------------------+------------------------+
+| :py:class:`~matlab2cpp.dispatch.Rules`              | User rules, clearing   |
+|                                                     | the resolved rules of  |
+|                                                     | their `Translation`    |
+|                                                     | when changed           |
++-----------------------------------------------------+------------------------+
+| :py:func:`~matlab2cpp.dispatch.build`               | (Re)build `table` from |
+|                                                     | the rule modules       |
++-----------------------------------------------------+------------------------+
+
+The configuration rules are collected once from
+:py:mod:`~matlab2cpp.configure` into `table`, keyed by `(phase, backend, class,
+name)`. The translation rules of a backend are collected from its module in
+:py:mod:`~matlab2cpp.rules` the first time the backend is asked for (see
+:py:func:`~matlab2cpp.dispatch.load`), such that only the rule modules in use
+are imported. The phase is one of ``reserved``, ``datatype`` and ``backend`` for
+configuration, or ``translate``. Rules for all names, like ``Get`` (as opposed
+to ``Get_size``), have name None, and configuration rules have backend None.
+
+The resolved rules of a node class and name are remembered in a
+:py:class:`~matlab2cpp.dispatch.Configuration` or
+:py:class:`~matlab2cpp.dispatch.Translation`, such that applying a rule costs
+one lookup. Each project has its own translation rules in `project.translation`,
+as the user rules are passed to the :py:class:`~matlab2cpp.Builder`. The user
+rules are kept in `project.kws` as :py:class:`~matlab2cpp.dispatch.Rules`, and
+changing them clears the resolved translation rules of the project. If a rule
+module is changed at runtime, call :py:func:`~matlab2cpp.dispatch.build` for
+the change to take effect.
+
+Example:
+    >>> print load("reserved") and table["translate", "reserved", "Get",
+    ...     "size"] is mc.rules._reserved.Get_size
+    True
+    >>> print table["datatype", None, "Int", None]
+    int
+    >>> rules = Translation({"Var": "%(name)s_"})
+    >>> print rules["int", "Var", "a"], rules["int", "Int", ""]
+    %(name)s_ %(value)s
+    >>> rules.kws["Var_a"] = "%(name)s__"
+    >>> print rules["int", "Var", "a"], rules["int", "Var", "b"]
+    %(name)s__ %(name)s_
+"""
+
+import weakref
+
+import matlab2cpp as mc
+
+import configure
+import rules
+
+table = {}
+
+# resolved rules by id, cleared when the table is rebuilt
+resolved = weakref.WeakValueDictionary()
+
+
+def split(key):
+    "Split rule name `Cls_name` into class and name (None if no name)"
+    if "_" in key:
+        cls, name = key.split("_", 1)
+        return cls, name
+    return key, None
+
+
+def collect(phase, backend, module):
+    "Insert rules of `module` into `table`"
+    for key, value in module.__dict__.items():
+        if key[:1].isupper():
+            cls, name = split(key)
+            table[phase, backend, cls, name] = value
+
+
+def load(backend):
+    """
+Collect the translation rules of a backend into `table`, importing its rule
+module if needed.
+
+Args:
+    backend (str): Name of backend, like ``int`` or ``reserved``
+
+Returns:
+    bool: False if there is no rule module for the backend
+
+Example:
+    >>> print load("int"), load("none")
+    True False
+    >>> print table["translate", "int", None, None] is mc.rules._int
+    True
+    """
+
+    if ("translate", backend, None, None) in table:
+        return True
+
+    if "_" + backend not in rules.names:
+        return False
+
+    module = rules.load("_" + backend)
+    collect("translate", backend, module)
+    table["translate", backend, None, None] = module
+    return True
+
+
+def build():
+    """
+Collect rules from the configuration modules into `table`. Translation rules
+are collected again on next use, as are resolved rules.
+    """
+    table.clear()
+    for rules_ in resolved.values():
+        rules_.clear()
+
+    collect("reserved", None, configure.reserved)
+    for key, value in configure.datatypes.__dict__.items():
+        if key[:1].isupper():
+            table["datatype", None, key, None] = value
+    for key, value in configure.backends.__dict__.items():
+        if key[:1].isupper():
+            table["backend", None, key, None] = value
+
+
+class Configuration(dict):
+    """
+Reserved, datatype and backend rules by node class and name.
+
+Each item is a tuple with the three rules, where missing rules are None.
+
+Example:
+    >>> configuration = Configuration()
+    >>> reserved, datatype, backend = configuration["Var", "pi"]
+    >>> print reserved, datatype is mc.configure.datatypes.Var
+    double True
+    >>> print backend is mc.configure.backends.Var
+    True
+    """
+
+    def __init__(self):
+        dict.__init__(self)
+        resolved[id(self)] = self
+
+    def __missing__(self, key):
+        cls, name = key
+        value = self[key] = (
+                table.get(("reserved", None, cls, name)),
+                table.get(("datatype", None, cls, None)),
+                table.get(("backend", None, cls, None)))
+        return value
+
+
+class Rules(dict):
+    """
+User rules of a :py:class:`~matlab2cpp.dispatch.Translation`. Any change
+clears the rules the translation has resolved.
+
+Args:
+    kws (dict): User rules
+    translation (Translation): Rules resolved from the user rules
+    """
+
+    def __init__(self, kws, translation):
+        dict.__init__(self, kws)
+        self.translation = translation
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.translation.clear()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.translation.clear()
+
+    def clear(self):
+        dict.clear(self)
+        self.translation.clear()
+
+    def pop(self, *args):
+        value = dict.pop(self, *args)
+        self.translation.clear()
+        return value
+
+    def popitem(self):
+        value = dict.popitem(self)
+        self.translation.clear()
+        return value
+
+    def setdefault(self, key, value=None):
+        value = dict.setdefault(self, key, value)
+        self.translation.clear()
+        return value
+
+    def update(self, *args, **kws):
+        dict.update(self, *args, **kws)
+        self.translation.clear()
+
+
+class Translation(dict):
+    """
+Translation rules by backend, node class and name, with user overrides.
+
+The rule is, in order of priority, the user rule for class and name, the
+user rule for class, and the rule in the backend module for class and name
+or class. Missing rules are None.
+
+Args:
+    kws (dict): User rules, like ``{"Get_a": "...", "Var": "..."}``
+
+Attributes:
+    kws (Rules): Copy of the user rules. Changes to it take effect on the
+        next lookup.
+
+Raises:
+    KeyError: If the backend does not exist.
+    """
+
+    def __init__(self, kws):
+        dict.__init__(self)
+        self.kws = Rules(kws, self)
+        resolved[id(self)] = self
+
+    def __missing__(self, key):
+        backend, cls, name = key
+        kws = self.kws
+
+        value = kws.get(cls+"_"+name, None)
+        if value is None:
+            value = kws.get(cls, None)
+
+        if value is None:
+            if ("translate", backend, None, None) not in table and\
+                    not load(backend):
+                raise KeyError("_" + backend)
+
+            value = table.get(("translate", backend, cls, name))
+            if value is None:
+                value = table.get(("translate", backend, cls, None))
+
+        self[key] = value
+        return value
+
+
+build()
+
+# Configuration rules shared by all projects
+configuration = Configuration()
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
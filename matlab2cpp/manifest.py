@@ -0,0 +1,239 @@
+"""
+Record of converted files, used to convert only what changed since last run.
+
++-------------------------------------------------+------------------------------+
+| Name                                            | Description                  |
++=================================================+==============================+
+| :py:class:`~matlab2cpp.manifest.Manifest`       | Hashes of inputs of each     |
+|                                                 | program from the last run    |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.manifest.digest`          | Hash of file content         |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.manifest.signatures`      | Datatypes of each program    |
+|                                                 | and the programs it calls    |
++-------------------------------------------------+------------------------------+
+
+With ``mconvert --incremental`` the manifest is stored as JSON next to the
+main file, as `<filename>.manifest`. For each program, it holds the hash of
+the Matlab file, of its supplement file `<filename>.py` and a key combining
+those with the options and the datatypes of the program and its callees (see
+:py:func:`~matlab2cpp.manifest.signatures`).
+
+A run checks the manifest twice:
+
+* Before loading anything: if no recorded file has changed, no dependency has
+  appeared and the options are the same, there is nothing to do.
+* After configuration: programs with the same key as last time, and with their
+  output files in place, are neither translated nor written.
+
+Example:
+    >>> import tempfile, os
+    >>> folder = tempfile.mkdtemp()
+    >>> filename = os.path.join(folder, "prg.m")
+    >>> open(filename, "w").write("a = 1")
+    >>> manifest = Manifest(filename + ".manifest", "options")
+    >>> print manifest.current()
+    False
+    >>> manifest.update(filename, "key", [filename])
+    >>> manifest.save()
+    >>> manifest = Manifest(filename + ".manifest", "options")
+    >>> print manifest.current(), manifest.fresh(filename, "key")
+    True True
+    >>> open(filename, "w").write("a = 2")
+    >>> print manifest.current()
+    False
+"""
+
+import os
+import json
+import hashlib
+
+import matlab2cpp as mc
+
+
+def digest(filename):
+    """
+Hash of file content.
+
+Args:
+    filename (str): Path to file
+
+Returns:
+    str, None: Hexadecimal SHA-1 hash, or None if the file does not exist
+    """
+    if not os.path.isfile(filename):
+        return None
+    f = open(filename, "rb")
+    value = hashlib.sha1(f.read()).hexdigest()
+    f.close()
+    return value
+
+
+def signatures(project):
+    """
+Datatypes of each program, together with those of the programs it calls.
+
+Args:
+    project (Project): Configured project
+
+Returns:
+    dict: Program name to JSON string of datatypes
+    """
+
+    own = {}
+    funcs = {}
+    for program in project:
+        own[program.name] = json.dumps([program.ftypes, program.stypes,
+            program.itypes], sort_keys=True)
+        for func in program[1]:
+            funcs.setdefault(func.name, program.name)
+
+    out = {}
+    for program in project:
+
+        names = set(node.name for node in program.flatten(False, False, False))
+        callees = sorted(set(funcs[name] for name in names
+            if name in funcs and funcs[name] != program.name))
+
+        out[program.name] = json.dumps([own[program.name]] +
+                [[name, own[name]] for name in callees])
+
+    return out
+
+
+class Manifest(object):
+    """
+Hashes of the inputs of each program from the last run.
+
+Args:
+    path (str): Path to manifest file
+    options (str): Description of the options that change the output
+
+Attributes:
+    path (str): Path to manifest file
+    options (str): Options of this run
+    programs (dict): Program name to hashes of Matlab file, supplement file
+        and key
+    missing (list): Paths where dependencies were searched for but not found
+    """
+
+    def __init__(self, path, options):
+
+        self.path = path
+        self.options = options
+        self.programs = {}
+        self.missing = []
+        self.previous = None
+
+        if os.path.isfile(path):
+            try:
+                f = open(path)
+                data = json.load(f)
+                f.close()
+            except ValueError:
+                data = {}
+
+            if data.get("version") == mc.__version__:
+                self.previous = data.get("options")
+                self.programs = data.get("programs", {})
+                self.missing = data.get("missing", [])
+
+    def key(self, name, signature):
+        """
+Key of a program, changing with its inputs.
+
+Args:
+    name (str): Path to Matlab file
+    signature (str): Datatypes of program and its callees
+
+Returns:
+    str: Hexadecimal SHA-1 hash
+        """
+        value = hashlib.sha1()
+        for part in (mc.__version__, self.options, digest(name),
+                digest(name + ".py"), signature):
+            value.update(repr(part))
+        return value.hexdigest()
+
+    def current(self):
+        """
+Check if no input has changed since last run.
+
+Returns:
+    bool: True if the options are the same, every recorded file is unchanged
+    and none of the missing dependencies exist
+        """
+        if not self.programs or self.previous != self.options:
+            return False
+
+        for name, entry in self.programs.items():
+            if digest(name) != entry["source"] or\
+                    digest(name + ".py") != entry["supplement"]:
+                return False
+            for output in entry["outputs"]:
+                if not os.path.isfile(output):
+                    return False
+
+        for name in self.missing:
+            if os.path.isfile(name):
+                return False
+
+        return True
+
+    def fresh(self, name, key):
+        """
+Check if a program can be skipped.
+
+Args:
+    name (str): Path to Matlab file
+    key (str): Key of program, see `key`
+
+Returns:
+    bool: True if the key is the same as last run and the outputs from last
+    run exist
+        """
+        if self.previous != self.options:
+            return False
+        entry = self.programs.get(name)
+        if entry is None or entry["key"] != key:
+            return False
+        for output in entry["outputs"]:
+            if not os.path.isfile(output):
+                return False
+        return True
+
+    def update(self, name, key, outputs):
+        """
+Record a program after its files are written.
+
+Args:
+    name (str): Path to Matlab file
+    key (str): Key of program, see `key`
+    outputs (list): Output files written
+        """
+        self.programs[name] = {"source": digest(name),
+                "supplement": digest(name + ".py"), "key": key,
+                "outputs": outputs}
+
+    def save(self, names=None):
+        """
+Write manifest to file.
+
+Args:
+    names (list, optional): Programs of this run. Others are forgotten.
+        """
+        programs = self.programs
+        if names is not None:
+            programs = dict((name, programs[name]) for name in names
+                    if name in programs)
+
+        data = {"version": mc.__version__, "options": self.options,
+                "programs": programs, "missing": sorted(set(self.missing))}
+        f = open(self.path, "w")
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
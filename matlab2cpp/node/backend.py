@@ -3,14 +3,19 @@ import os
 from os.path import sep
 
 import reference
+import template
+import rope
 import matlab2cpp
-import matlab2cpp.m2cpp
-import matlab2cpp.pyplot
 
 def flatten(node, ordered=False, reverse=False, inverse=False):
     """
 Backend for the :py:func:`~matlab2cpp.Node.flatten` function.
 
+The result is cached in the node, such that repeated calls on an unchanged
+tree do not traverse it again. The cache is dropped when a children list in
+the subtree changes (see :py:class:`~matlab2cpp.node.reference.Children`), and
+is not pickled.
+
 Args:
     node (Node): Root node to start from
     ordered (bool): If True, make sure the nodes are hierarcically ordered.
@@ -21,36 +26,71 @@ See also:
     :py:func:`~matlab2cpp.Node.flatten`
     """
 
+    key = (bool(ordered), bool(reverse), bool(inverse))
+
+    cache = getattr(node, "_flatten", None)
+    if cache is None:
+        cache = node._flatten = {}
+
+    out = cache.get(key)
+    if out is None:
+        out = cache[key] = list(walk(node, *key))
+
+    return out[:]
+
+
+def walk(node, ordered=False, reverse=False, inverse=False):
+    """
+Backend for the :py:func:`~matlab2cpp.Node.walk` function.
+
+Args:
+    node (Node): Root node to start from
+    ordered (bool): If True, make sure the nodes are hierarcically ordered.
+    reverse (bool): If True, children are itterated in reverse order.
+    inverse (bool): If True, tree is itterated in reverse order.
+
+Yields:
+    Node: nodes in the same order as :py:func:`~matlab2cpp.node.backend.flatten`
+
+See also:
+    :py:func:`~matlab2cpp.Node.walk`
+    """
+
     o = bool(ordered)
     r = bool(reverse)
     i = bool(inverse)
 
-    out = []
-
     if o:
 
         nodes = [node]
         for node in nodes:
             nodes.extend(node.children[::1-2*(r ^ i)])
-        out.extend(nodes[::1-2*i])
-
-    else:
 
         if i:
-            def foo(node):
-                for child in node[::1-2*r]:
-                    foo(child)
-                out.append(node)
+            nodes.reverse()
+        for node in nodes:
+            yield node
 
-        else:
-            def foo(node):
-                out.append(node)
-                for child in node[::1-2*r]:
-                    foo(child)
+    elif i:
 
-        foo(node)
+        # children pushed in the opposite order they are visited
+        stack = [(node, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                yield node
+            else:
+                stack.append((node, True))
+                for child in node.children[::2*r-1]:
+                    stack.append((child, False))
 
-    return out
+    else:
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children[::2*r-1])
 
 
 def summary(node, opt):
@@ -196,7 +236,7 @@ See also:
 
     # Place Assign correctly in Block
     i = block.children.index(line)
-    block.children = block[:i] + block[-1:] + block[i:-1]
+    block.children[:] = block[:i] + block[-1:] + block[i:-1]
 
     # Swap node and Var
     index = node.parent.children.index(node)
@@ -248,7 +288,7 @@ See also:
     i = line.parent.children.index(line)
 
     ps = line.parent.children
-    line.parent.children = ps[:i] + ps[-1:] + ps[i:-1]
+    ps[:] = ps[:i] + ps[-1:] + ps[i:-1]
 
     resize.translate(False, only=True)
 
@@ -269,19 +309,13 @@ See also:
 
     msg = msg % node.properties()
 
+    lines = node.program.lines
     code = node.program.code
     cur = node.cur
     end = cur+len(node.code)
 
-    start = cur
-    while code[start] != "\n" and start != 0:
-        start -= 1
-
-    if end >= len(code):
-        end = len(code)-1
-    finish = end
-    while code[finish] != "\n" and finish != len(code)-1:
-        finish += 1
+    start = max(lines.rfind(cur+1), 0)
+    finish = min(lines.find(end), len(code)-1)
     code = code[start:finish]
 
     pos = cur-start
@@ -290,7 +324,7 @@ See also:
 
     errors = node.program[5]
 
-    if name in errors.names:
+    if name in errors:
         return
 
     if onlyw:
@@ -332,21 +366,21 @@ Returns:
         else:
             struct = structs[node]
 
-        if value in struct.names:
-            return struct[struct.names.index(value)]
+        if value in struct:
+            return struct[value]
 
         declares = node.func[0]
 
         if node.cls in ("Sset", "Sget"):
             sname = "_size"
-            if sname not in struct.names:
+            if sname not in struct:
                 matlab2cpp.collection.Counter(struct, sname, value="100")
 
-            if node.name not in declares.names:
+            if node.name not in declares:
                 var = matlab2cpp.collection.Var(declares, name=node.name, value=value)
                 var.type="structs"
         else:
-            if node.name not in declares.names:
+            if node.name not in declares:
                 var = matlab2cpp.collection.Var(declares, name=node.name, value=value)
                 var.type="struct"
 
@@ -550,7 +584,11 @@ See also:
 
     if mid_translation[0] == 0:
         log = node.program[5]
-        log.children = []
+        del log.children[:]
+
+        # warnings from configuration
+        for var, msg in node.program.unstable:
+            var.warning(msg)
 
     mid_translation[0] += 1
 
@@ -583,36 +621,18 @@ See also:
     :py:func:`~matlab2cpp.Node.translate`
     """
 
-    # e.g. Get_a from user
-    value = node.program.parent.kws.get(node.cls+"_"+node.name, None)
+    backend = node.backend
+    if backend == "TYPE":
+        backend = "unknown"
 
-    # e.g. Get from user
-    if value is None:
-        value = node.program.parent.kws.get(node.cls, None)
+    # e.g. Get_a or Get, from user or backend module
+    value = node.project.translation[backend, node.cls, node.name]
 
     if value is None:
-        
-        backend = node.backend
-        if backend == "TYPE":
-            backend = "unknown"
-
-        target = matlab2cpp.rules.__dict__["_"+backend]
-        spesific_name = node.cls + "_" + node.name
-
-        # e.g. Get_a (reserved typically)
-        if spesific_name in target.__dict__:
-            value = target.__dict__[spesific_name]
-
-        # e.g. Get (normal behavior)
-        elif node.cls in target.__dict__:
-            value = target.__dict__[node.cls]
-
-        else:
-            print node.program.summary()
-            raise KeyError(
-                    "Expected to find rule for '%s' in the file '_%s.py'" %\
-                            (node.cls, node.backend))
-
+        print node.program.summary()
+        raise KeyError(
+                "Expected to find rule for '%s' in the file '_%s.py'" %\
+                        (node.cls, node.backend))
 
     # let rule create a translation
     if not isinstance(value, (unicode, str, list, tuple)):
@@ -628,42 +648,20 @@ See also:
 
     node.ret = repr(value)
 
-    # interpolate tuples/lists
-    if not isinstance(value, str):
-
-        value = list(value)
-        children = ["%("+str(i)+")s" for i in xrange(len(node))]
-
-        if len(value) == 2:
-            value.insert(1, "")
-
-        value = value[:-1] + [value[-2]] *\
-            (len(children)-len(value)+1) + value[-1:]
-
-        if len(children) == 0:
-            value = value[0] + value[-1]
-
-        elif len(children) == 1:
-            value = value[0] + children[0] + value[-1]
-
-        else:
-
-            out = value[0]
-            for i in xrange(len(children)):
-                out += children[i] + value[i+1]
-            value = out
-
-    # interperlate string
+    # interpolate string, or tuples/lists with the translation of children
+    compiled = template.get(value, len(node))
+    # missing properties raise KeyError, malformed interpolation strings
+    # TypeError or ValueError
     try:
-        value = value % node.properties()
-    except:
+        value = compiled(node)
+    except (KeyError, TypeError, ValueError):
         raise SyntaxError("interpolation in " + node.backend + "." +\
-                node.cls + " is misbehaving\n'" + value + "'\n" +\
+                node.cls + " is misbehaving\n'" + compiled.text + "'\n" +\
                 str(node.prop)  + "\nCrash on line " + str(node.line) +\
                 ":\n" + node.code)
 
     if node.cls in ("Assign", "Assigns", "Statement") and node.project.builder.original:
-        value = "// " + node.code + "\n" + value
+        value = "// " + node.code + "\n" + rope.text(value)
         value = value.replace("%", "__percent__")
     node.str = value
 
@@ -704,8 +702,9 @@ See also:
 
                 #if mconvert.h not found in directory, create the file
                 if not os.path.isfile(output_file_path):
+                    from matlab2cpp import pyplot
                     f = open(output_file_path, "w")
-                    f.write(matlab2cpp.pyplot.code)
+                    f.write(pyplot.code)
                     f.close()
             except:
                 pass
@@ -722,8 +721,9 @@ See also:
 
                 #if mconvert.h not found in directory, create the file
                 if not os.path.isfile(output_file_path):
+                    from matlab2cpp import m2cpp
                     f = open(output_file_path, "w")
-                    f.write(matlab2cpp.m2cpp.code)
+                    f.write(m2cpp.code)
                     f.close()
             except:
                 pass
@@ -740,7 +740,7 @@ See also:
             include_code = ""
 
     includes = node.program[0]
-    if include_code and include_code not in includes.names:
+    if include_code and include_code not in includes:
         include = matlab2cpp.collection.Include(includes, include_code,
                 value=includes.value)
         include.backend="program"
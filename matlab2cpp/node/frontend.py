@@ -5,6 +5,23 @@ import matlab2cpp.datatype as dt
 import matlab2cpp.supplement as sup
 import matlab2cpp as mc
 
+
+# pickled slots of each node class, see Node.__getstate__
+slotnames = {}
+
+
+class Slots(type):
+    """
+Metaclass giving every node class empty `__slots__`, unless the class
+defines its own. This keeps the node classes in
+:py:mod:`matlab2cpp.collection` free of per-instance dictionaries.
+    """
+
+    def __new__(cls, name, bases, namespace):
+        namespace.setdefault("__slots__", ())
+        return type.__new__(cls, name, bases, namespace)
+
+
 class Node(object):
     """
 A representation of a node in a node tree.
@@ -17,7 +34,8 @@ Attributes:
         in the  string format as `%(0)s`, `%(1)s`, ...
     cls (str): A string representation of the class name. Avalable  in the
         string format as `%(class)s`
-    code (str): The code that concived this node.
+    code (str): The code that concived this node. Sliced from the program
+        code on access if only `span` is stored.
     cur (int): The index to the position in the code where this  node was
         concived. It takes the value 0 for nodes  not created from code.
     declare (Node): A reference to the node of same name where it is  defined.
@@ -54,6 +72,10 @@ Attributes:
     pointer (int): A numerical value of the reference count. The value  0 imply
         that the node refer to the actual variable,  1 is a reference to the
         variable, 2 is a reference  of references, and so on.
+    prop (dict): Dictionary view of the node properties. The common
+        properties are stored in fixed slots (`prop_type`, `prop_name`, ...),
+        while other keys are kept in `prop_extra`. See
+        :py:class:`~matlab2cpp.node.reference.Prop`.
     program (Node): A reference to program ancestor. Uses root if not  found.
     project (Node): A reference to root node.
     reference (Node): If node is a lambda function (backend  `func_lambda`),
@@ -66,6 +88,8 @@ Attributes:
         leaf to root, and parents will not be  translated before after current
         node is translated.  Current and all ancestors will have an empty
         string.
+    span (tuple): Offsets (start, end) of the node code in the program code,
+        or None if the code is stored explicitly or inherited.
     stypes (dict): Input/Output struct scoped datatypes.
     suggest (str): A short string representation of the suggested  datatype. It
         is used for suggesting datatype in  general, and can only be assigned,
@@ -78,22 +102,31 @@ Attributes:
         node to node.  Available in the string  format as `%(value)s`.
     vtypes (dict): Verbatim translation in tree (read-only)
     """
+    __metaclass__ = Slots
+    __slots__ = ("children", "parent", "prop_extra", "reference",
+            "_declare", "_end", "_flatten", "_func", "_group", "_line",
+            "_program", "_project", "_start") +\
+                    tuple(sorted(ref.fields.values()))
+
+    prop = ref.Prop_reference()
+
     backend = ref.Property_reference("backend")
 
-    cls = ref.Property_reference("class")
-    code = ref.Recursive_property_reference("code")
+    cls = ref.Class_reference()
+    code = ref.Code_reference()
     cur = ref.Recursive_property_reference("cur")
 
     dim = dt.Dim()
     file = ref.Recursive_property_reference("file")
     line = ref.Line_reference()
     mem = dt.Mem()
-    name = ref.Property_reference("name")
+    name = ref.Name_reference()
     names = ref.Names()
     num = dt.Num()
     pointer = ref.Property_reference("pointer")
     ret = ref.Property_reference("ret")
-    str = ref.Property_reference("str")
+    span = ref.Span_reference()
+    str = ref.Str_reference()
     suggest = dt.Suggest()
     type = dt.Type()
     value = ref.Property_reference("value")
@@ -110,7 +143,7 @@ Attributes:
     vtypes = sup.Vtypes()
 
     def __init__(self, parent=None, name="", value="", pointer=0,
-            line=None, cur=None, code=None):
+            line=None, cur=None, code=None, span=None):
         """
 Keyword Args:
     code (str): source code
@@ -119,16 +152,26 @@ Keyword Args:
     name (str): Optional name of the node
     parent (Node): Node parent in the Node tree
     pointer (int): is reference to object (not currently used)
+    span (tuple): Offsets (start, end) of source code in program code. Used
+        instead of `code` to avoid copying the source.
     str (str): Translation content
     value (str): Default node content placeholder
         """
-        self.children = []
-        self.prop = {"type":"TYPE", "suggest":"TYPE",
-                "value":value, "str":"", "name":name,
-                "pointer":pointer, "backend":"unknown",
-                "line":line, "cur":cur, "code":code,
-                "ret":"",
-                "class":self.__class__.__name__}
+        self.children = ref.Children(node=self)
+        self.prop_type = self.prop_suggest = "TYPE"
+        self.prop_value = value
+        self.prop_str = self.prop_ret = ""
+        self.prop_name = name
+        self.prop_pointer = pointer
+        self.prop_backend = "unknown"
+        self.prop_line = line
+        self.prop_cur = cur
+        self.prop_code = code
+        self.prop_extra = None
+        if span is None:
+            self._start = self._end = None
+        else:
+            self._start, self._end = span
 
         # Parental relationship
         self.parent = parent
@@ -138,6 +181,27 @@ Keyword Args:
         else:
             parent.children.append(self)
 
+    def __getstate__(self):
+        "Slot values for pickling, without cached traversals"
+        cls = self.__class__
+        names = slotnames.get(cls)
+        if names is None:
+            names = slotnames[cls] = [name for base in cls.__mro__
+                    for name in base.__dict__.get("__slots__", ())
+                    if name != "_flatten"]
+
+        state = {}
+        for name in names:
+            try:
+                state[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
+
 
     def summary(self, args=None):
         """
@@ -231,13 +295,13 @@ Example:
         """
 
         prop = self.prop.copy()
-        for key in self.prop:
+        for key in prop:
             if prop[key] is None and hasattr(self, key):
                 prop[key] = getattr(self, key)
 
         I = len(self.children)
         for i in xrange(I):
-            prop[str(i)] = prop["-"+str(I-i)] = self[i].prop["str"]
+            prop[str(i)] = prop["-"+str(I-i)] = self[i].str
         return prop
 
 
@@ -413,9 +477,10 @@ Examples:
             i = i.name
 
         if isinstance(i, str):
-            if i not in self.names:
+            child = ref.lookup(self, i)
+            if child is None:
                 raise IndexError("node child \"%s\" not found" % i)
-            i = self.names.index(i)
+            return child
 
         if isinstance(i, int):
 
@@ -438,8 +503,8 @@ Test if (Node with) name ``i`` is contained in code.
         """
 
         if isinstance(i, str):
-            return i in self.names
-        return i.name in self.names
+            return ref.lookup(self, i) is not None
+        return ref.lookup(self, i.name) is not None
 
     def __setitem__(self, key, val):
         self.prop[key] = val
@@ -498,9 +563,39 @@ Args:
 
 Return:
     list: All nodes in a flatten list.
+
+See also:
+    :py:func:`~matlab2cpp.Node.walk`
         """
         return backend.flatten(self, ordered, reverse, inverse)
 
+    def walk(self, ordered=False, reverse=False, inverse=False):
+        """
+Iterate over all nodes in the same order as
+:py:func:`~matlab2cpp.Node.flatten`, without creating the full list.
+
+The tree structure should not be changed while iterating. Use
+:py:func:`~matlab2cpp.Node.flatten` if it is.
+
+Args:
+    ordered (bool): If True, make sure the nodes are hierarcically ordered.
+    reverse (bool): If True, children are itterated in reverse order.
+    inverse (bool): If True, tree is itterated in reverse order.
+
+Return:
+    generator: All nodes
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("unnamed.m", "a = b")
+    >>> block = builder[0][1][0][3]
+    >>> print [node.cls for node in block.walk()]
+    ['Block', 'Assign', 'Var', 'Var']
+    >>> print [node.name for node in block.walk(False, True, True)]
+    ['b', 'a', 'b', '']
+        """
+        return backend.walk(self, ordered, reverse, inverse)
+
     def plotting(self):
         """
 Prepare the code for plotting functionality.
@@ -7,6 +7,11 @@ to by `node.name`.  Another example is to access the parent node by
 Note that, if a reference does not exist, the node itself will be returned.
 """
 
+import os
+
+import matlab2cpp as mc
+import rope
+
 groups = [
     "Assign", "Assigns", "Branch", "For", "Func", "Main",
     "Set", "Cset", "Fset", "Nset", "Sset",
@@ -18,39 +23,491 @@ groups = [
 nondeclares = ("Program", "Project", "Include", "Includes", "Struct", "Structs")
 structvars = ("Fvar", "Fget", "Fset", "Nget", "Nset", "Sget", "Sset")
 
+# Node properties stored in fixed fields, mapped to their slot names
+keys = ("type", "suggest", "value", "str", "name", "pointer", "backend",
+        "line", "cur", "code", "ret")
+fields = dict((key, "prop_"+key) for key in keys)
+
+# While configuring, nodes are appended here when one of their properties
+# change through the node frontends (see matlab2cpp.configure.worklist)
+changes = None
+
+
+class Prop(object):
+    """
+Dictionary view of node properties. The fixed properties (see `fields`) are
+stored in the node slots, while the class name comes from the node class.
+Any other key is stored in the node's `prop_extra` dictionary.
+
+Args:
+    node (Node): The node to view
+
+Example:
+    >>> node = mc.Var(None, "a")
+    >>> prop = node.prop
+    >>> print prop["name"], prop["class"], "rows" in prop
+    a Var False
+    >>> prop["rows"] = 2; node.name = "b"
+    >>> print prop["name"], prop["rows"], prop.get("cols"), len(prop)
+    b 2 None 13
+    """
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    def __getitem__(self, key):
+        if key == "code":
+            return own_code(self.node)
+        if key == "str":
+            return rope.text(self.node.prop_str)
+        field = fields.get(key)
+        if field:
+            return getattr(self.node, field)
+        extra = self.node.prop_extra
+        if extra and key in extra:
+            return extra[key]
+        if key == "class":
+            return self.node.__class__.__name__
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        field = fields.get(key)
+        if key == "name":
+            self.node.name = value
+            return
+        if changes is not None and self.get(key) != value:
+            changes.append(self.node)
+        if field:
+            setattr(self.node, field, value)
+        elif self.node.prop_extra is None:
+            self.node.prop_extra = {key: value}
+        else:
+            self.node.prop_extra[key] = value
+
+    def __contains__(self, key):
+        return key in fields or key == "class" or\
+                bool(self.node.prop_extra) and key in self.node.prop_extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self):
+        return self.copy().keys()
+
+    def items(self):
+        return self.copy().items()
+
+    def values(self):
+        return self.copy().values()
+
+    def copy(self):
+        node = self.node
+        out = {"type":node.prop_type, "suggest":node.prop_suggest,
+                "value":node.prop_value, "str":rope.text(node.prop_str),
+                "name":node.prop_name, "pointer":node.prop_pointer,
+                "backend":node.prop_backend, "line":node.prop_line,
+                "cur":node.prop_cur, "code":own_code(node),
+                "ret":node.prop_ret, "class":node.__class__.__name__}
+        if node.prop_extra:
+            out.update(node.prop_extra)
+
+        # same key order as a copy of the original property dictionary
+        return out.copy()
+
+
+class Children(list):
+    """
+List of node children with an index from name to first child of that name.
+
+The index is created on the first lookup and updated on `append`. It is
+rebuilt on the next lookup after any other change to the list or after a child
+is renamed.
+
+Every change to a children list drops the cached traversals (see
+:py:func:`~matlab2cpp.node.backend.flatten`) of the node owning the list and
+of its ancestors. Replace the content of a children list through slicing
+(``node.children[:] = nodes``) rather than assigning a new list, to keep the
+caches in sync.
+
+Args:
+    items (list): Initial children
+    node (Node, optional): Node owning the list
+
+Example:
+    >>> declares = mc.collection.Declares(None)
+    >>> a = mc.Var(declares, "a"); b = mc.Var(declares, "b")
+    >>> print declares.children.lookup("b") is b, "c" in declares
+    True False
+    >>> b.name = "c"
+    >>> print declares["c"] is b, declares.children.lookup("b")
+    True None
+    """
+    __slots__ = ("names", "node")
+
+    def __init__(self, items=(), node=None):
+        list.__init__(self, items)
+        self.names = None
+        self.node = node
+
+    def __reduce__(self):
+        return (Children, (list(self), self.node))
+
+    def changed(self):
+        "Drop cached traversals of owner node and its ancestors"
+        node = self.node
+        while node is not None:
+            node._flatten = None
+            parent = node.parent
+            if parent is node:
+                break
+            node = parent
+
+    def lookup(self, name):
+        "First child with name `name`, or None if not found"
+        names = self.names
+        if names is None:
+            names = {}
+            for child in self:
+                if child.prop_name not in names:
+                    names[child.prop_name] = child
+            self.names = names
+        return names.get(name)
+
+    def append(self, node):
+        list.append(self, node)
+        self.changed()
+        if self.names is not None and node.prop_name not in self.names:
+            self.names[node.prop_name] = node
+
+    def _changing(method):
+        def changing(self, *args):
+            self.names = None
+            self.changed()
+            return method(self, *args)
+        changing.__name__ = method.__name__
+        return changing
+
+    extend = _changing(list.extend)
+    insert = _changing(list.insert)
+    pop = _changing(list.pop)
+    remove = _changing(list.remove)
+    reverse = _changing(list.reverse)
+    sort = _changing(list.sort)
+    __setitem__ = _changing(list.__setitem__)
+    __delitem__ = _changing(list.__delitem__)
+    __setslice__ = _changing(list.__setslice__)
+    __delslice__ = _changing(list.__delslice__)
+    __iadd__ = _changing(list.__iadd__)
+    del _changing
+
+
+def lookup(node, name):
+    """
+First child of `node` with name `name`.
+
+Args:
+    node (Node): Parent node
+    name (str): Name of child
+
+Returns:
+    Node, None: The child, or None if not found.
+    """
+    children = node.children
+    if isinstance(children, Children):
+        return children.lookup(name)
+    for child in children:
+        if child.prop_name == name:
+            return child
+    return None
+
+
+class Symbols(object):
+    """
+Function definitions of a project by name, for resolving function calls.
+
+A call is resolved, in order, to an anonymous function of the program (named
+``_name``), a function in the program, or the first function in another
+program of the project with the file name ``name.m``. The programs by file
+name are indexed on first use, and indexed again when programs are loaded,
+removed or renamed. As with :py:class:`Children`, a change is detected
+through the name index of the project children, which is replaced on every
+change but `append`, together with the number of programs.
+
+Args:
+    project (Node): Project root
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function y=f(x); y=x+1")
+    >>> builder.load("g.m", "function y=g(x); y=f(x)")
+    >>> symbols = builder.project.symbols
+    >>> print symbols.find("f", builder[1]).program.name
+    f.m
+    >>> print symbols.find("f", builder[0]).program.name
+    f.m
+    >>> print symbols.find("h", builder[0])
+    None
+    >>> builder.load("h.m", "function h(); a=1")
+    >>> print symbols.find("h", builder[0]).program.name
+    h.m
+    """
+    __slots__ = ("project", "names", "size", "files")
+
+    def __init__(self, project):
+        self.project = project
+        self.names = None
+        self.size = 0
+        self.files = {}
+
+    def index(self):
+        "Programs by file name without extension, indexed again if changed"
+
+        children = self.project.children
+        if children.names is None:
+            children.lookup(None)
+
+        if children.names is not self.names or len(children) != self.size:
+
+            files = {}
+            for program in children:
+                name = os.path.basename(program.prop_name)
+                if name[-2:] == ".m":
+                    files.setdefault(name[:-2], []).append(program)
+
+            self.files = files
+            self.names = children.names
+            self.size = len(children)
+
+        return self.files
+
+    def local(self, name, program):
+        """
+Function defined in a program.
+
+Args:
+    name (str): Function name
+    program (Node): Program searched
+
+Returns:
+    Node, None: Anonymous function or function, or None if not found
+        """
+        funcs = program[1]
+        func = lookup(funcs, "_" + name)
+        if func is None:
+            func = lookup(funcs, name)
+        return func
+
+    def external(self, name, program=None):
+        """
+Function of another program in the project, called by file name.
+
+Args:
+    name (str): Function name
+    program (Node, optional): Program calling the function, never used as
+        the external program
+
+Returns:
+    Node, None: First function of the program, or None if not found
+        """
+        for other in self.index().get(name, ()):
+            if other is not program:
+                return other[1][0]
+        return None
+
+    def find(self, name, program):
+        """
+Function called by name from a program.
+
+Args:
+    name (str): Function name
+    program (Node): Program calling the function
+
+Returns:
+    Node, None: Function definition, or None if not found
+        """
+        func = self.local(name, program)
+        if func is None:
+            func = self.external(name, program)
+        return func
+
+
+class Name_reference(object):
+    "name of node, kept in sync with parent's name index"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.prop_name
+
+    def __set__(self, instance, value):
+        if changes is not None and instance.prop_name != value:
+            changes.append(instance)
+        instance.prop_name = value
+        parent = instance.parent
+        if parent is not None and isinstance(parent.children, Children):
+            parent.children.names = None
+
+
+class Prop_reference(object):
+    "dictionary view of node properties"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return Prop(instance)
+
+
 class Property_reference(object):
     "general property node"
 
     def __init__(self, name, default=None):
         self.name = name
+        self.field = fields.get(name)
 
     def __get__(self, instance, owner):
+        if self.field:
+            return getattr(instance, self.field)
         return instance.prop[self.name]
 
     def __set__(self, instance, value):
-        instance.prop[self.name] = value
+        if self.field:
+            if changes is not None and getattr(instance, self.field) != value:
+                changes.append(instance)
+            setattr(instance, self.field, value)
+        else:
+            instance.prop[self.name] = value
+
+
+class Str_reference(object):
+    """
+Translation of node. Translations stored as ropes (see
+:py:mod:`~matlab2cpp.node.rope`) are put together into strings.
+
+Example:
+    >>> var = mc.collection.Var(None, "a")
+    >>> var.str = mc.node.rope.Rope(["a", "_"])
+    >>> print var.str, var.prop["str"]
+    a_ a_
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return rope.text(instance.prop_str)
+
+    def __set__(self, instance, value):
+        instance.prop_str = value
+
+
+class Class_reference(object):
+    "class name of node"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        extra = instance.prop_extra
+        if extra and "class" in extra:
+            return extra["class"]
+        return instance.__class__.__name__
+
+    def __set__(self, instance, value):
+        instance.prop["class"] = value
+
 
 class Recursive_property_reference(object):
     "recursive property node"
 
     def __init__(self, name):
         self.name = name
+        self.field = fields.get(name)
 
     def __get__(self, instance, owner):
 
-        a = instance.prop[self.name]
+        if self.field:
+            a = getattr(instance, self.field)
+        else:
+            a = instance.prop[self.name]
         if not (a is None):
             return a
 
         assert not (instance is instance.parent)
 
         a = Recursive_property_reference.__get__(self, instance.parent, owner)
-        instance.prop[self.name] = a
+        self.__set__(instance, a)
 
         return a
 
     def __set__(self, instance, value):
-        instance.prop[self.name] = value
+        if self.field:
+            setattr(instance, self.field, value)
+        else:
+            instance.prop[self.name] = value
+
+def own_code(node):
+    "Code of node itself without falling back to its parent, or None"
+    code = node.prop_code
+    if code is None and node._end is not None:
+        code = node.program.prop_code[node._start:node._end]
+    return code
+
+
+class Code_reference(object):
+    """
+Matlab code of node. Nodes created by the builder only store the offsets of
+their code in the program source (see `Span_reference`), and the code is
+sliced out when asked for. Code set explicitly takes precedence. Nodes with
+neither use the code of their parent.
+
+Example:
+    >>> program = mc.collection.Program(None, "prg.m", code="a = b+1")
+    >>> var = mc.collection.Var(program, "b", span=(4, 5))
+    >>> print var.code, var.span, var.prop_code
+    b (4, 5) None
+    >>> print mc.collection.Int(var, "1").code
+    b
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        code = own_code(instance)
+        if code is not None:
+            return code
+        assert not (instance is instance.parent)
+        return instance.parent.code
+
+    def __set__(self, instance, value):
+        instance.prop_code = value
+
+
+class Span_reference(object):
+    "offsets (start, end) of node code in program source, or None"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if instance._end is None:
+            return None
+        return instance._start, instance._end
+
+    def __set__(self, instance, value):
+        if value is None:
+            instance._start = instance._end = None
+        else:
+            instance._start, instance._end = value
+
 
 class Line_reference(object):
 
@@ -72,7 +529,7 @@ class Line_reference(object):
             if pcur == cur:
                 line = pline
             else:
-                line = pline + instance.program.code.count("\n", pcur, cur)
+                line = pline + instance.program.lines.count(pcur or 0, cur)
 
         instance._line = line
         return line
@@ -141,7 +598,7 @@ class Project_reference(object):
 
 class Names(object):
     def __get__(self, instance, owner):
-        return [i.prop["name"] for i in instance.children]
+        return [i.prop_name for i in instance.children]
 
 
 class Declare_reference(object):
@@ -166,15 +623,14 @@ class Declare_reference(object):
             else:
                 value = instance.value
 
-            if instance not in instance.program[3]:
+            struct = lookup(instance.program[3], instance.name)
+            if struct is None:
                 return instance
 
-            struct = instance.program[3][instance]
-
-            if value not in struct.names:
+            out = lookup(struct, value)
+            if out is None:
                 return instance
 
-            out = struct[struct.names.index(value)]
             instance._declare = out
             return out
 
@@ -183,13 +639,12 @@ class Declare_reference(object):
 
         else:
 
-            if instance in instance.func[0]:
-                out = instance.func[0][instance]
-                instance._declare = out
-                return out
+            func = instance.func
+            out = lookup(func[0], instance.name)
+            if out is None:
+                out = lookup(func[2], instance.name)
 
-            if instance in instance.func[2]:
-                out = instance.func[2][instance]
+            if out is not None:
                 instance._declare = out
                 return out
 
@@ -0,0 +1,107 @@
+"""
+Translations built from fragments of child translations.
+
++------------------------------------------------+-----------------------------+
+| Name                                           | Description                 |
++================================================+=============================+
+| :py:class:`~matlab2cpp.node.rope.Rope`         | Translation as a list of    |
+|                                                | strings and child ropes     |
++------------------------------------------------+-----------------------------+
+| :py:func:`~matlab2cpp.node.rope.text`          | Translation as string       |
++------------------------------------------------+-----------------------------+
+
+A node translated with a template (see :py:mod:`~matlab2cpp.node.template`)
+stores its translation as a `Rope` referring to the translations of its
+children, instead of copying their text. The text is only put together when
+asked for, like when a rule reads ``node.str``, and is then remembered by the
+rope. A rope can also be written piece by piece to a file-like object with
+:py:meth:`~matlab2cpp.node.rope.Rope.write`, without creating the string.
+
+Example:
+    >>> inner = Rope(["a", "+", "b"])
+    >>> outer = Rope(["f(", inner, ")"])
+    >>> print outer
+    f(a+b)
+    >>> import sys
+    >>> outer.write(sys.stdout)
+    f(a+b)
+"""
+
+import matlab2cpp as mc
+
+
+class Rope(object):
+    """
+Immutable translation made of strings and other ropes.
+
+Args:
+    parts (list): Strings and ropes in order
+    """
+    __slots__ = ("parts", "_text")
+
+    def __init__(self, parts):
+        self.parts = parts
+        self._text = None
+
+    def __str__(self):
+        return str(self.flat())
+
+    def __repr__(self):
+        return repr(self.flat())
+
+    def __reduce__(self):
+        return Rope, ([self.flat()],)
+
+    def pieces(self):
+        "Iterate over the strings of the rope in order"
+
+        stack = [iter(self.parts)]
+        while stack:
+            for part in stack[-1]:
+                if isinstance(part, Rope):
+                    if part._text is None:
+                        stack.append(iter(part.parts))
+                        break
+                    part = part._text
+                yield part
+            else:
+                stack.pop()
+
+    def flat(self):
+        "Text of the rope, put together once and remembered"
+        if self._text is None:
+            self._text = "".join(self.pieces())
+        return self._text
+
+    def write(self, sink):
+        """
+Write text of rope to file-like object.
+
+Args:
+    sink (file): Object with a `write` method
+        """
+        if self._text is not None:
+            sink.write(self._text)
+            return
+        for piece in self.pieces():
+            sink.write(piece)
+
+
+def text(value):
+    """
+Translation as string.
+
+Args:
+    value (str, Rope): Translation of a node (see `Node.prop_str`)
+
+Returns:
+    str: Text of translation
+    """
+    if isinstance(value, Rope):
+        return value.flat()
+    return value
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
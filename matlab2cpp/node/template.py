@@ -0,0 +1,236 @@
+"""
+Compiled translation templates.
+
++------------------------------------------------------+-----------------------+
+| Name                                                 | Description           |
++======================================================+=======================+
+| :py:class:`~matlab2cpp.node.template.Template`       | Translation rule      |
+|                                                      | compiled into parts   |
++------------------------------------------------------+-----------------------+
+| :py:func:`~matlab2cpp.node.template.expand`          | Expand tuple rule to  |
+|                                                      | interpolation string  |
++------------------------------------------------------+-----------------------+
+| :py:func:`~matlab2cpp.node.template.get`             | Cached template of    |
+|                                                      | rule and child count  |
++------------------------------------------------------+-----------------------+
+
+A translation rule is either a string interpolated with the node properties,
+like ``"%(0)s ;"``, or a tuple of strings put between the translations of the
+children (see :py:mod:`~matlab2cpp.rules`). Both are compiled into a list of
+literal strings and keys, which are filled in directly from the node and its
+children, instead of creating the full property dictionary
+(:py:meth:`~matlab2cpp.Node.properties`) for every node. Templates are cached
+by rule and number of children. The translation is a rope referring to the
+translations of the children rather than copying them (see
+:py:mod:`~matlab2cpp.node.rope`).
+
+Example:
+    >>> node = mc.collection.Plus(None)
+    >>> a = mc.collection.Var(node, "a"); a.str = "a"
+    >>> b = mc.collection.Int(node, "2"); b.str = "2"
+    >>> template = get(("", "+", ""), 2)
+    >>> print template.text
+    %(0)s+%(1)s
+    >>> print template(node)
+    a+2
+    >>> print get("%(class)s(%(-1)s, %(0)s)", 2)(node)
+    Plus(2, a)
+    >>> get("%(nokey)s", 2)(node)
+    Traceback (most recent call last):
+        ...
+    KeyError: 'nokey'
+"""
+
+import re
+
+import matlab2cpp as mc
+import reference
+import rope
+
+# interpolation keys and escaped percent signs
+pattern = re.compile(r"%\(([^()]*)\)s|%%")
+
+# compiled templates by rule, or by rule and number of children
+cache = {}
+
+# number of templates cached before the cache is reset
+limit = 10000
+
+
+def expand(rule, count):
+    """
+Expand tuple rule into interpolation string with children as ``%(i)s``.
+
+Args:
+    rule (tuple, list): Strings before, between and after the children
+    count (int): Number of children
+
+Returns:
+    str: Interpolation string
+
+Example:
+    >>> print expand(("[", ", ", "]"), 3)
+    [%(0)s, %(1)s, %(2)s]
+    >>> print expand(("f(", ")"), 0)
+    f()
+    """
+
+    value = list(rule)
+    children = ["%("+str(i)+")s" for i in xrange(count)]
+
+    if len(value) == 2:
+        value.insert(1, "")
+
+    value = value[:-1] + [value[-2]] *\
+        (count-len(value)+1) + value[-1:]
+
+    if count == 0:
+        return value[0] + value[-1]
+
+    if count == 1:
+        return value[0] + children[0] + value[-1]
+
+    out = value[0]
+    for i in xrange(count):
+        out += children[i] + value[i+1]
+    return out
+
+
+class Template(object):
+    """
+Interpolation string compiled into literal strings and keys.
+
+Children keys, like ``0`` and ``-1``, are filled in with the translation of the
+child, while other keys are filled in with the node property, like in
+:py:meth:`~matlab2cpp.Node.properties`. A key that is neither, raises
+`KeyError`.
+
+Args:
+    text (str): Interpolation string
+
+Attributes:
+    text (str): Interpolation string
+    parts (list): Literal string, key and child index of each key, or None
+        if `text` uses interpolation other than ``%(key)s``.
+    """
+    __slots__ = ("text", "parts")
+
+    def __init__(self, text):
+
+        self.text = text
+        parts = []
+        literal = ""
+        end = 0
+
+        for match in pattern.finditer(text):
+
+            literal += text[end:match.start()]
+            end = match.end()
+            key = match.group(1)
+
+            if key is None:
+                literal += "%"
+                continue
+
+            index = None
+            if key.lstrip("-").isdigit() and str(int(key)) == key and key != "-0":
+                index = int(key)
+
+            parts.append((literal, key, index))
+            literal = ""
+
+        literal += text[end:]
+        parts.append((literal, None, None))
+
+        if "%" in pattern.sub("", text):
+            parts = None
+        self.parts = parts
+
+    def __call__(self, node):
+        """
+Interpolate template with node properties.
+
+Args:
+    node (Node): Node to translate
+
+Returns:
+    str, Rope: Translation of node, as rope unless `text` could not be compiled
+        """
+
+        parts = self.parts
+        if parts is None:
+            return self.text % node.properties()
+
+        children = node.children
+        count = len(children)
+        out = []
+        for literal, key, index in parts:
+
+            out.append(literal)
+            if key is None:
+                continue
+
+            if index is not None and -count <= index < count:
+                value = children[index].prop_str
+                if isinstance(value, rope.Rope):
+                    out.append(value)
+                    continue
+
+            else:
+                extra = node.prop_extra
+                if extra and key in extra:
+                    value = extra[key]
+                elif key == "code":
+                    value = reference.own_code(node)
+                elif key in reference.fields:
+                    value = getattr(node, reference.fields[key])
+                elif key == "class":
+                    value = node.__class__.__name__
+                else:
+                    raise KeyError(key)
+
+                if value is None and hasattr(node, key):
+                    value = getattr(node, key)
+
+            if not isinstance(value, basestring):
+                value = str(value)
+            out.append(value)
+
+        return rope.Rope(out)
+
+
+def get(rule, count):
+    """
+Compiled template of rule.
+
+Args:
+    rule (str, tuple, list): Translation rule
+    count (int): Number of children of the node
+
+Returns:
+    Template: Cached template
+    """
+
+    if isinstance(rule, basestring):
+        key = rule
+    else:
+        key = (tuple(rule), count)
+
+    template = cache.get(key)
+    if template is None:
+
+        if len(cache) >= limit:
+            cache.clear()
+
+        if isinstance(rule, basestring):
+            template = Template(rule)
+        else:
+            template = Template(expand(rule, count))
+        cache[key] = template
+
+    return template
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
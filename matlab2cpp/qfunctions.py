@@ -25,7 +25,7 @@ to the ``mconvert`` script.
 import supplement
 import tree
 import matlab2cpp as mc
-from rules._program import add_indenting, number_fix, strip
+from rules._program import layout, strip
 
 __all__ = ["build", "qcpp", "qhpp", "qpy", "qlog", "qtree", "qscript"]
 
@@ -157,31 +157,12 @@ See also:
     if not tree_.str:
         tree_.translate()
 
-    includes, funcs, inlines, structs, headers, log = tree_.program
+    funcs = tree_.program[1]
 
     out = ""
 
     if funcs and funcs[0].name == "main":
-
-        if includes.str:
-            out += includes.str + "\n\n"
-
-        if len(headers) > 1:
-            out += headers.str + "\n\n"
-
-        if structs.str:
-            out += structs.str + "\n\n"
-
-        if funcs.str:
-            out += funcs.str + "\n\n"
-
-        out = out.replace("__percent__", "%")
-
-        out =  out[:-2]
-
-        out = strip(out)
-        out = number_fix(out)
-        out = add_indenting(out)
+        out = source(tree_)
 
     return out
 
@@ -257,33 +238,63 @@ See also:
     if not tree_.str:
         tree_.translate()
 
-    includes, funcs, inlines, structs, headers, log = tree_
+    funcs = tree_[1]
 
     out = ""
 
     if funcs and funcs[0].name == "main":
         return out
 
+    return source(tree_)
+
+
+def source(program, join=True):
+    """
+C++ code of a translated program, as in :py:func:`~matlab2cpp.qcpp` for
+scripts and :py:func:`~matlab2cpp.qhpp` for modules. The includes, headers,
+structs and functions are put together, and formatted in one pass (see
+:py:func:`~matlab2cpp.rules._program.layout`).
+
+Args:
+    program (Program): Translated program
+    join (bool): Return a string, or if false, a rope of the formatted lines
+        (see :py:mod:`~matlab2cpp.node.rope`)
+
+Returns:
+    str, Rope: C++ code, or an empty string if there is none
+
+Example::
+    >>> program = mc.build("function f(); end", retall=True)[0]
+    >>> program.translate()
+    >>> out = source(program, join=False)
+    >>> print isinstance(out, mc.node.rope.Rope)
+    True
+    >>> print str(out) == mc.qhpp(program)
+    True
+    """
+
+    includes, funcs, inlines, structs, headers, log = program
+
+    parts = []
     if includes.str:
-        out += includes.str + "\n\n"
+        parts.append(includes.str)
 
     if len(headers) > 1:
-        out += headers.str + "\n\n"
+        parts.append(headers.str)
 
     if structs.str:
-        out += structs.str + "\n\n"
+        parts.append(structs.str)
 
     if funcs.str:
-        out += funcs.str + "\n\n"
-
-    out =  out[:-2]
+        parts.append(layout(funcs.str, fix=False, indent=False))
 
+    out = "\n\n".join(parts)
     out = out.replace("__percent__", "%")
     out = strip(out)
-    out = number_fix(out)
-    out = add_indenting(out)
+    if not out:
+        return ""
 
-    return out
+    return layout(out, collapse=False, join=join)
 
 
 def qpy(code, suggest=True, prefix=False):
@@ -538,19 +549,20 @@ Example:
     tree_.translate()
 
     out = ""
+    collapse = tree_.cls == "Funcs"
     if tree_.cls == "Program":
         if tree_[1] and tree_[1][0].name == "main":
             out = tree_[1][0][-1].str
         else:
             out = tree_[1].str
+            collapse = True
     else:
         out = tree_.str
 
 
     out = out.replace("__percent__", "%")
     out = strip(out)
-    out = number_fix(out)
-    out = add_indenting(out)
+    out = layout(out, collapse=collapse)
 
     return out
 
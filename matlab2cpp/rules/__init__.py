@@ -93,18 +93,51 @@ These basic types are then glued together through the following:
 +-------------------------------------------+---------------------------------------+
 | :py:mod:`~matlab2cpp.rules._verbatim`     | Special verbatim translations         |
 +-------------------------------------------+---------------------------------------+
+
+Apart from :py:mod:`~matlab2cpp.rules._reserved`, needed to load any code, the
+rule modules are imported when first used, through :py:func:`load`. The
+translation rules of a datatype are looked up in
+:py:mod:`~matlab2cpp.dispatch`, which loads the module of the datatype the
+first time a node of that datatype is translated.
 """
 
-import matlab2cpp as mc
-import glob
 import os
-sep = os.path.sep
+import importlib
+
+import matlab2cpp as mc
+
+# Names of all rule modules, imported or not
+names = sorted(set(os.path.splitext(name)[0]
+    for name in os.listdir(os.path.dirname(os.path.abspath(__file__)))
+    if os.path.splitext(name)[1] in (".py", ".pyc")
+    and not name.startswith("__init__.")))
+
+
+def load(name):
+    """
+Import rule module, if not already imported.
+
+Args:
+    name (str): Name of module, like ``_int`` or ``armadillo``
+
+Returns:
+    module: The rule module
+
+Raises:
+    ImportError: If there is no rule module with the name
 
-for name in glob.glob(os.path.dirname(__file__)+sep+"*.py"):
+Example:
+    >>> print load("_int").__name__
+    matlab2cpp.rules._int
+    >>> load("_none")
+    Traceback (most recent call last):
+        ...
+    ImportError: No rule module named _none
+    """
+    if name not in names:
+        raise ImportError("No rule module named " + name)
+    return importlib.import_module("matlab2cpp.rules." + name)
 
-    name = name.split(sep)[-1]
-    if name != "__init__":
-        exec("import %s" % name[:-3])
 
 from _reserved import reserved
 
@@ -452,14 +452,9 @@ Examples:
     if not len(node):
         return "// Empty block"
 
-    out = str(node[0])
-    for child in node[1:]:
-        if child.cls == "Ecomment":
-            out = out + " " + str(child)
-        else:
-            out = out + "\n" + str(child)
-
-    return out
+    # end-of-line comments stay on the line of the previous statement
+    separators = [child.cls == "Ecomment" and " " or "\n" for child in node[1:]]
+    return tuple([""] + separators + [""])
 
 def Assigns(node):
     """
@@ -675,11 +670,20 @@ Return:
     str : Translation of current node.
 
 Examples:
-    >>> print mc.qscript("function f(); %{ comment %}")
+    >>> print mc.qscript("function f()\\n%{\\n comment\\n%}\\nend")
     void f()
     {
-      /* comment */
+      /*
+       comment
+      */
     }
+
+    As in Matlab, the delimiters must be alone on their lines. Otherwise they
+    start line comments, and the code between them is kept:
+
+    >>> print mc.qscript("x = 1; %{ note\\ny = 2; %}")
+    x = 1 ; //{ note
+    y = 2 ; //}
     """
     return "/*%(value)s*/"
 
@@ -5,54 +5,116 @@ import armadillo as arma
 def add_indenting(text):
     """Add identing to text
     """
+    return layout(text, collapse=False, fix=False)
 
-    lines = text.split("\n")
 
-    indent = 0
-    for i in xrange(len(lines)):
-        line = lines[i]
+def number_fix(text):
+    """Code has allot of '-1' statements in indexing. This code substitutes
+explicit number subtractions with the single index equivalent.
 
-        # Fix indentation and linesplit
-        if line in ("}", "} ;") or line[:4] == "} //":
-            indent -= 1
-            line = "  "*indent + line
+Examples:
+    >>> print number_fix("a(8-1, 5-1)")
+    a(7, 4)
+    """
+    return layout(text, collapse=False, indent=False)
 
-        elif line == "{":
-            line = "  "*indent + line
-            indent += 1
-        else:
-            line = "  "*indent + line
-        lines[i] = line
 
-    text = "\n".join(lines)
+# index constants, like "a(5-1)", folded by `number_fix` and `layout`
+constant = re.compile(r"(([ ,(\[])(-?\d+)-1(?![*/]))")
+offset = re.compile(r"(([+\- ])(\d+)-1(?![*/]))")
 
-    return text
 
+def _constant(match):
+    return match.group(2) + str(int(match.group(3))-1)
 
-def number_fix(text):
-    """Code has allot of '-1' statements in indexing. This code substitutes
-explicit number subtractions with the single index equivalent.
+
+def _offset(match):
+    sign, value = match.group(2), int(match.group(3))
+    if sign == "-":
+        value += 1
+    else:
+        value -= 1
+    if value:
+        return sign + str(value)
+    return ""
+
+
+def layout(text, collapse=True, fix=True, indent=True, join=True):
+    """Format code in a single pass over its lines. Runs of blank lines are
+collapsed into one, index constants are folded like in `number_fix` and the
+code is indented like in `add_indenting`.
+
+Args:
+    text (str): Code to format
+    collapse (bool): Collapse blank lines
+    fix (bool): Fold index constants
+    indent (bool): Indent code blocks
+    join (bool): Join the lines into a string. If false, the lines are
+        returned as a rope (see :py:mod:`~matlab2cpp.node.rope`), which can be
+        written to a file without joining them.
+
+Returns:
+    str, Rope: Formatted code
 
 Examples:
-    >>> print number_fix("a(8-1, 5-1)")
-    a(7, 4)
+    >>> print layout("f()\\n{\\na(8-1, 5-1) ;\\n  \\n\\n  b = 2+2-1 ;\\n}")
+    f()
+    {
+      a(7, 4) ;
+    <BLANKLINE>
+      b = 2+1 ;
+    }
+    >>> print layout("a ;\\nb ;", join=False).parts
+    ['a ;', '\\n', 'b ;']
     """
-    # Cosmetic fix
-    for p0,p1,p2 in set(re.findall(r"(([ ,(\[])(-?\d+)-1(?![*/]))", text)):
-        val = int(p2)-1
-        val = p1+str(val)
-        text = val.join(text.split(p0))
-
-    for p0,p1,p2 in \
-            set(re.findall(r"(([+\- ])(\d+)-1(?![*/]))", text)):
-        if p1=="-":     val = int(p2)+1
-        else:           val = int(p2)-1
-        if val:         val = p1+str(val)
-        else:           val = ""
-        text = val.join(text.split(p0))
-
-    text = re.sub(r"\+-", r"-", text)
-    return text
+
+    lines = text.split("\n")
+    out = []
+    level = 0
+    blank = False
+
+    for i in xrange(len(lines)):
+        line = lines[i]
+
+        # lines with only spaces followed by another line are dropped, and
+        # the run is replaced by a single empty line
+        if collapse:
+            if blank:
+                line = line.lstrip(" ")
+                if not line and i+1 < len(lines):
+                    continue
+                out.append(indent and "  "*level or "")
+                blank = False
+
+            elif i and i+1 < len(lines) and not line.strip(" "):
+                blank = True
+                continue
+
+        if fix and ("-1" in line or "+-" in line):
+            line = constant.sub(_constant, line)
+            line = offset.sub(_offset, line)
+            line = line.replace("+-", "-")
+
+        if indent:
+            if line in ("}", "} ;") or line[:4] == "} //":
+                level -= 1
+                line = "  "*level + line
+            elif line == "{":
+                line = "  "*level + line
+                level += 1
+            else:
+                line = "  "*level + line
+
+        out.append(line)
+
+    if join:
+        return "\n".join(out)
+
+    parts = []
+    for line in out:
+        parts.append(line)
+        parts.append("\n")
+    return mc.node.rope.Rope(parts[:-1])
 
 
 def strip(text):
@@ -108,13 +170,8 @@ Include = "%(name)s"
 
 
 def Funcs(node):
-    text = "\n\n".join(map(str, node[:]))
-    # text = add_indenting(text)
-    # text = number_fix(text)
-    text = re.sub(r"\n *(\n *)+", r"\n\n", text)
-    # text = strip(text)
-
-    return text
+    # blank lines are collapsed by `layout` when the code is written
+    return "", "\n\n", ""
 
 def Inlines(node):
 
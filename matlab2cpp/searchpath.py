@@ -0,0 +1,163 @@
+"""
+Index of the Matlab functions found in the search path.
+
++------------------------------------------------+-----------------------------+
+| Name                                           | Description                 |
++================================================+=============================+
+| :py:class:`~matlab2cpp.searchpath.Index`       | Function names to files of  |
+|                                                | search path directories     |
++------------------------------------------------+-----------------------------+
+
+Like the Matlab ``addpath``, the directories are searched in order, and the
+first file with the function name is used. Each directory is listed once when
+the index is created, instead of testing for a file for every unknown name in
+every directory. Within the directories, ``private`` directories hold
+functions only visible to files in the parent directory. They are found before
+functions in the search path. Package directories (``+package``) are not
+indexed, as calls like ``package.name(...)`` are read as struct fields.
+
+Directories given by ``mconvert -I``/``--path`` are searched after the
+directory of the converted file.
+
+Example:
+    >>> import tempfile, os
+    >>> folder = tempfile.mkdtemp()
+    >>> os.mkdir(os.path.join(folder, "+pkg"))
+    >>> os.mkdir(os.path.join(folder, "private"))
+    >>> for name in ("f.m", "+pkg/g.m", "private/h.m"):
+    ...     open(os.path.join(folder, name), "w").write("")
+    >>> index = Index([folder])
+    >>> print sorted(index.functions)
+    ['f']
+    >>> caller = os.path.join(folder, "f.m")
+    >>> print os.path.basename(index.find("h", caller))
+    h.m
+    >>> print index.find("h"), index.find("k")
+    None None
+"""
+
+import os
+
+
+class Index(object):
+    """
+Function names to files of search path directories.
+
+Args:
+    paths (list): Directories in order of priority
+
+Attributes:
+    paths (list): Absolute paths to directories
+    functions (dict): Function name to path of Matlab file
+    files (dict): Other file names to path, matching names used with
+        extension
+    private (dict): Directory to its private functions by name
+    listings (int): Number of directories listed
+    """
+
+    def __init__(self, paths):
+
+        self.paths = []
+        self.functions = {}
+        self.files = {}
+        self.private = {}
+        self.listings = 0
+
+        seen = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if path in seen:
+                continue
+            seen.add(path)
+            self.paths.append(path)
+            self.scan(path)
+
+    def list(self, path):
+        "Entries of a directory, empty if it can not be listed"
+        self.listings += 1
+        try:
+            return sorted(os.listdir(path))
+        except OSError:
+            return []
+
+    def scan(self, path):
+        """
+Index a directory, with its private directory.
+
+Args:
+    path (str): Directory
+        """
+
+        functions = self.functions
+        for entry in self.list(path):
+
+            filename = os.path.join(path, entry)
+
+            if entry == "private":
+                if os.path.isdir(filename):
+                    self.private[path] = dict(
+                        (name[:-2], os.path.join(filename, name))
+                        for name in self.list(filename) if name[-2:] == ".m")
+
+            elif entry[-2:] == ".m":
+                functions.setdefault(entry[:-2], filename)
+
+            elif entry[:1] != "+":
+                self.files.setdefault(entry, filename)
+
+    def find(self, name, caller=None):
+        """
+Find the file of a function.
+
+Args:
+    name (str): Function name
+    caller (str, optional): Path to file calling the function, for the
+        private functions of its directory
+
+Returns:
+    str, None: Path to Matlab file, or None if not found
+        """
+
+        if caller is not None:
+            private = self.private.get(self.owner(caller))
+            if private and name in private and os.path.isfile(private[name]):
+                return private[name]
+
+        for filename in (self.functions.get(name), self.files.get(name)):
+            if filename is not None and os.path.isfile(filename):
+                return filename
+
+        return None
+
+    def owner(self, caller):
+        "Directory whose private functions are visible to a file"
+        path = os.path.dirname(os.path.abspath(caller))
+        if os.path.basename(path) == "private":
+            path = os.path.dirname(path)
+        return path
+
+    def candidates(self, name, caller=None):
+        """
+Paths where a file for the function would be found, if created.
+
+Args:
+    name (str): Function name
+    caller (str, optional): Path to calling file
+
+Returns:
+    list: Paths to files
+        """
+
+        out = []
+        if caller is not None:
+            out.append(os.path.join(self.owner(caller), "private",
+                name + ".m"))
+        for path in self.paths:
+            out.append(os.path.join(path, name + ".m"))
+            out.append(os.path.join(path, name))
+        return out
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
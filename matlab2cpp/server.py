@@ -0,0 +1,465 @@
+"""
+Long running conversion server, keeping loaded programs in memory.
+
++-------------------------------------------------+------------------------------+
+| Name                                            | Description                  |
++=================================================+==============================+
+| :py:class:`~matlab2cpp.server.Session`          | Programs of a main file and  |
+|                                                 | its dependencies             |
++-------------------------------------------------+------------------------------+
+| :py:class:`~matlab2cpp.server.Server`           | Sessions and the handling of |
+|                                                 | requests                     |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.server.stamp`             | Modification time and size   |
+|                                                 | of a file                    |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.server.serve`             | Answer requests on           |
+|                                                 | stdin/stdout                 |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.server.listen`            | Answer requests on a local   |
+|                                                 | socket                       |
++-------------------------------------------------+------------------------------+
+
+Started with ``mconvert --server``, the rules are imported once and each
+converted file gets a session holding its programs as loaded, before
+configuration. Between requests the sessions are polled for changes in the
+modification time of their Matlab files, supplement files and the paths where
+dependencies were searched for. When something has changed:
+
+* Only the changed files are loaded again. The others are copied from memory.
+* The project is configured as a whole, since datatypes flow between files.
+* Programs with the same datatypes as before, for themselves and the programs
+  they call (see :py:func:`~matlab2cpp.manifest.signatures`), reuse their
+  previous translation.
+
+Requests and responses are JSON objects, one per line. A request has the
+keys:
+
++----------------+-------------------------------------------------------------+
+| Key            | Description                                                 |
++================+=============================================================+
+| ``command``    | ``convert`` (default), ``drop`` to forget a session, or     |
+|                | ``quit``                                                    |
++----------------+-------------------------------------------------------------+
+| ``file``       | Path to main Matlab file                                    |
++----------------+-------------------------------------------------------------+
+| ``write``      | Write the output files like ``mconvert``, default false     |
++----------------+-------------------------------------------------------------+
+| ``id``         | Anything, returned with the response                        |
++----------------+-------------------------------------------------------------+
+| ``suggest``,   | Same as the ``mconvert`` options                            |
+| ``reset``,     |                                                             |
+| ``comments``,  |                                                             |
+| ``original``,  |                                                             |
+| ``nargin``     |                                                             |
++----------------+-------------------------------------------------------------+
+| ``path``       | List of directories searched for functions after the        |
+|                | directory of the main file, like ``mconvert --path``        |
++----------------+-------------------------------------------------------------+
+
+A response has ``ok`` set, and either ``error`` with the error message or the
+content of the files of each program in ``programs``, the translation of the
+main file in ``funcs``, the programs loaded and translated again in
+``loaded`` and ``translated``, and the time spent in ``time``.
+
+Example:
+    >>> import tempfile, os
+    >>> folder = tempfile.mkdtemp()
+    >>> filename = os.path.join(folder, "prg.m")
+    >>> open(filename, "w").write("a = 1")
+    >>> server = Server()
+    >>> response = server.handle({"file": filename, "suggest": True})
+    >>> print response["funcs"]
+    int main(int argc, char** argv)
+    {
+    int a ;
+    a = 1 ;
+    return 0 ;
+    }
+    >>> print len(response["loaded"]), len(response["translated"])
+    1 1
+    >>> response = server.handle({"file": filename, "suggest": True})
+    >>> print len(response["loaded"]), len(response["translated"])
+    0 0
+    >>> print server.handle({"file": os.path.join(folder, "x.m")})["ok"]
+    False
+
+Functions in other directories are found through ``path``::
+
+    >>> library = tempfile.mkdtemp()
+    >>> open(os.path.join(library, "lib.m"), "w").write(
+    ...     "function y = lib(x)\\ny = x + 1;\\nend")
+    >>> open(filename, "w").write("a = lib(1)")
+    >>> request = {"file": filename, "suggest": True, "path": [library]}
+    >>> programs = server.handle(request)["programs"]
+    >>> print sorted(os.path.basename(program["name"]) for program in programs)
+    ['lib.m', 'prg.m']
+
+Changed supplement files are read from scratch::
+
+    >>> open(filename, "w").write("b = 1")
+    >>> open(filename + ".py", "w").write(
+    ...     'functions = {"main": {"b": "cx_mat"}}')
+    >>> print server.handle({"file": filename})["funcs"].split("\\n")[2]
+    cx_mat b ;
+    >>> open(filename + ".py", "w").write("includes = []")
+    >>> print server.handle({"file": filename})["funcs"].split("\\n")[2]
+    TYPE b ;
+"""
+
+import os
+import sys
+import time
+import json
+import select
+import traceback
+from collections import deque
+
+import matlab2cpp as mc
+
+# default options of a conversion request
+options = (("suggest", False), ("reset", False), ("comments", False),
+        ("original", False), ("nargin", False))
+
+
+def stamp(filename):
+    """
+Modification time and size of a file.
+
+Args:
+    filename (str): Path to file
+
+Returns:
+    tuple, None: Time and size, or None if the file does not exist
+    """
+    try:
+        info = os.stat(filename)
+    except OSError:
+        return None
+    return info.st_mtime, info.st_size
+
+
+class Session(object):
+    """
+Programs of a main file and its dependencies, kept between requests.
+
+Args:
+    filename (str): Path to main Matlab file
+    options (dict): Conversion options, see `options`
+
+Attributes:
+    filename (str): Path to main Matlab file
+    options (dict): Conversion options
+    loaded (dict): Path to stamps of Matlab file and supplement file, and the
+        serialized program as loaded
+    translated (dict): Path to key and file contents of last translation
+    stamps (dict): Path to stamp of every file the result depends on
+    result (dict): Response of last conversion
+    """
+
+    def __init__(self, filename, options):
+
+        self.filename = filename
+        self.options = options
+        self.loaded = {}
+        self.translated = {}
+        self.stamps = {}
+        self.result = None
+
+    def changed(self):
+        """
+Check if any file the last result depends on has changed.
+
+Returns:
+    bool: True if the session has to be updated
+        """
+        if self.result is None:
+            return True
+        for filename, value in self.stamps.items():
+            if stamp(filename) != value:
+                return True
+        return False
+
+    def update(self):
+        """
+Convert main file, loading and translating only what changed.
+
+Returns:
+    dict: Response with file contents of each program
+        """
+
+        start = time.time()
+        if not self.changed():
+            return dict(self.result, loaded=[], translated=[],
+                    time=time.time()-start)
+
+        options = self.options
+        filename = self.filename
+        if not os.path.isfile(filename):
+            raise IOError(filename + " not found")
+
+        builder = mc.Builder(comments=options["comments"],
+                original=options["original"])
+        index = mc.searchpath.Index([os.path.dirname(filename)] +
+                list(options["path"]))
+
+        stamps = {}
+        loaded = {}
+        reloaded = []
+        filenames = deque([filename])
+        while filenames:
+
+            name = filenames.popleft()
+            if name in loaded:
+                continue
+
+            key = stamp(name), stamp(name + ".py")
+            stamps[name] = key[0]
+            stamps[name + ".py"] = key[1]
+
+            entry = self.loaded.get(name)
+            if entry is not None and entry[0] == key:
+                program = mc.tree.cache.loads(entry[1], builder.project)
+            else:
+                program = mc.load(builder, name, options["reset"])
+                entry = key, mc.tree.cache.dumps(program)
+                reloaded.append(name)
+            loaded[name] = entry
+
+            filenames.extend(mc.dependencies(builder, program, index))
+
+        for name in mc.missing(builder, index):
+            stamps[name] = None
+
+        builder.configure(suggest=2*options["suggest"])
+        builder.modify(options["nargin"])
+
+        signatures = mc.manifest.signatures(builder.project)
+        translated = {}
+        retranslated = []
+        programs = []
+        for program in builder.project:
+
+            name = program.name
+            key = signatures[name], loaded[name][0]
+            entry = self.translated.get(name)
+            if entry is None or entry[0] != key:
+                program.translate()
+                files = tuple(map(mc.node.rope.text, mc.emit(program)))
+                funcs = mc.rules._program.layout(program[1].str,
+                        fix=False, indent=False)
+                entry = key, files, funcs.replace("__percent__", "%")
+                retranslated.append(name)
+            translated[name] = entry
+
+            cpp, hpp, py, log = entry[1]
+            programs.append({"name": name, "cpp": cpp, "hpp": hpp,
+                "py": py, "log": log})
+
+        self.loaded = loaded
+        self.translated = translated
+        self.stamps = stamps
+        self.result = {"ok": True, "programs": programs,
+                "funcs": translated[filename][2], "loaded": reloaded,
+                "translated": retranslated, "time": time.time()-start}
+        return dict(self.result)
+
+    def write(self):
+        """
+Write the files of the last result, leaving unchanged files as they are.
+The stamps of written files are updated, such that they do not count as
+changes.
+        """
+        for program in self.result["programs"]:
+            name = program["name"]
+            files = program["cpp"], program["hpp"], program["py"], program["log"]
+            mc.write_files(name, files, keep=True)
+
+            key = self.loaded[name][0]
+            supplement = stamp(name + ".py")
+            if key[1] != supplement:
+                self.loaded[name] = (key[0], supplement), self.loaded[name][1]
+                self.stamps[name + ".py"] = supplement
+
+
+class Server(object):
+    """
+Sessions of converted files, and the handling of requests.
+
+Attributes:
+    sessions (dict): Session by path and options (see `key`)
+    """
+
+    def __init__(self):
+        self.sessions = {}
+
+    def key(self, request):
+        "Path and options of a request"
+        values = tuple((key, bool(request.get(key, default)))
+                for key, default in options)
+        path = tuple(os.path.abspath(str(directory))
+                for directory in request.get("path") or ())
+        return os.path.abspath(str(request["file"])), values + (("path", path),)
+
+    def session(self, request):
+        "Session of a request, created if new"
+        key = self.key(request)
+        if key not in self.sessions:
+            self.sessions[key] = Session(key[0], dict(key[1]))
+        return self.sessions[key]
+
+    def handle(self, request):
+        """
+Answer a request.
+
+Args:
+    request (dict): Parsed request
+
+Returns:
+    dict, None: Response, or None if asked to quit
+        """
+
+        command = request.get("command", "convert")
+        try:
+            if command == "quit":
+                return None
+
+            elif command == "drop":
+                self.sessions.pop(self.key(request), None)
+                response = {"ok": True}
+
+            elif command == "convert":
+                session = self.session(request)
+                response = session.update()
+                if request.get("write"):
+                    session.write()
+
+            else:
+                raise ValueError("unknown command: " + str(command))
+
+        except Exception as error:
+            response = {"ok": False, "error": "%s: %s" %
+                    (error.__class__.__name__, error),
+                    "traceback": traceback.format_exc()}
+
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def poll(self):
+        "Update the sessions with changed files ahead of the next request"
+        for session in self.sessions.values():
+            if session.result is not None and session.changed():
+                try:
+                    session.update()
+                except Exception:
+                    session.result = None
+
+    def answer(self, line):
+        """
+Answer one line of the protocol.
+
+Args:
+    line (str): Request as JSON
+
+Returns:
+    str, None: Response as JSON, or None if asked to quit
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            response = {"ok": False, "error": "ValueError: %s" % error}
+        else:
+            response = self.handle(request)
+            if response is None:
+                return None
+        return json.dumps(response)
+
+
+def serve(stdin=None, stdout=None, interval=1.):
+    """
+Answer requests read line by line from stdin, until it is closed or a quit
+request arrives. Sessions are polled for changes while waiting.
+
+Args:
+    stdin (file): Input, defaults to `sys.stdin`
+    stdout (file): Output, defaults to `sys.stdout`
+    interval (float): Seconds between polls
+    """
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    server = Server()
+    fd = stdin.fileno()
+    buffer = ""
+
+    while True:
+
+        ready = select.select([fd], [], [], interval)[0]
+        if not ready:
+            server.poll()
+            continue
+
+        data = os.read(fd, 65536)
+        if not data:
+            return
+        buffer += data
+
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            if not line.strip():
+                continue
+            response = server.answer(line)
+            if response is None:
+                return
+            stdout.write(response + "\n")
+            stdout.flush()
+
+
+def listen(port, interval=1.):
+    """
+Answer requests on a socket on localhost, one connection at the time, using
+the same protocol as `serve`. Sessions are polled for changes while waiting.
+
+Args:
+    port (int): Port number
+    interval (float): Seconds between polls
+    """
+
+    import SocketServer
+
+    server = Server()
+
+    class Handler(SocketServer.StreamRequestHandler):
+
+        def handle(self):
+            for line in iter(self.rfile.readline, ""):
+                if not line.strip():
+                    continue
+                response = server.answer(line)
+                if response is None:
+                    self.server.done = True
+                    return
+                self.wfile.write(response + "\n")
+                self.wfile.flush()
+
+    class Listener(SocketServer.TCPServer):
+
+        allow_reuse_address = True
+        timeout = interval
+        done = False
+
+        def handle_timeout(self):
+            server.poll()
+
+    listener = Listener(("127.0.0.1", port), Handler)
+    try:
+        while not listener.done:
+            listener.handle_request()
+    finally:
+        listener.server_close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
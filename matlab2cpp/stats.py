@@ -0,0 +1,362 @@
+"""
+Time and call counts of the conversion phases and of the rules.
+
++---------------------------------------------+--------------------------------+
+| Name                                        | Description                    |
++=============================================+================================+
+| :py:func:`~matlab2cpp.stats.enable`         | Start recording, with timing   |
+|                                             | of every rule                  |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.disable`        | Stop recording                 |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.phase`          | Record time spent in a phase,  |
+|                                             | used in a `with` statement     |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.count`          | Record number of nodes in a    |
+|                                             | program                        |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.configuration`  | Record configuration passes    |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.report`         | Recorded numbers as dictionary |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.table`          | Recorded numbers as text table |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.collect`        | Take recorded numbers, to send |
+|                                             | from a worker process          |
++---------------------------------------------+--------------------------------+
+| :py:func:`~matlab2cpp.stats.merge`          | Add numbers from a worker      |
++---------------------------------------------+--------------------------------+
+
+Phases are recorded in total and for each program. Rules are timed by wrapping
+the entries in :py:data:`~matlab2cpp.dispatch.table` while recording, so the
+rules run unwrapped when recording is off. The time of a rule includes the
+rules it calls. Translation rules given as strings or tuples are not timed.
+The passes of the configuration are recorded with the declared variables that
+changed in them (see :py:class:`~matlab2cpp.configure.worklist.Worklist`).
+
+The ``mconvert`` options ``--stats`` and ``--profile <file>`` print the table
+or write the report as JSON. Worker processes record their own numbers, which
+are sent back through `collect` and added to those of the main process with
+`merge`.
+
+Example:
+    >>> enable()
+    >>> with phase("qscript", "prg.m"):
+    ...     code = mc.qscript("a = 1")
+    >>> report()["phases"]["qscript"]["calls"]
+    1
+    >>> report()["rules"]["rules._program.Program"]["calls"]
+    1
+    >>> disable()
+    >>> with phase("qscript"):
+    ...     code = mc.qscript("a = 1")
+    >>> report()["phases"]["qscript"]["calls"]
+    1
+"""
+
+import time
+import json
+
+import matlab2cpp as mc
+
+# True while recording
+enabled = False
+
+# name -> [time, calls]
+phases = {}
+
+# program -> {"nodes": int, "phases": {name -> [time, calls]}}
+programs = {}
+
+# rule -> [time, calls]
+rules = {}
+
+# [time, visits, changed nodes, changed declarations] of configuration passes
+passes = []
+
+
+class Phase(object):
+    "Context recording time of a phase, see `phase`"
+    __slots__ = ("name", "program", "start")
+
+    def __init__(self, name, program):
+        self.name = name
+        self.program = program
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        spent = time.time() - self.start
+
+        entry = phases.setdefault(self.name, [0., 0])
+        entry[0] += spent
+        entry[1] += 1
+
+        if self.program is not None:
+            program = programs.setdefault(self.program,
+                    {"nodes": 0, "phases": {}})
+            entry = program["phases"].setdefault(self.name, [0., 0])
+            entry[0] += spent
+            entry[1] += 1
+
+        return False
+
+
+class Idle(object):
+    "Context doing nothing, used when not recording"
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+idle = Idle()
+
+
+def phase(name, program=None):
+    """
+Context recording the time spent in a phase.
+
+Args:
+    name (str): Name of phase, like ``load`` or ``translate``
+    program (str, optional): Name of program the phase works on
+
+Returns:
+    Phase, Idle: Context for a `with` statement
+    """
+    if enabled:
+        return Phase(name, program)
+    return idle
+
+
+def count(program):
+    """
+Record the number of nodes in a program.
+
+Args:
+    program (Node): Program node
+    """
+    if enabled:
+        entry = programs.setdefault(program.name, {"nodes": 0, "phases": {}})
+        entry["nodes"] = len(program.flatten(False, False, False))
+
+
+def configuration(history):
+    """
+Record the passes of a configuration.
+
+Args:
+    history (list): Passes, see
+        :py:class:`~matlab2cpp.configure.worklist.Worklist`
+    """
+    if enabled:
+        passes.extend(history)
+
+
+def timed(name, rule):
+    "Wrap rule such that its time and calls are recorded under `name`"
+
+    entry = rules.setdefault(name, [0., 0])
+
+    def wrapper(node):
+        start = time.time()
+        try:
+            return rule(node)
+        finally:
+            entry[0] += time.time() - start
+            entry[1] += 1
+
+    wrapper.__name__ = getattr(rule, "__name__", name)
+    wrapper.__doc__ = getattr(rule, "__doc__", None)
+    return wrapper
+
+
+def enable():
+    "Clear recorded numbers and start recording, with rules timed"
+
+    global enabled
+    enabled = True
+
+    phases.clear()
+    programs.clear()
+    rules.clear()
+    del passes[:]
+
+    dispatch = mc.dispatch
+    dispatch.build()
+    for name in mc.rules.names:
+        if name[:1] == "_":
+            dispatch.load(name[1:])
+
+    for key, rule in dispatch.table.items():
+        phase_, backend, cls, name = key
+        if cls is None or not callable(rule):
+            continue
+
+        rule_name = cls if name is None else cls + "_" + name
+        if phase_ == "translate":
+            module = "rules._" + backend
+        else:
+            module = "configure." + {"reserved": "reserved",
+                    "datatype": "datatypes", "backend": "backends"}[phase_]
+        dispatch.table[key] = timed(module + "." + rule_name, rule)
+
+
+def disable():
+    "Stop recording and remove rule timing. Recorded numbers are kept."
+
+    global enabled
+    enabled = False
+    mc.dispatch.build()
+
+
+def report():
+    """
+Recorded numbers.
+
+Returns:
+    dict: With keys ``phases``, ``programs`` and ``rules``, where each time
+    and call count is a dictionary with keys ``time`` and ``calls``, and
+    ``passes`` with the time, visits, changed nodes and changed declared
+    variables of each configuration pass.
+    """
+
+    def convert(entries):
+        return dict((key, {"time": value[0], "calls": value[1]})
+                for key, value in entries.items())
+
+    return {
+        "phases": convert(phases),
+        "programs": dict((name, {"nodes": value["nodes"],
+            "phases": convert(value["phases"])})
+            for name, value in programs.items()),
+        "rules": convert(dict((key, value) for key, value in rules.items()
+            if value[1])),
+        "passes": [{"time": seconds, "visits": visits, "changed": changed,
+            "declarations": names}
+            for seconds, visits, changed, names in passes],
+    }
+
+
+def collect():
+    """
+Recorded numbers, cleared afterwards.
+
+Returns:
+    tuple: Phases, programs, rules and configuration passes, in the layout of
+    the module variables
+
+Example:
+    >>> enable()
+    >>> with phase("qscript", "prg.m"):
+    ...     code = mc.qscript("a = 1")
+    >>> numbers = collect()
+    >>> print phases, numbers[0]["qscript"][1]
+    {} 1
+    >>> merge(numbers); merge(numbers)
+    >>> print phases["qscript"][1], programs["prg.m"]["phases"]["qscript"][1]
+    2 2
+    >>> disable()
+    """
+
+    numbers = (dict(phases), dict(programs), dict((key, list(value))
+        for key, value in rules.items() if value[1]), list(passes))
+
+    phases.clear()
+    programs.clear()
+    for entry in rules.values():
+        entry[:] = [0., 0]
+    del passes[:]
+
+    return numbers
+
+
+def merge(numbers):
+    """
+Add numbers recorded elsewhere to the recorded numbers.
+
+Args:
+    numbers (tuple): Numbers from `collect`
+    """
+
+    def add(entries, other):
+        for key, value in other.items():
+            entry = entries.setdefault(key, [0., 0])
+            entry[0] += value[0]
+            entry[1] += value[1]
+
+    phases_, programs_, rules_, passes_ = numbers
+    add(phases, phases_)
+    for name, value in programs_.items():
+        entry = programs.setdefault(name, {"nodes": 0, "phases": {}})
+        entry["nodes"] = max(entry["nodes"], value["nodes"])
+        add(entry["phases"], value["phases"])
+    add(rules, rules_)
+    passes.extend(passes_)
+
+
+def dumps():
+    "Recorded numbers as JSON"
+    return json.dumps(report(), indent=2, sort_keys=True)
+
+
+def table(limit=20):
+    """
+Recorded numbers as text table. Rules are sorted by time spent.
+
+Args:
+    limit (int): Maximum number of rules and configuration passes listed
+
+Returns:
+    str: Table of phases, programs, configuration passes and rules
+    """
+
+    lines = []
+
+    def row(name, entry):
+        lines.append("%-50s %10d %10.3f" % (name, entry[1], entry[0]))
+
+    lines.append("%-50s %10s %10s" % ("Phase", "Calls", "Time"))
+    for name in sorted(phases, key=lambda name: -phases[name][0]):
+        row(name, phases[name])
+
+    for program in sorted(programs):
+        entry = programs[program]
+        lines.append("")
+        lines.append("%s (%d nodes)" % (program, entry["nodes"]))
+        for name in sorted(entry["phases"]):
+            row("  " + name, entry["phases"][name])
+
+    if passes:
+        lines.append("")
+        lines.append("%-50s %10s %10s %10s" % ("Configuration pass", "Visits",
+            "Time", "Changed"))
+        for i, (seconds, visits, changed, names) in enumerate(passes[:limit]):
+            name = "%d %s" % (i+1, ", ".join(names))
+            if len(name) > 50:
+                name = name[:46] + " ..."
+            lines.append("%-50s %10d %10.3f %10d" % (name, visits, seconds,
+                changed))
+        if len(passes) > limit:
+            lines.append("%d passes, %d visits, %.3f seconds in total" % (
+                len(passes), sum(entry[1] for entry in passes),
+                sum(entry[0] for entry in passes)))
+
+    used = [name for name in rules if rules[name][1]]
+    if used:
+        lines.append("")
+        lines.append("%-50s %10s %10s" % ("Rule", "Calls", "Time"))
+        used.sort(key=lambda name: -rules[name][0])
+        for name in used[:limit]:
+            row(name, rules[name])
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
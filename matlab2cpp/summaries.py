@@ -0,0 +1,559 @@
+"""
+Datatypes of functions from earlier runs, used to configure unchanged
+functions without inferring their datatypes again.
+
++-------------------------------------------------+------------------------------+
+| Name                                            | Description                  |
++=================================================+==============================+
+| :py:class:`~matlab2cpp.summaries.Summaries`     | Store of function datatypes  |
+|                                                 | by source and call sites     |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.summaries.calls`          | Call sites and callees of    |
+|                                                 | each function                |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.summaries.context`        | Datatypes at a call site     |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.summaries.known`          | Datatypes at a call site     |
+|                                                 | known before configuration   |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.summaries.agrees`         | If stored call site agrees   |
+|                                                 | with known datatypes         |
++-------------------------------------------------+------------------------------+
+| :py:func:`~matlab2cpp.summaries.types`          | Declared datatypes of a      |
+|                                                 | function                     |
++-------------------------------------------------+------------------------------+
+
+With ``mconvert -s --summaries <file>`` the datatypes of every function after
+configuration are stored as JSON in `<file>`, which can be shared between
+projects calling the same library functions. An entry holds the datatypes of
+the parameters, return values and local variables of a function, and the
+datatypes at its call sites: the arguments, and the variables assigned to for
+calls with multiple return values. It is stored under a key combining:
+
+* The name of the function and the options that change configuration.
+* The hash of the Matlab file and the supplement file `<filename>.py` of the
+  function, and of every function it calls, directly or through others.
+
+The supplement files written by a run hold the datatypes found by that run.
+The store remembers the hash of each supplement file it saw written, and the
+hash the file had before, which is used in the keys as long as the file is
+unchanged. A supplement file edited by hand gives new keys.
+
+A function is stored only if all its call sites in the project have the same
+datatypes, the same holds for every function it calls, and none of its
+variables are structs or anonymous functions. Its datatypes are then given by
+the sources in its key and the datatypes at its call sites. A few entries are
+kept for each key, one for each set of datatypes at the call sites, such that
+projects calling a library function with different datatypes use their own.
+Keys of a function left behind when its sources change are removed.
+
+Before configuration, functions with a key in the store get their datatypes
+from it, and their nodes converge in the first pass instead of waiting for
+suggestions to arrive. Callers are seeded before the functions they call, and
+the entry used is the last recorded one agreeing with the datatypes known at
+the call sites: literal arguments and variables with known datatypes (see
+`known`). After configuration, the datatypes at the call sites of these
+functions are compared with the stored ones. If any differ, the project is
+restored as it was before and configured again without the store.
+
+Example:
+    >>> import tempfile, os
+    >>> folder = tempfile.mkdtemp()
+    >>> filename = os.path.join(folder, "prg.m")
+    >>> open(filename, "w").write("function y = f(x)\\ny = x + 1;\\nend\\n"
+    ...     "function g()\\nz = f(2);\\nend")
+    >>> def convert():
+    ...     builder = mc.Builder()
+    ...     program = mc.load(builder, filename)
+    ...     summaries = Summaries(filename + ".summaries", "options")
+    ...     summaries.configure(builder, 2)
+    ...     summaries.save()
+    ...     print summaries.seeded, summaries.stale, types(program[1][0])
+    >>> convert()
+    0 0 {'y': 'int', 'x': 'int'}
+    >>> convert()
+    2 0 {'y': 'int', 'x': 'int'}
+    >>> open(filename, "w").write("function y = f(x)\\ny = x + 1;\\nend\\n"
+    ...     "function g()\\nz = f(2.);\\nend")
+    >>> convert()
+    0 0 {'y': 'double', 'x': 'double'}
+
+The keys of the old sources are removed:
+
+    >>> print len(json.load(open(filename + ".summaries"))["functions"])
+    2
+"""
+
+import os
+import json
+import hashlib
+
+import matlab2cpp as mc
+
+# version of the store layout, stores with another layout are not read
+layout = 2
+
+# datatypes of variables whose content is not described by the function
+excluded = ("struct", "structs", "func_lambda")
+
+# entries kept for each key, for functions called with different datatypes
+limit = 4
+
+
+def types(func):
+    """
+Declared datatypes of a function, like in
+:py:attr:`~matlab2cpp.Node.ftypes`.
+
+Args:
+    func (Func): Function node
+
+Returns:
+    dict: Variable name to datatype, empty string if unknown
+    """
+    out = {}
+    for var in func[0][:] + func[2][:]:
+        type = var.type
+        if type == "TYPE":
+            type = ""
+        out[var.name] = type
+    return out
+
+
+def context(node):
+    """
+Datatypes at a call site: the arguments, and the assigned variables if the
+call is the right hand side of a multiple assignment.
+
+Args:
+    node (Node): `Get` or `Var` node calling a function
+
+Returns:
+    str: Datatypes as JSON
+    """
+    args = []
+    if node.cls == "Get":
+        args = [child.type for child in node]
+
+    assigned = None
+    parent = node.parent
+    if parent.cls == "Assigns" and parent[-1] is node:
+        assigned = [child.type for child in parent[:-1]]
+
+    return json.dumps([args, assigned])
+
+
+def known(node, declared):
+    """
+Datatypes at a call site known before configuration, like in `context`.
+Literal arguments have the datatype of their class, and variables the
+declared datatype in the calling function. Other datatypes are unknown.
+
+Args:
+    node (Node): `Get` or `Var` node calling a function
+    declared (dict): Declared datatypes of the calling function, see `types`
+
+Returns:
+    list: Datatypes of arguments and assigned variables (or None), with
+    unknown datatypes as empty strings
+
+Example:
+    >>> node = mc.build("function f(a)\\ng(a, 2, 'c', a+1)")[0][3][0][0]
+    >>> print known(node, {"a": "mat"})
+    [['mat', 'int', 'string', ''], None]
+    """
+
+    def datatype(child):
+        if child.cls == "Var":
+            return declared.get(child.name, "")
+        value = mc.dispatch.configuration[child.cls, child.name][1]
+        if isinstance(value, str):
+            return value
+        return ""
+
+    args = []
+    if node.cls == "Get":
+        args = [datatype(child) for child in node]
+
+    assigned = None
+    parent = node.parent
+    if parent.cls == "Assigns" and parent[-1] is node:
+        assigned = [datatype(child) for child in parent[:-1]]
+
+    return [args, assigned]
+
+
+def agrees(stored, site):
+    """
+If the datatypes stored for the call sites of a function agree with the
+datatypes known at a call site.
+
+Args:
+    stored (str, None): Datatypes as JSON, see `context`, or None if the
+        function had no call sites
+    site (list): Known datatypes, see `known`
+
+Returns:
+    bool: True if every known datatype is the same as the stored one
+
+Example:
+    >>> stored = '[["int", "mat"], null]'
+    >>> print agrees(stored, [["int", ""], None]), agrees(stored, [["", "vec"],
+    ...     None]), agrees(None, [[], None])
+    True False False
+    """
+
+    if stored is None:
+        return False
+
+    args, assigned = json.loads(stored)
+    if len(args) != len(site[0]) or (assigned is None) != (site[1] is None):
+        return False
+
+    pairs = zip(args, site[0]) + zip(assigned or [], site[1] or [])
+    return all(not type or type == other for other, type in pairs)
+
+
+def calls(project):
+    """
+Call sites and callees of each function, as resolved through
+:py:class:`~matlab2cpp.node.reference.Symbols`. Anonymous functions are left
+out.
+
+Args:
+    project (Node): Project root
+
+Returns:
+    tuple: List of functions, and dictionaries from their id to call nodes and
+    to called functions
+    """
+
+    symbols = project.symbols
+    funcs = []
+    sites = {}
+    callees = {}
+
+    for program in project:
+        for func in program[1]:
+            if func.name[:1] == "_":
+                continue
+            funcs.append(func)
+            sites.setdefault(id(func), [])
+            callees[id(func)] = []
+
+    for func in funcs:
+        program = func.program
+        for node in func.flatten(False, False, False):
+            if node.cls not in ("Get", "Var"):
+                continue
+            callee = symbols.find(node.name, program)
+            if callee is None or id(callee) not in sites:
+                continue
+            sites[id(callee)].append(node)
+            callees[id(func)].append(callee)
+
+    return funcs, sites, callees
+
+
+class Summaries(object):
+    """
+Store of function datatypes from earlier runs.
+
+Args:
+    path (str): Path to store file
+    options (str): Description of the options that change configuration
+    reset (bool): Supplement files are ignored, and not part of the keys
+
+Attributes:
+    path (str): Path to store file
+    options (str): Options of this run
+    reset (bool): Supplement files are ignored
+    functions (dict): Key to the function it belongs to, as
+        ``<filename>:<name>``, and its entries with the datatypes at call
+        sites and the datatypes of variables, last recorded first
+    supplements (dict): Matlab file to the hash of the supplement file
+        written last, and the hash used in keys in its place
+    sources (dict): Matlab file to the hashes of the Matlab and supplement
+        files used in the keys of the last configuration
+    seeded (int): Number of functions given datatypes from the store in last
+        configuration
+    stale (int): Number of those with other datatypes at their call sites
+    """
+
+    def __init__(self, path, options, reset=False):
+
+        self.path = path
+        self.options = options
+        self.reset = reset
+        self.functions = {}
+        self.supplements = {}
+        self.sources = {}
+        self.seeded = 0
+        self.stale = 0
+
+        if os.path.isfile(path):
+            try:
+                f = open(path)
+                data = json.load(f)
+                f.close()
+            except ValueError:
+                data = {}
+
+            if data.get("version") == mc.__version__ and\
+                    data.get("layout") == layout:
+                self.functions = data.get("functions", {})
+                self.supplements = data.get("supplements", {})
+
+    def keys(self, funcs, callees):
+        """
+Key of each function, changing with its source and the sources of every
+function it calls.
+
+Args:
+    funcs (list): Functions, see `calls`
+    callees (dict): Function id to called functions, see `calls`
+
+Returns:
+    dict: Function id to key as hexadecimal SHA-1 hash. Functions of programs
+    not read from file are left out.
+        """
+
+        sources = self.sources
+        def digests(program):
+            name = program.name
+            if name not in sources:
+                supplement = None
+                if not self.reset:
+                    supplement = mc.manifest.digest(name + ".py")
+                    written = self.supplements.get(name)
+                    if written and written[0] == supplement:
+                        supplement = written[1]
+                sources[name] = mc.manifest.digest(name), supplement
+            return sources[name]
+
+        keys = {}
+        for func in funcs:
+
+            seen = set([id(func)])
+            stack = [func]
+            parts = set()
+            while stack:
+                node = stack.pop()
+                parts.add(digests(node.program))
+                for callee in callees[id(node)]:
+                    if id(callee) not in seen:
+                        seen.add(id(callee))
+                        stack.append(callee)
+
+            if any(part[0] is None for part in parts):
+                continue
+
+            value = hashlib.sha1()
+            for part in (mc.__version__, self.options, func.name,
+                    sorted(parts)):
+                value.update(repr(part))
+            keys[id(func)] = value.hexdigest()
+
+        return keys
+
+    def seed(self, funcs, sites, callees, keys):
+        """
+Set the declared datatypes of functions found in the store. Callers are
+seeded before the functions they call, and the entry used is the last
+recorded one agreeing with the datatypes known at every call site.
+
+Args:
+    funcs (list): Functions, see `calls`
+    sites (dict): Function id to call nodes, see `calls`
+    callees (dict): Function id to called functions, see `calls`
+    keys (dict): Function id to key, see `keys`
+
+Returns:
+    dict: Function id to stored entry, for the seeded functions
+        """
+
+        # depth first over the calls, callers end up before their callees
+        order = []
+        done = set()
+        for func in funcs:
+            if id(func) in done:
+                continue
+            done.add(id(func))
+            stack = [(func, iter(callees[id(func)]))]
+            while stack:
+                node, rest = stack[-1]
+                for callee in rest:
+                    if id(callee) not in done:
+                        done.add(id(callee))
+                        stack.append((callee, iter(callees[id(callee)])))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+        order.reverse()
+
+        seeded = {}
+        for func in order:
+
+            stored = self.functions.get(keys.get(id(func)))
+            if not stored:
+                continue
+
+            found = [known(site, types(site.func))
+                    for site in sites[id(func)]]
+            for entry in stored["entries"]:
+                if found and all(agrees(entry["context"], site)
+                        for site in found) or\
+                        not found and entry["context"] is None:
+                    break
+            else:
+                continue
+            seeded[id(func)] = entry
+
+            datatypes = entry["types"]
+            for var in func[0][:] + func[1][:] + func[2][:]:
+                type = datatypes.get(var.name)
+                if type:
+                    var.type = str(type)
+
+        return seeded
+
+    def record(self, funcs, sites, callees, keys, seeded):
+        """
+Store the datatypes of configured functions, and check the seeded ones.
+Other keys of the stored functions are removed.
+
+Args:
+    funcs (list): Functions, see `calls`
+    sites (dict): Function id to call nodes, see `calls`
+    callees (dict): Function id to called functions, see `calls`
+    keys (dict): Function id to key, see `keys`
+    seeded (dict): Function id to entry used, see `seed`
+
+Returns:
+    int: Number of seeded functions with other datatypes than stored
+        """
+
+        contexts = {}
+        for func in funcs:
+            contexts[id(func)] = set(context(node) for node in sites[id(func)])
+
+        # described by sources and call sites, including every callee
+        valid = {}
+        def summarized(func):
+            key = id(func)
+            if key not in valid:
+                valid[key] = True
+                valid[key] = len(contexts[key]) <= 1 and\
+                    not any(type in excluded for type in types(func).values())\
+                    and all(summarized(callee) for callee in callees[key])
+            return valid[key]
+
+        # keys by function, for removing the outdated ones
+        owners = {}
+        for key, stored in self.functions.items():
+            owners.setdefault(stored["function"], []).append(key)
+
+        stale = 0
+        for func in funcs:
+
+            key = id(func)
+            found = contexts[key] and min(contexts[key]) or None
+            types_ = types(func)
+
+            entry = seeded.get(key)
+            if entry is not None and (contexts[key] != set(
+                    entry["context"] is not None and [entry["context"]] or [])
+                    or types_ != entry["types"]):
+                stale += 1
+
+            if key in keys and summarized(func):
+
+                owner = func.program.name + ":" + func.name
+                for other in owners.get(owner, []):
+                    if other != keys[key]:
+                        del self.functions[other]
+                owners[owner] = [keys[key]]
+
+                entry = {"context": found, "types": types_}
+                stored = self.functions.get(keys[key])
+                entries = stored and stored["entries"] or []
+                entries = [other for other in entries
+                        if other["context"] != found]
+                self.functions[keys[key]] = {"function": owner,
+                        "entries": [entry] + entries[:limit-1]}
+
+        return stale
+
+    def configure(self, builder, suggest=True, **kws):
+        """
+Configure a project, with datatypes of unchanged functions from the store,
+and store the results.
+
+Args:
+    builder (Builder): Code constructor with loaded programs
+    suggest (bool): Uses suggestion engine to fill in types
+    **kws: Passed on to :py:func:`~matlab2cpp.configure.configure`
+
+See also:
+    :py:meth:`~matlab2cpp.Builder.configure`
+        """
+
+        project = builder.project
+        funcs, sites, callees = calls(project)
+        keys = self.keys(funcs, callees)
+
+        snapshot = None
+        if any(key in self.functions for key in keys.values()):
+            snapshot = [mc.tree.cache.dumps(program) for program in project]
+
+        seeded = self.seed(funcs, sites, callees, keys)
+        builder.configure(suggest=suggest, **kws)
+        self.seeded = len(seeded)
+        self.stale = self.record(funcs, sites, callees, keys, seeded)
+
+        if self.stale:
+
+            # configure again from scratch, as the seeded datatypes may have
+            # spread to other functions
+            del project.children[:]
+            for data in snapshot:
+                mc.tree.cache.loads(data, project)
+
+            funcs, sites, callees = calls(project)
+            keys = self.keys(funcs, callees)
+            mc.configure.configure(builder, suggest, **kws)
+            self.record(funcs, sites, callees, keys, {})
+
+    def written(self, name):
+        """
+Remember the supplement file written for a program, such that its hash is
+replaced by the one used in the keys of this run, as long as the file is
+unchanged.
+
+Args:
+    name (str): Path to Matlab file
+        """
+
+        if self.reset or name not in self.sources:
+            return
+
+        before = self.sources[name][1]
+        after = mc.manifest.digest(name + ".py")
+        if after == before:
+            self.supplements.pop(name, None)
+        else:
+            self.supplements[name] = [after, before]
+
+    def save(self):
+        "Write store to file"
+        data = {"version": mc.__version__, "layout": layout,
+                "functions": self.functions, "supplements": self.supplements}
+        f = open(self.path, "w")
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -10,25 +10,25 @@ def set(node, types):
     # Functions
     for name in types.keys():
 
-        if name in funcs.names:
+        if name in funcs:
 
             types_ = types[name]
-            func = funcs[funcs.names.index(name)]
+            func = funcs[name]
             declares, returns, params = func[:3]
 
             for key in types_.keys():
 
-                if key in declares.names:
+                if key in declares:
 
-                    if key in returns.names:
-                        var = returns[returns.names.index(key)]
+                    if key in returns:
+                        var = returns[key]
                         var.type = types_[key]
 
-                    var = declares[declares.names.index(key)]
+                    var = declares[key]
                     var.type = types_[key]
 
-                elif key in params.names:
-                    var = params[params.names.index(key)]
+                elif key in params:
+                    var = params[key]
                     var.type = types_[key]
 
 def get(node):
@@ -22,10 +22,8 @@ def set(D, code):
         
 #find nodes that contain verbatim
 def get(node):
-    nodes = node.flatten()
-
     D = {}
-    for node in nodes:
+    for node in node.walk():
         if node.cls == "Verbatim":
             D[node.name] = node.value
 
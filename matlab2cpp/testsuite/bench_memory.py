@@ -0,0 +1,106 @@
+"""
+Memory benchmark of the node tree.
+
+Compares the bytes used per node with the slot based layout of
+:py:class:`~matlab2cpp.Node` against an estimate for the earlier layout, where
+every node had an instance dictionary holding a `prop` dictionary and the
+cached references (`_line`, `_program`, ...), and a copy of its source code.
+The earlier node class is not measured. Its size is estimated by rebuilding
+the dictionaries of each node on a plain object, so the figure leaves out any
+difference in the values stored.
+
+Usage::
+
+    python -m matlab2cpp.testsuite.bench_memory [file.m ...]
+
+Without arguments a generated sample program is used.
+"""
+
+import sys
+
+import matlab2cpp as mc
+
+sample = """
+function y = f%(i)d(x)
+  y = zeros(size(x));
+  for k = 1:numel(x)
+    if x(k) > %(i)d
+      y(k) = x(k)^2 - 3*x(k) + 1;
+    else
+      y(k) = sum(x(1:k)) / k;
+    end
+  end
+end
+"""
+
+
+class Legacy(object):
+    "Stand-in for the earlier node class, with instance dictionary"
+
+
+def sizes(node):
+    """
+Bytes used by a node with current layout, and estimated for the earlier layout.
+The node code is counted, while other strings and values shared between the
+layouts are not.
+
+Args:
+    node (Node): Node to measure
+
+Returns:
+    tuple: (current, estimated earlier) number of bytes
+    """
+
+    current = sys.getsizeof(node) + sys.getsizeof(node.children)
+    if node.prop_extra is not None:
+        current += sys.getsizeof(node.prop_extra)
+    if node.prop_code is not None:
+        current += sys.getsizeof(node.prop_code)
+
+    prop = node.prop.copy()
+    legacy = Legacy()
+    legacy.children = node.children
+    legacy.parent = node.parent
+    legacy.prop = prop
+    for name in ("_declare", "_func", "_group", "_line", "_program",
+            "_project", "reference"):
+        if hasattr(node, name):
+            setattr(legacy, name, getattr(node, name))
+
+    earlier = sys.getsizeof(legacy) + sys.getsizeof(legacy.__dict__) +\
+            sys.getsizeof(prop) + sys.getsizeof(node.children)
+    if prop["code"] is not None:
+        earlier += sys.getsizeof(prop["code"])
+
+    return current, earlier
+
+
+def main(filenames):
+
+    builder = mc.Builder()
+    if filenames:
+        for filename in filenames:
+            builder.load(filename, open(filename).read())
+    else:
+        for i in xrange(20):
+            builder.load("f%d.m" % i, sample % {"i": i})
+
+    builder.configure()
+    builder.translate()
+
+    nodes = builder.project.flatten(False, False, False)
+    current = earlier = 0
+    for node in nodes:
+        c, e = sizes(node)
+        current += c
+        earlier += e
+
+    n = len(nodes)
+    print "nodes:           %d" % n
+    print "before (bytes):  %.1f per node (estimate)" % (1.*earlier/n)
+    print "after (bytes):   %.1f per node" % (1.*current/n)
+    print "reduction:       %.0f%% (estimate)" % (100.-100.*current/earlier)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
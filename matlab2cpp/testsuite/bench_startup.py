@@ -0,0 +1,79 @@
+"""
+Startup benchmark of the library.
+
+Compares the time and memory used to import :py:mod:`matlab2cpp`, and to
+convert a small file, with the rule modules imported on first use (see
+:py:func:`~matlab2cpp.rules.load`) against the earlier eager import of every
+rule module, the manual and the embedded C++ sources of
+:py:mod:`~matlab2cpp.m2cpp` and :py:mod:`~matlab2cpp.pyplot`. Each
+measurement runs in a fresh interpreter.
+
+Usage::
+
+    python -m matlab2cpp.testsuite.bench_startup [repeats]
+"""
+
+import os
+import sys
+import subprocess
+
+# run in a fresh interpreter, printing time, peak memory and modules loaded
+child = """
+import sys, time, resource
+start = time.time()
+import matlab2cpp as mc
+if %(eager)s:
+    for name in mc.rules.names:
+        mc.rules.load(name)
+    import matlab2cpp.manual, matlab2cpp.m2cpp, matlab2cpp.pyplot
+if %(convert)s:
+    mc.qcpp("function y = f(x)\\n  y = x + 1;\\nend")
+print time.time() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,\\
+    len([name for name in sys.modules if name.startswith("matlab2cpp.")
+        and sys.modules[name] is not None])
+"""
+
+
+def measure(eager, convert, repeats):
+    """
+Best time, peak memory and number of modules of fresh interpreters.
+
+Args:
+    eager (bool): Import everything up front, like before
+    convert (bool): Also convert a small function
+    repeats (int): Number of interpreters started
+
+Returns:
+    tuple: Seconds, kilobytes and number of modules
+    """
+
+    code = child % {"eager": eager, "convert": convert}
+    path = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = path + os.pathsep + env.get("PYTHONPATH", "")
+
+    best = None
+    for i in xrange(repeats):
+        out = subprocess.check_output([sys.executable, "-c", code], env=env)
+        seconds, memory, modules = out.split()
+        value = float(seconds), int(memory), int(modules)
+        if best is None or value[0] < best[0]:
+            best = value
+    return best
+
+
+def main(repeats=5):
+
+    print "%-10s %-8s %10s %10s %8s" % ("", "", "time (s)", "peak (KB)",
+            "modules")
+    for convert in (False, True):
+        for eager in (True, False):
+            seconds, memory, modules = measure(eager, convert, repeats)
+            print "%-10s %-8s %10.3f %10d %8d" % (
+                    convert and "convert" or "import",
+                    eager and "before" or "after", seconds, memory, modules)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -398,3 +398,188 @@ void ar_modeling(cx_vec x, int lf, double mu, cx_vec& yf, cx_vec& yb)
 
 if __name__ == "__main__":
     os.system("py.test --tb short")
+
+
+def test_incremental():
+    """Test incremental conversion of a file with an unknown name
+    """
+
+    os.chdir(path)
+
+    f = open("inc.m", "w")
+    f.write("a = 1\nb = foo(a)\n")
+    f.close()
+
+    # without manifest
+    if os.path.isfile("inc.m.manifest"):
+        os.remove("inc.m.manifest")
+
+    assert os.system("mconvert inc.m -s --incremental > /dev/null") == 0
+    assert os.path.isfile("inc.m.manifest")
+    assert os.path.isfile("inc.m.cpp")
+
+    # with manifest, nothing changed
+    assert os.system("mconvert inc.m -s --incremental > /dev/null") == 0
+
+    # with manifest, the unknown name appears as a file
+    f = open("foo.m", "w")
+    f.write("function y=foo(x)\n    y = x+1\nend\n")
+    f.close()
+
+    assert os.system("mconvert inc.m -s --incremental > /dev/null") == 0
+    assert os.path.isfile("foo.m.hpp")
+
+    f = open("inc.m.cpp", "r")
+    converted_code = f.read()
+    f.close()
+
+    assert '#include "foo.m.hpp"' in converted_code
+    assert "int a, b ;" in converted_code
+
+    os.remove("foo.m")
+
+
+def test_cache():
+    """Test conversion through the parse cache
+    """
+
+    os.chdir(path)
+
+    f = open("cached.m", "w")
+    f.write("a = 1 % one\nb = a + 2\n")
+    f.close()
+
+    def convert(options):
+        assert os.system("mconvert cached.m -rs --deterministic %s > /dev/null"
+                % options) == 0
+        f = open("cached.m.cpp", "r")
+        converted_code = f.read()
+        f.close()
+        return converted_code
+
+    cache = os.path.join(path, "cache")
+
+    # miss, then hit
+    first = convert("--cache-dir " + cache)
+    assert len(os.listdir(cache)) == 1
+    second = convert("--cache-dir " + cache)
+    assert len(os.listdir(cache)) == 1
+    assert first == second == convert("")
+
+    # other builder options miss the cache
+    stripped = convert("-c --cache-dir " + cache)
+    assert len(os.listdir(cache)) == 2
+    assert stripped == convert("-c")
+    assert stripped != first
+
+
+def test_jobs():
+    """Test translation in worker processes against serial translation
+    """
+
+    os.chdir(path)
+
+    f = open("jobs.m", "w")
+    f.write("a = [1, 2, 3]\nb = jobs_helper(a)\n")
+    f.close()
+
+    f = open("jobs_helper.m", "w")
+    f.write("function y=jobs_helper(x)\n    y = x*2\nend\n")
+    f.close()
+
+    def convert(options):
+        assert os.system("mconvert jobs.m -rs --deterministic %s > /dev/null"
+                % options) == 0
+        out = []
+        for name in ("jobs.m.cpp", "jobs_helper.m.hpp"):
+            f = open(name, "r")
+            out.append(f.read())
+            f.close()
+        return out
+
+    assert convert("-j 2") == convert("")
+
+
+def test_recursion_suggestion():
+    """Test suggestions through mutually recursive functions and call chains
+    """
+
+    os.chdir(path)
+
+    files = {
+        "ev.m": "function y = ev(n)\nif n == 0\n  y = 1;\nelse\n"
+                "  y = od(n - 1);\nend\nend\n",
+        "od.m": "function y = od(n)\nif n == 0\n  y = 0;\nelse\n"
+                "  y = ev(n - 1);\nend\nend\n",
+        "recursion.m": "a = ev(4);\nb = chain_f(2.5);\n",
+        "chain_f.m": "function y = chain_f(x)\ny = chain_g(x);\nend\n",
+        "chain_g.m": "function y = chain_g(x)\ny = 1;\nz = x;\nend\n",
+    }
+    for name, code in files.items():
+        f = open(name, "w")
+        f.write(code)
+        f.close()
+
+    assert os.system("mconvert recursion.m -rs > /dev/null") == 0
+
+    def read(name):
+        f = open(name, "r")
+        code = f.read()
+        f.close()
+        return code
+
+    assert "int ev(int n)" in read("ev.m.hpp")
+    assert "int od(int n)" in read("od.m.hpp")
+    assert "int chain_f(double x)" in read("chain_f.m.hpp")
+    assert "int chain_g(double x)" in read("chain_g.m.hpp")
+
+
+def test_summaries():
+    """Test conversion with datatypes of functions from earlier runs
+    """
+
+    os.chdir(path)
+
+    f = open("sumlib.m", "w")
+    f.write("function y = sumlib(x)\ny = x + 1;\nend\n")
+    f.close()
+
+    f = open("summain.m", "w")
+    f.write("a = sumlib(2);\n")
+    f.close()
+
+    def convert(options):
+        proc = Popen("mconvert summain.m -s -d --deterministic " + options,
+                shell=True, stdout=PIPE)
+        out = proc.communicate()[0]
+        assert proc.returncode == 0
+        lines = [line for line in out.split("\n")
+                if line.startswith("datatypes of")]
+        out = []
+        for name in ("summain.m.cpp", "sumlib.m.hpp"):
+            f = open(name, "r")
+            out.append(f.read())
+            f.close()
+        return lines, out
+
+    store = "--summaries summaries.json"
+
+    # stored on first run, seeded on second, although the supplement files
+    # were written in between
+    lines, first = convert(store)
+    assert lines == ["datatypes of 0 functions from summaries.json, 0 changed"]
+    lines, second = convert(store)
+    assert lines == ["datatypes of 2 functions from summaries.json, 0 changed"]
+    assert first == second == convert("")[1]
+    assert "int sumlib(int x)" in second[1]
+
+    # the stored entry is not used with other datatypes at the call site
+    f = open("summain.m", "w")
+    f.write("a = sumlib(2.5);\n")
+    f.close()
+    os.remove("summain.m.py")
+    os.remove("sumlib.m.py")
+
+    lines, third = convert(store)
+    assert lines == ["datatypes of 0 functions from summaries.json, 0 changed"]
+    assert "double sumlib(double x)" in third[1]
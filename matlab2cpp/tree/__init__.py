@@ -51,6 +51,8 @@ In addition a collectio of genereal purpose modules are available:
 | :py:mod:`matlab2cpp.tree.iterate`   | Support functions for segmentation of |
 |                                     | lists                                 |
 +-------------------------------------+---------------------------------------+
+| :py:mod:`matlab2cpp.tree.lexer`     | Single pass token stream of the code  |
++-------------------------------------+---------------------------------------+
 """
 
 import matlab2cpp as mc
@@ -77,7 +77,7 @@ Example:
     if len(l[0]) == 1:
         return self.create_assign(parent, l[0][0][0], eq_loc)
 
-    assigns = mc.collection.Assigns(parent, cur=cur, code=self.code[cur:end+1])
+    assigns = mc.collection.Assigns(parent, cur=cur, span=(cur, end+1))
 
     for vector in l:
         for start,stop in vector:
@@ -142,7 +142,7 @@ Example:
         print "%-20s" % "assign.single",
         print repr(self.code[cur:end+1])
 
-    assign = mc.collection.Assign(parent, cur=cur, code=self.code[cur:end+1])
+    assign = mc.collection.Assign(parent, cur=cur, span=(cur, end+1))
 
     cur = self.create_assign_variable(assign, cur, eq_loc)
 
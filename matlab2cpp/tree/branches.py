@@ -87,7 +87,7 @@ Example:
 
     cur = self.create_codeblock(trybranch, cur)
 
-    trybranch.code = self.code[start:cur]
+    trybranch.span = (start, cur)
 
     if  self.code[cur:cur+5] != "catch" or self.code[cur+5] not in c.k_end:
         self.syntaxerror(cur, "start of catch-block")
@@ -101,8 +101,8 @@ Example:
 
     cur = self.create_codeblock(catch_, cur)
 
-    catch_.code = self.code[start_:cur]
-    tryblock.code = self.code[start:cur]
+    catch_.span = (start_, cur)
+    tryblock.span = (start, cur)
 
     return cur
 
@@ -305,7 +305,7 @@ Example:
 
     end = self.create_codeblock(whileloop, cur)
 
-    whileloop.code = self.code[start:end+1]
+    whileloop.span = (start, end+1)
 
     return end
 
@@ -354,7 +354,7 @@ def parforloop(self, parent, cur):
 
     end = self.create_codeblock(parfor_loop, cur)
 
-    parfor_loop.code = self.code[start:end]
+    parfor_loop.span = (start, end)
 
     return end
 
@@ -443,7 +443,7 @@ Example:
 
     end = self.create_codeblock(for_loop, cur)
 
-    for_loop.code = self.code[start:end]
+    for_loop.span = (start, end)
 
     return end
 
@@ -534,12 +534,12 @@ Example:
     cur = end+1
 
     end = self.create_codeblock(node, cur)
-    node.code = self.code[cur:end]
+    node.span = (cur, end)
     cur = end
 
     while self.code[cur:cur+6] == "elseif" and self.code[cur+6] in c.k_end:
 
-        node.code = self.code[start:cur]
+        node.span = (start, cur)
         start = cur
 
         cur += 6
@@ -567,7 +567,7 @@ Example:
 
 
     cur = end
-    node.code = self.code[start:cur]
+    node.span = (start, cur)
 
     if self.code[cur:cur+4] == "else" and self.code[cur+4] in c.k_end:
 
@@ -583,9 +583,9 @@ Example:
         node = mc.collection.Else(branch, cur=start)
 
         end = self.create_codeblock(node, cur)
-        node.code = self.code[start:end+1]
+        node.span = (start, end+1)
 
-    branch.code = self.code[start:end+1]
+    branch.span = (start, end+1)
 
     return end
 
@@ -8,6 +8,8 @@ import assign
 import codeblock
 import suppliment
 import identify
+import lexer
+import cache
 
 import matlab2cpp as mc
 
@@ -53,13 +55,17 @@ code through the front end functions in :py:mod:`matlab2cpp.qfunctions`::
     }
     """
 
-    def __init__(self, disp=False, comments=True, original=False, **kws):
+    def __init__(self, disp=False, comments=True, original=False, cache=None,
+            **kws):
         """
 Args:
     disp (bool):
         Verbose output while loading code
     comments (bool):
         Include comments in the code interpretation
+    cache (str, optional):
+        Directory for caching loaded programs between runs. See
+        :py:mod:`matlab2cpp.tree.cache`.
     **kws: 
         Optional arguments are passed to :py:mod:`matlab2cpp.rules`
         """
@@ -67,8 +73,10 @@ Args:
         self.disp = disp
         self.comments = comments
         self.original = original
+        self.cache = cache
         self.project = mc.collection.Project()
-        self.project.kws = kws
+        self.project.translation = mc.dispatch.Translation(kws)
+        self.project.kws = self.project.translation.kws
         self.project.builder = self
 
         self.configured = False
@@ -122,6 +130,9 @@ The code is inserted into the attribute `self.code` and initiate the
 ``create_*`` methods. Each method creates nodes and/or pushes the job over to
 other create methods.
 
+If the builder has a cache directory, the program is retrieved from there if
+the same code has been loaded before, and stored there if not.
+
 Args:
     name (str): Name of program (usually valid filename).
     code (str): Matlab code to be loaded
@@ -160,10 +171,22 @@ Example::
                 l = m
         
         self.code = code + "\n\n\n"
+
+        self.tokens = lexer.tokenize(self.code)
+        self.lines = lexer.Lines(self.code)
+
+        use_cache = self.cache and not self.disp
+        if use_cache:
+            key = cache.key(name, self.code, self.comments, self.original)
+            program = cache.load(self.cache, key, self.project)
+            if program is not None:
+                self.lines = program.lines
+                return
+
         self.create_program(name)
 
-        index = self.project.names.index(name)
-        program = self.project[index]
+        program = self.project.children.lookup(name)
+        symbols = self.project.symbols
 
         nodes = program.flatten(False, True, False)
         # Find if some names should be reserved
@@ -175,7 +198,9 @@ Example::
                 continue
 
             if node.name not in unassigned:
-                unassigned[node.name] = True
+                # functions of the program are neither unknown nor reserved
+                unassigned[node.name] =\
+                        symbols.local(node.name, program) is None
 
             if node.parent.cls in ("Params", "Declares"):
                 unassigned[node.name] = False
@@ -195,6 +220,9 @@ Example::
 
         program.unassigned = unassigned
 
+        if use_cache:
+            cache.dump(self.cache, key, program)
+
 
     def get_unknowns(self, index=-1):
         """
@@ -212,7 +240,7 @@ Example:
     ['a', 'c', 'b']
         """
         if isinstance(index, str):
-            index = self.project.names.index(index)
+            return self.project.children.lookup(index).unassigned
         assert isinstance(index, int)
         return self.project[index].unassigned
 
@@ -223,6 +251,8 @@ Configure node tree with datatypes.
 
 Args:
     suggest (bool): Uses suggestion engine to fill in types
+    **kws: Passed on to :py:func:`~matlab2cpp.configure.configure`, like
+        `limit` for the maximum number of passes
 
 Example::
     >>> builder = mc.Builder()
@@ -342,15 +372,10 @@ Example::
     Expected: example of error
     """
 
-        start = cur-1
-        while start > 0 and self.code[start] != "\n":
-            start -= 1
-
-        end = cur+1
-        while end < len(self.code) and self.code[end] != "\n":
-            end += 1
+        start = max(self.lines.rfind(cur), 0)
+        end = self.lines.find(cur+1)
 
-        out = "line %d in Matlab code:\n" % (self.code.count("\n", 0, cur)+1)
+        out = "line %d in Matlab code:\n" % self.lines.line_of(cur)
         out += self.code[start:end] + "\n" + " "*(cur-start) + "^\n"
         out += "Expected: " + text
         raise SyntaxError(out)
@@ -0,0 +1,257 @@
+"""
+On-disk cache of loaded node trees.
+
++------------------------------------------------+-----------------------------+
+| Function                                       | Description                 |
++================================================+=============================+
+| :py:func:`~matlab2cpp.tree.cache.key`          | Cache key from program name |
+|                                                | and code                    |
++------------------------------------------------+-----------------------------+
+| :py:func:`~matlab2cpp.tree.cache.load`         | Retrieve program from cache |
++------------------------------------------------+-----------------------------+
+| :py:func:`~matlab2cpp.tree.cache.dump`         | Store program in cache      |
++------------------------------------------------+-----------------------------+
+| :py:func:`~matlab2cpp.tree.cache.evict`        | Remove least recently used  |
+|                                                | entries                     |
++------------------------------------------------+-----------------------------+
+| :py:func:`~matlab2cpp.tree.cache.dumps`        | Serialize program           |
++------------------------------------------------+-----------------------------+
+| :py:func:`~matlab2cpp.tree.cache.loads`        | Deserialize program into    |
+|                                                | project                     |
++------------------------------------------------+-----------------------------+
+
+Programs are stored as pickled `Program` subtrees in files named after the
+SHA-1 hash of the translator version, the node layout, the builder options
+`comments` and `original`, the program name and the code. The project root is
+not stored, but replaced with the project of the builder loading the program
+from the cache. Entries are touched when used, and the least recently used
+entries are removed when the cache grows beyond `limit`.
+
+Example:
+    >>> import tempfile, shutil
+    >>> path = tempfile.mkdtemp()
+    >>> builder = mc.Builder(cache=path)
+    >>> builder.load("prg.m", "a = 1")
+    >>> print len(os.listdir(path))
+    1
+    >>> builder = mc.Builder(cache=path)
+    >>> builder.load("prg.m", "a = 1")
+    >>> print mc.qscript(builder[0])
+    a = 1 ;
+
+A program is only retrieved by builders with the same options::
+
+    >>> code = "a = 1 % one"
+    >>> builder = mc.Builder(comments=False, cache=path)
+    >>> builder.load("prg.m", code)
+    >>> builder = mc.Builder(comments=True, cache=path)
+    >>> builder.load("prg.m", code)
+    >>> print mc.qscript(builder[0])
+    a = 1 ; // one
+    >>> print len(builder.tokens)
+    3
+    >>> shutil.rmtree(path)
+
+Cached traversals of the nodes are not stored::
+
+    >>> builder = mc.Builder()
+    >>> builder.load("prg.m", "a = 1")
+    >>> print len(builder[0].flatten())
+    16
+    >>> program = loads(dumps(builder[0]), mc.Builder().project)
+    >>> print hasattr(program, "_flatten")
+    False
+    >>> var = mc.Var(program[1][0][3], "zzz")
+    >>> nodes = program.flatten()
+    >>> print len(nodes), var in nodes
+    17 True
+"""
+
+import os
+import hashlib
+import tempfile
+import cPickle as pickle
+from cStringIO import StringIO
+
+import matlab2cpp as mc
+
+# Maximum size of cache directory in bytes
+limit = 256*2**20
+
+# Version of the stored node layout, part of the cache key
+layout = 3
+
+suffix = ".tree"
+
+
+def key(name, code, comments=True, original=False):
+    """
+Create cache key for a program.
+
+Args:
+    name (str): Name of program
+    code (str): Matlab code
+    comments (bool): Comments are part of the tree, see
+        :py:class:`~matlab2cpp.Builder`
+    original (bool): Original code is included in the translation, see
+        :py:class:`~matlab2cpp.Builder`
+
+Returns:
+    str: hexadecimal hash
+
+Example:
+    >>> print key("prg.m", "a = 1") == key("prg.m", "a = 1", comments=False)
+    False
+    """
+    sha = hashlib.sha1()
+    sha.update(str(mc.__version__) + "\0" + str(layout) + "\0")
+    sha.update("%d%d\0" % (bool(comments), bool(original)))
+    sha.update(name + "\0")
+    sha.update(code)
+    return sha.hexdigest()
+
+
+def dumps(program):
+    """
+Serialize a program without the project it belongs to.
+
+Args:
+    program (Node): Program to serialize
+
+Returns:
+    str: Serialized program
+    """
+
+    project = program.project
+    f = StringIO()
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda obj: obj is project and "project" or None
+    pickler.dump(program)
+    return f.getvalue()
+
+
+def loads(data, project):
+    """
+Deserialize a program and attach it to a project.
+
+Args:
+    data (str): Serialized program from :py:func:`~matlab2cpp.tree.cache.dumps`
+    project (Node): Project the program is attached to
+
+Returns:
+    Node: The program
+    """
+
+    unpickler = pickle.Unpickler(StringIO(data))
+    unpickler.persistent_load = lambda pid: project
+    program = unpickler.load()
+    project.children.append(program)
+    return program
+
+
+def load(path, key, project):
+    """
+Retrieve program from cache.
+
+Args:
+    path (str): Cache directory
+    key (str): Cache key from :py:func:`~matlab2cpp.tree.cache.key`
+    project (Node): Project the program is attached to
+
+Returns:
+    Node, None: The program, or None if not in cache or unreadable.
+    """
+
+    filename = os.path.join(path, key + suffix)
+    if not os.path.isfile(filename):
+        return None
+
+    try:
+        f = open(filename, "rb")
+        data = f.read()
+        f.close()
+        program = loads(data, project)
+    except Exception:
+        return None
+
+    try:
+        os.utime(filename, None)
+    except OSError:
+        pass
+
+    return program
+
+
+def dump(path, key, program):
+    """
+Store program in cache.
+
+The file is written to a temporary name first and renamed into place, such
+that concurrent processes never see partial entries.
+
+Args:
+    path (str): Cache directory
+    key (str): Cache key from :py:func:`~matlab2cpp.tree.cache.key`
+    program (Node): Program to store
+    """
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    fd, tmp = tempfile.mkstemp(dir=path)
+    f = os.fdopen(fd, "wb")
+    try:
+        f.write(dumps(program))
+        f.close()
+        os.rename(tmp, os.path.join(path, key + suffix))
+
+    except Exception:
+        f.close()
+        os.remove(tmp)
+        return
+
+    evict(path)
+
+
+def evict(path, size=None):
+    """
+Remove least recently used entries until cache is below size limit.
+
+Args:
+    path (str): Cache directory
+    size (int, optional): Size limit in bytes. Defaults to `limit`.
+    """
+
+    if size is None:
+        size = limit
+
+    entries = []
+    total = 0
+    for name in os.listdir(path):
+        if not name.endswith(suffix):
+            continue
+        filename = os.path.join(path, name)
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, filename))
+        total += stat.st_size
+
+    if total <= size:
+        return
+
+    entries.sort()
+    for mtime, fsize, filename in entries:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        total -= fsize
+        if total <= size:
+            break
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
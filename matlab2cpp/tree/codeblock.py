@@ -95,7 +95,7 @@ Example:
                     print "%-20s" % "codeblock.codeblock",
                     print repr(self.code[cur:end+1])
 
-                statement.code = self.code[cur:end+1]
+                statement.span = (cur, end+1)
 
                 cur = self.create_expression(
                         statement, cur, end=end)
@@ -110,7 +110,7 @@ Example:
                 print repr(self.code[cur:end+1])
 
             statement = mc.collection.Statement(block, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             cur = self.create_string(statement, cur)
 
@@ -190,7 +190,7 @@ Example:
                     print repr(self.code[cur:end+1])
 
                 statement = mc.collection.Statement(block, cur=cur,
-                        code=self.code[cur:end+1])
+                        span=(cur, end+1))
 
                 cur = self.create_expression(statement,
                         cur, end=end)
@@ -200,7 +200,7 @@ Example:
         if len(self.code)-cur<3:
             break
 
-    block.code = self.code[start:cur+1]
+    block.span = (start, cur+1)
     return cur
 
 
@@ -4,24 +4,40 @@ Expression interpretor
 
 import matlab2cpp as mc
 import findend
-import identify
+import lexer
 import constants as c
 
 
-def create(self, node, start, end=None, start_opr=None):
+# Operators ordered from loosest to tightest binding. Each operator has its own
+# level, and repeated use of the same operator is collected in a single node.
+operators = [
+    "||", "&&", "|", "&",
+    "~=", "==", ">=", ">", "<=", "<",
+    ":", "+", "-",
+    ".*", "*", "./", "/", ".\\", "\\",
+    ".^", "^"]
+
+precedence = dict((opr, i) for i, opr in enumerate(operators))
+
+
+class Resync(Exception):
+    "Token stream is out of sync with the code range"
+
+
+def create(self, node, start, end=None):
     """
 Create expression in three steps:
 
-    1) In order, split into sub-expressions for each dividing operator
-    2) Address prefixes, postfixes, parenthesises, etc.
-    3) Identify the remaining singleton
+    1) Retrieve the tokens of the expression from `self.tokens`
+    2) Split into sub-expressions by operator precedence (see `parse`)
+    3) Address prefixes, postfixes, parenthesises, etc. and identify the
+       remaining singletons (see `leaf`)
 
 Args:
     self (Builder): Code constructor.
     node (Node): Reference to the parent node
     start (int): current possition in code
     end (int, optional): end of expression. Required for space-delimited expression.
-    start_opr (str, optional): At which operator the recursive process is. (For internal use)
 
 Returns:
 	int : index to end of the expression
@@ -91,102 +107,234 @@ Examples::
     if  self.code[start] not in c.e_start:
         self.syntaxerror(start, "expression start")
 
+    tree = parse(self, start, end)
+    return construct(self, node, tree)
+
+
+def parse(self, start, end):
+    """
+Split expression into operator tree using precedence climbing over the token
+stream. The tree consists of 4-tuples ``(opr, start, end, trees)``, where
+`opr` is None for operands not containing any operators.
+
+Args:
+    self (Builder): Code constructor.
+    start (int): current possition in code
+    end (int): end of expression
+
+Returns:
+    tuple: root of the operator tree
+
+Example::
+
+    >>> builder = mc.Builder()
+    >>> builder.load("unnamed", "a+b-c+d*e")
+    >>> print parse(builder, 0, 8)
+    ('+', 0, 8, [(None, 0, 0, None), ('-', 2, 4, [(None, 2, 2, None), (None, 4, 4, None)]), ('*', 6, 8, [(None, 6, 6, None), (None, 8, 8, None)])])
+    """
+
+    tokens = self.tokens
+    i = tokens.index.get(start, -1)
+
+    try:
+        if i == -1:
+            raise Resync()
+        tree, i = climb(self, tokens, i, end, 0)
+
+    # fall back to tokenize range locally
+    except Resync:
+        tokens = lexer.tokenize(self.code, start, end+1)
+        try:
+            tree, i = climb(self, tokens, 0, end, 0)
+
+        # unbalanced; let the leaf constructors report the error
+        except Resync:
+            tree = (None, start, end, None)
 
-    operators = [
-        "||", "&&", "|", "&",
-        "~=", "==", ">=", ">", "<=", "<",
-        ":", "+", "-",
-        ".*", "*", "./", "/", ".\\", "\\",
-        ".^", "^"]
+    return tree
 
-    if not (start_opr is None):
-        operators = operators[operators.index(start_opr)+1:]
 
-    for opr in operators:
-        # Pre-screen
-        if opr not in self.code[start:end+1]:
-            continue
+def climb(self, tokens, i, end, level):
+    """
+Precedence climbing of operators with precedence at or above `level`.
+
+Args:
+    self (Builder): Code constructor.
+    tokens (Tokens): Token stream
+    i (int): current token index
+    end (int): end of expression
+    level (int): lowest operator precedence to include
+
+Returns:
+    tuple: operator tree and index to the next token
+    """
+
+    code = self.code
+    starts, ends = tokens.starts, tokens.ends
+    n = len(starts)
+
+    tree, i = operand(self, tokens, i, end)
+
+    while i < n and starts[i] <= end:
+
+        opr = code[starts[i]:ends[i]+1]
+        prec = precedence[opr]
+        if prec < level:
+            break
 
-        starts = [start]
-        last = start
-        ends = []
+        trees = [tree]
+        while i < n and starts[i] <= end and code[starts[i]:ends[i]+1] == opr:
+            tree, i = climb(self, tokens, i+1, end, prec+1)
+            trees.append(tree)
 
-        k = start
-        while True:
+        tree = (opr, trees[0][1], trees[-1][2], trees)
+
+    return tree, i
+
+
+def operand(self, tokens, i, end):
+    """
+Find extent of an operand. The operand runs until the next infix operator
+outside any parenthesis.
+
+Args:
+    self (Builder): Code constructor.
+    tokens (Tokens): Token stream
+    i (int): current token index
+    end (int): end of expression
+
+Returns:
+    tuple: operand leaf and index to the next token
+    """
 
-            if self.code[k] == "(":
-                k = last = findend.paren(self, k)
+    code = self.code
+    kinds, starts, ends, match = \
+            tokens.kinds, tokens.starts, tokens.ends, tokens.match
+    n = len(kinds)
 
-            elif self.code[k] == "[":
-                k = last = findend.matrix(self, k)
+    if i >= n or starts[i] > end:
+        self.syntaxerror(ends[i-1]+1, "expression start")
 
-            elif self.code[k] == "{":
-                k = last = findend.cell(self, k)
+    first = i
+    last = -1
+    after = False
 
-            elif self.code[k] == "'":
-                if identify.string(self, k):
-                    k = last = findend.string(self, k)
-                else:
-                    last = k
+    while i < n and starts[i] <= end:
 
-            elif opr == self.code[k:k+len(opr)]:
+        if ends[i] > end:
+            raise Resync()
 
-                if opr in "+-":
-                    # no prefixes and no (scientific) numbers
-                    if self.code[last] not in c.letters+c.digits+")]}" or\
-                            self.code[k-1] in "dDeE" and self.code[k-2] in\
-                            c.digits+"." and self.code[k+1] in c.digits:
-                        k += 1
-                        continue
+        kind = kinds[i]
 
+        if kind == "op":
 
-                k += len(opr)-1
-                while self.code[k+1] in " \t":
-                    k += 1
+            opr = code[starts[i]:ends[i]+1]
 
-                # no all-operator
-                if opr == ":" and self.code[k+1] in ",;\n)]}":
-                    k += 1
-                    continue
+            if not after:
 
-                starts.append(k+1)
-                ends.append(last)
+                # prefixes and all-operator
+                if opr not in "-+~:" or len(opr) != 1:
+                    self.syntaxerror(starts[i], "expression start")
 
-            elif self.code[k] in c.letters+c.digits+"_":
-                last = k
+            # no all-operator
+            elif opr == ":" and (i+1 == n or starts[i+1] > end):
+                pass
 
-            k += 1
-            if k >= end:
-                ends.append(end)
+            elif opr != "~":
                 break
 
-        if len(ends)>1:
+            after = False
 
-            node = retrieve_operator(self, opr)(node)
-            node.cur = start
-            node.code = self.code[starts[0]:ends[-1]+1]
+        elif kind == "open":
+
+            j = match[i]
+            if j == -1 or starts[j] > end:
+                raise Resync()
+            i = j
+            after = True
+
+        elif kind in ("name", "number", "string", "close", "post"):
+            after = True
+
+        else:
+            after = False
+
+        last = i
+        i += 1
 
-            for s,e in zip(starts, ends):
-                create(self, node, s, e, opr)
+    if last == -1 or not after and kinds[last] == "op" and\
+            code[starts[last]] != ":":
+        self.syntaxerror(ends[last]+1, "expression start")
 
-            return end
+    return (None, starts[first], ends[last], None), i
 
 
-    # All operators removed at this point!
+def construct(self, node, tree):
+    """
+Create nodes from operator tree.
+
+Args:
+    self (Builder): Code constructor.
+    node (Node): Reference to the parent node
+    tree (tuple): operator tree created by `parse`
+
+Returns:
+	int : index to end of the expression
+    """
+
+    opr, start, end, trees = tree
+
+    if opr is None:
+        return leaf(self, node, start, end)
+
+    node = retrieve_operator(self, opr)(node, cur=start,
+            span=(start, end+1))
+
+    for tree in trees:
+
+        if self.disp:
+            print "%4d     Expression " % (tree[1]),
+            print "%-20s" % "expression.create",
+            print repr(self.code[tree[1]:tree[2]+1])
+
+        construct(self, node, tree)
+
+    return end
+
+
+def leaf(self, node, start, end):
+    """
+Create expression without infix operators.
+
+Args:
+    self (Builder): Code constructor.
+    node (Node): Reference to the parent node
+    start (int): current possition in code
+    end (int): end of expression
+
+Returns:
+	int : index to end of the expression
+    """
+
+    if  self.code[start] not in c.e_start:
+        self.syntaxerror(start, "expression start")
 
     END = end
 
     # Prefixes
-    while self.code[start] in "-~":
+    while self.code[start] in "-+~":
+
+        if self.code[start] == "+":
+            start += 1
 
-        if self.code[start] == "-":
+        elif self.code[start] == "-":
 
-            node = mc.collection.Neg(node, cur=start, code=self.code[start:end+1])
+            node = mc.collection.Neg(node, cur=start, span=(start, end+1))
             start += 1
 
-        if self.code[start] == "~":
+        elif self.code[start] == "~":
 
-            node = mc.collection.Not(node, cur=start, code=self.code[start:end+1])
+            node = mc.collection.Not(node, cur=start, span=(start, end+1))
             start += 1
 
         while self.code[start] in " \t":
@@ -196,13 +344,13 @@ Examples::
     if self.code[end] == "'" and not self.code[start] == "'":
         if self.code[end-1] == ".":
             node = mc.collection.Transpose(node, cur=start,
-                    code=self.code[start:end+1])
+                    span=(start, end+1))
             end -= 2
         else:
             node = mc.collection.Ctranspose(node, cur=start,
-                    code=self.code[start:end+1])
+                    span=(start, end+1))
             node.cur = start
-            node.code = self.code[start:end+1]
+            node.span = (start, end+1)
             end -= 1
 
         while self.code[end] in " \t":
@@ -213,7 +361,7 @@ Examples::
         if self.code[end] != ")":
             self.syntaxerror(end, "parenthesis end")
 
-        node = mc.collection.Paren(node, cur=start, code=self.code[start:end+1])
+        node = mc.collection.Paren(node, cur=start, span=(start, end+1))
 
         start += 1
         while self.code[start] in " \t":
@@ -227,13 +375,13 @@ Examples::
 
     # Reserved keywords
     elif self.code[start:start+3] == "end": # and self.code[start+3] in " \t" + c.e_end:
-        node = mc.collection.End(node, cur=start, code=self.code[start:start+3])
+        node = mc.collection.End(node, cur=start, span=(start, start+3))
 
     elif self.code[start:start+6] == "return" and self.code[start+6] in " ,;\n":
-        node = mc.collection.Return(node, cur=start, code=self.code[start:start+6])
+        node = mc.collection.Return(node, cur=start, span=(start, start+6))
 
     elif self.code[start:start+5] == "break" and self.code[start+5] in " ,;\n":
-        node = mc.collection.Break(node, cur=start, code=self.code[start:start+5])
+        node = mc.collection.Break(node, cur=start, span=(start, start+5))
 
 
     # Rest
@@ -244,8 +392,8 @@ Examples::
         if "\n" in self.code[start:end]:
             self.syntaxerror(end, "non line-feed characters in string")
 
-        mc.collection.String(node, self.code[start+1:end], cur=start,
-                code=self.code[start:end+1])
+        mc.collection.String(node, self.code[start+1:end].replace("''", "'"),
+                cur=start, span=(start, end+1))
 
     elif self.code[start] in c.digits or\
             self.code[start] == "." and self.code[start+1] in c.digits:
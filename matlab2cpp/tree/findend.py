@@ -1,6 +1,11 @@
 """
 Look-ahead routines to find end character.
 
+Matching delimiters and string ends are looked up in the table
+`builder.tokens.closing` created in :py:func:`~matlab2cpp.Builder.load`.
+The character scanning is only used where the table has no entry, which
+is the case for malformed code, such that the error messages are unchanged.
+
 +------------------------------------------------------+------------------------+
 | Function                                             | Description            |
 +======================================================+========================+
@@ -30,6 +35,7 @@ Look-ahead routines to find end character.
 
 import constants as c
 import identify
+import lexer
 
 def expression(self, start):
     """
@@ -179,6 +185,10 @@ Returns:
     if  self.code[start] != "[":
         self.syntaxerror(start, "matrix start ([)")
 
+    k = self.tokens.closing.get(start, -1)
+    if k != -1:
+        return k
+
     k = start+1
 
     if identify.space_delimited(self, start):
@@ -238,7 +248,13 @@ Returns:
     if self.code[start] != "'":
         self.syntaxerror(start, "start of string (')")
 
+    k = self.tokens.closing.get(start, -1)
+    if k != -1:
+        return k
+
     k = self.code.find("'", start+1)
+    while k != -1 and self.code[k+1:k+2] == "'":
+        k = self.code.find("'", k+2)
     if k == -1:
         self.syntaxerror(start, "matching end of string (')")
 
@@ -272,13 +288,9 @@ Returns:
         self.syntaxerror(start, "comment start")
 
     # block comment
-    if self.code[start+1] == "{":
-        eoc = self.code.find("%}", start+2)
-
-        if eoc <= -1:
-            self.syntaxerror(start, "matching end of comment block (%})")
-
-        return eoc+1
+    eoc = lexer.block_comment(self.code, start)
+    if eoc != -1:
+        return eoc
 
     # Line comment
     eoc = self.code.find("\n", start)
@@ -341,6 +353,10 @@ Returns:
     if self.code[start] != "(":
         self.syntaxerror(start, "start parenthesis")
 
+    k = self.tokens.closing.get(start, -1)
+    if k != -1:
+        return k
+
     k = start+1
     while True:
 
@@ -380,6 +396,17 @@ Returns:
     if  self.code[start] != "{":
         self.syntaxerror(start, "start of cell ({)")
 
+    # chained cell-parenthesis are part of the same group
+    closing = self.tokens.closing
+    k = closing.get(start, -1)
+    while k != -1:
+        l = k+1
+        while self.code[l] in " \t":
+            l += 1
+        if self.code[l] != "{":
+            return k
+        k = closing.get(l, -1)
+
     k = start
     while True:
 
@@ -70,6 +70,7 @@ Example:
 
     # Create intial nodes
     program = mc.collection.Program(self.project, name=name, cur=0, code=self.code)
+    program.lines = self.lines
     includes = mc.collection.Includes(program, value=name, code='')
     funcs = mc.collection.Funcs(program, name=name)
 
@@ -194,7 +195,7 @@ Example:
         name = self.code[k:l+1]
         func = mc.collection.Func(parent, name, cur=cur)
         mc.collection.Declares(func, code="")
-        returns = mc.collection.Returns(func, code=self.code[start:end+1])
+        returns = mc.collection.Returns(func, span=(start, end+1))
 
         # multi-return
         if self.code[start] == "[":
@@ -217,7 +218,7 @@ Example:
                         self.syntaxerror(s, "return value")
 
                     mc.collection.Var(returns, self.code[s:e+1], cur=s,
-                            code=self.code[s:e+1])
+                            span=(s, e+1))
 
         # single return
         else:
@@ -228,7 +229,7 @@ Example:
                 print repr(self.code[start:end+1])
 
             mc.collection.Var(returns, self.code[start:end+1], cur=start,
-                    code=self.code[start:end+1])
+                    span=(start, end+1))
 
 
         cur = l+1
@@ -266,7 +267,7 @@ Example:
     if self.code[cur] == "(":
 
         end = findend.paren(self, cur)
-        params.code = self.code[cur+1:end]
+        params.span = (cur+1, end)
 
         L = iterate.comma_list(self, cur)
         for array in L:
@@ -278,7 +279,7 @@ Example:
                     print repr(self.code[s:e+1])
 
                 var = mc.collection.Var(params, self.code[s:e+1], cur=s,
-                        code=self.code[s:e+1])
+                        span=(s, e+1))
 
         cur = end
 
@@ -291,7 +292,7 @@ Example:
         var.create_declare()
 
     end = cur
-    func.code = self.code[START:end+1]
+    func.span = (START, end+1)
 
     mc.collection.Header(func.program[4], func.name)
 
@@ -435,7 +436,7 @@ Example:
         k += 1
 
     end = self.create_lambda_func(assign, k)
-    assign.code = self.code[cur:end+1]
+    assign.span = (cur, end+1)
 
     return end
 
@@ -482,13 +483,13 @@ Returns:
 
     funcs = node.program[1]
     name = "_%s" % (name)
-    if name in funcs.names:
+    if name in funcs:
         i = 0
-        while name+"%d" % i in funcs.names:
+        while name+"%d" % i in funcs:
             i += 1
         name = name + "%d" % i
 
-    func = mc.collection.Func(funcs, name, cur=cur, code=self.code[cur:end+1])
+    func = mc.collection.Func(funcs, name, cur=cur, span=(cur, end+1))
 
     declares = mc.collection.Declares(func)
     returns = mc.collection.Returns(func)
@@ -515,7 +516,7 @@ Returns:
 
     for n in assign[1].flatten():
         if (n.cls in ("Get", "Cget", "Var", "Fvar", "Fget",
-            "Sget")) and n.name in node.func[0].names + node.func[2].names:
+            "Sget")) and (n.name in node.func[0] or n.name in node.func[2]):
 
             n.create_declare()
 
@@ -0,0 +1,338 @@
+"""
+Single pass tokenization of Matlab code.
+
++-------------------------------------------------+---------------------------+
+| Function                                        | Description               |
++=================================================+===========================+
+| :py:func:`~matlab2cpp.tree.lexer.tokenize`      | Create token stream from  |
+|                                                 | code                      |
++-------------------------------------------------+---------------------------+
+| :py:class:`~matlab2cpp.tree.lexer.Lines`        | Newline offset table      |
++-------------------------------------------------+---------------------------+
+| :py:func:`~matlab2cpp.tree.lexer.block_comment` | Find end of block comment |
++-------------------------------------------------+---------------------------+
+
+The token stream is created once in :py:func:`~matlab2cpp.Builder.load` and
+stored as `builder.tokens`. It is used by
+:py:func:`~matlab2cpp.tree.expression.create` to split expressions without
+rescanning the code for every operator.
+
+Each token is one of the following kinds:
+
++------------+------------------------------------------------+
+| Kind       | Description                                    |
++============+================================================+
+| ``name``   | Variable, function or keyword name             |
++------------+------------------------------------------------+
+| ``number`` | Integer, float or imaginary number             |
++------------+------------------------------------------------+
+| ``string`` | String including quotes                        |
++------------+------------------------------------------------+
+| ``op``     | Infix and prefix operators                     |
++------------+------------------------------------------------+
+| ``post``   | Postfix transpose operators                    |
++------------+------------------------------------------------+
+| ``open``   | Opening parenthesis, bracket or curly brace    |
++------------+------------------------------------------------+
+| ``close``  | Closing parenthesis, bracket or curly brace    |
++------------+------------------------------------------------+
+| ``other``  | Anything else (field dots, ``@``, ``,``, ...)  |
++------------+------------------------------------------------+
+
+Comments, whitespace and ellipsis continuations are not part of the stream.
+
+The newline offsets are also collected once per program in
+:py:class:`~matlab2cpp.tree.lexer.Lines`, stored as `builder.lines` and
+`program.lines`. It is used to resolve line numbers and line boundaries
+without scanning the code.
+"""
+
+import re
+from bisect import bisect_left
+
+import constants as c
+
+pattern = re.compile(r"""
+    (?P<space>[ \t\r\n]+)
+  | (?P<dots>\.\.\.[^\n]*)
+  | (?P<comment>%[^\n]*)
+  | (?P<number>(?:\d+(?:\.(?!\.\.|[*/\\^'])\d*)?|\.\d+)(?:[eEdD][+-]?\d*)?[ij]?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<post>\.')
+  | (?P<op>\|\||&&|==|~=|<=|>=|\.\*|\./|\.\\|\.\^|[|&<>+\-*/\\^:~])
+  | (?P<open>[(\[{])
+  | (?P<close>[)\]}])
+  | (?P<quote>')
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+pairs = {")": "(", "]": "[", "}": "{"}
+
+# closing line of a block comment
+closing = re.compile(r"\n[ \t]*%(\})[ \t]*\r?(?=\n|$)")
+
+
+class Tokens(object):
+    """
+Token stream of a piece of Matlab code.
+
+Attributes:
+    kinds (list): The kind of each token (see module description)
+    starts (list): Index to first character of each token
+    ends (list): Index to last character of each token
+    match (list): For ``open`` and ``close`` tokens, the index of the matching
+        token. -1 if no match or not a parenthesis.
+    index (dict): Token index for each position where a token starts.
+    closing (dict): For each position of an opening delimiter or string start,
+        the position of the matching closing delimiter or string end. Brackets
+        that are not well-formed (comment inside parenthesis or cell, or
+        unterminated string) are left out.
+    """
+
+    def __init__(self):
+        self.kinds = []
+        self.starts = []
+        self.ends = []
+        self.match = []
+        self.index = {}
+        self.closing = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+
+class Lines(object):
+    """
+Sorted table of newline offsets in a piece of code.
+
+Args:
+    code (str): Matlab code
+
+Attributes:
+    code (str): Matlab code
+    newlines (list): Position of every newline character in code
+
+Example:
+    >>> lines = Lines("a = 1;\\nb = 2;\\n")
+    >>> print lines.newlines
+    [6, 13]
+    >>> print lines.line_of(9), lines.line_span(2)
+    2 (7, 13)
+    >>> print lines.count(0, 14), lines.find(8), lines.rfind(8)
+    2 13 6
+    >>> print Lines("\\na = 1;").rfind(3)
+    0
+    """
+
+    def __init__(self, code):
+        self.code = code
+        self.newlines = [m.start() for m in re.finditer("\n", code)]
+
+    def line_of(self, cur):
+        "Line number (starting at 1) of position `cur`"
+        return bisect_left(self.newlines, cur)+1
+
+    def line_span(self, line):
+        "Position of first character and terminating newline of `line`"
+        newlines = self.newlines
+        start = line > 1 and newlines[line-2]+1 or 0
+        if line <= len(newlines):
+            return start, newlines[line-1]
+        return start, len(self.code)
+
+    def count(self, start, end):
+        "Number of newlines in `code[start:end]`"
+        if end <= start:
+            return 0
+        return bisect_left(self.newlines, end) - bisect_left(self.newlines, start)
+
+    def find(self, cur):
+        "Position of first newline at or after `cur`, or length of code"
+        i = bisect_left(self.newlines, cur)
+        if i == len(self.newlines):
+            return len(self.code)
+        return self.newlines[i]
+
+    def rfind(self, cur):
+        "Position of last newline before `cur`, or -1"
+        i = bisect_left(self.newlines, cur)
+        return self.newlines[i-1] if i else -1
+
+
+def is_string(code, k):
+    """
+Check if quote starts a string or is a transpose operator.
+
+Same rule as :py:func:`~matlab2cpp.tree.identify.string`, but without the need
+of a builder.
+
+Args:
+    code (str): Matlab code
+    k (int): Position of the quote
+
+Returns:
+    bool: True if quote starts a string.
+    """
+
+    if code[k-1] == ".":
+        return False
+
+    j = k-1
+    while code[j] in " \t":
+        j -= 1
+
+    if code[j] in c.letters+c.digits+")]}_":
+        return code[j-3:j+1] == "case"
+
+    return True
+
+
+def block_comment(code, k, stop=None):
+    """
+Find end of block comment. As in Matlab, the ``%{`` and ``%}`` delimiters must
+be alone on their lines, apart from whitespace.
+
+Args:
+    code (str): Matlab code
+    k (int): Position of the comment character
+    stop (int, optional): Position to stop searching (excluding)
+
+Returns:
+    int: Position of the closing brace, or -1 if not a block comment.
+
+Example:
+    >>> print block_comment("%{\\na = 1;\\n  %}\\nb", 0)
+    13
+    >>> print block_comment("a = 1; %{\\nb\\n%}", 7)
+    -1
+    """
+
+    if stop is None:
+        stop = len(code)
+
+    if code[k:k+2] != "%{":
+        return -1
+
+    if code[code.rfind("\n", 0, k)+1:k].strip(" \t"):
+        return -1
+
+    line = code.find("\n", k, stop)
+    if line == -1 or code[k+2:line].strip(" \t\r"):
+        return -1
+
+    m = closing.search(code, line, stop)
+    if m is None:
+        return -1
+    return m.start(1)
+
+
+def tokenize(code, start=0, stop=None):
+    """
+Create token stream from code in a single pass.
+
+Args:
+    code (str): Matlab code
+    start (int): First position to tokenize
+    stop (int, optional): Position to stop tokenizing (excluding)
+
+Returns:
+    Tokens: The token stream
+
+Example:
+    >>> tokens = tokenize("a(1)' + 'b' % c")
+    >>> print tokens.kinds
+    ['name', 'open', 'number', 'close', 'post', 'op', 'string']
+    >>> print tokens.match
+    [-1, 3, -1, 1, -1, -1, -1]
+    >>> print tokens.starts, tokens.ends
+    [0, 1, 2, 3, 4, 6, 8] [0, 1, 2, 3, 4, 6, 10]
+    >>> print sorted(tokens.closing.items())
+    [(1, 3), (8, 10)]
+    >>> print tokenize("f(1 % c\\n)").closing
+    {}
+    >>> print tokenize("a = 'it''s'; %{ c\\nd").kinds
+    ['name', 'other', 'string', 'other', 'name']
+    """
+
+    if stop is None:
+        stop = len(code)
+
+    tokens = Tokens()
+    kinds, starts, ends, match = \
+            tokens.kinds, tokens.starts, tokens.ends, tokens.match
+    closing = tokens.closing
+    stack = []
+    bad = set()
+
+    k = start
+    while k < stop:
+
+        m = pattern.match(code, k, stop)
+        kind = m.lastgroup
+        end = m.end()
+
+        if kind == "comment":
+            block = block_comment(code, k, stop)
+            if block != -1:
+                end = block+1
+
+        if kind in ("space", "dots", "comment"):
+
+            # comments are only allowed in matrices
+            if stack and kind == "comment":
+                bad.update(i for i in stack if code[starts[i]] in "({")
+
+            k = end
+            continue
+
+        if kind == "quote":
+
+            if is_string(code, k):
+                end = code.find("'", k+1, stop)+1
+
+                # doubled quotes are part of the string
+                while end and end < stop and code[end] == "'":
+                    end = code.find("'", end+1, stop)+1
+                newline = code.find("\n", k+1, stop)
+
+                # unterminated string
+                if not end or -1 < newline < end:
+                    kind = "other"
+                    end = k+1
+                    bad.update(stack)
+
+                else:
+                    kind = "string"
+
+            else:
+                kind = "post"
+
+        i = len(kinds)
+        tokens.index[k] = i
+        kinds.append(kind)
+        starts.append(k)
+        ends.append(end-1)
+        match.append(-1)
+
+        if kind == "open":
+            stack.append(i)
+
+        elif kind == "string":
+            closing[k] = end-1
+
+        elif kind == "close":
+            if stack and code[starts[stack[-1]]] == pairs[code[k]]:
+                j = stack.pop()
+                if j not in bad:
+                    match[i] = j
+                    match[j] = i
+                    closing[starts[j]] = k
+
+        k = end
+
+    return tokens
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
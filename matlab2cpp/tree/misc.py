@@ -10,6 +10,7 @@ import findend
 import expression
 import iterate
 import identify
+import lexer
 
 
 def number(self, node, start):
@@ -80,7 +81,7 @@ Example:
 
             k += 1
             node = mc.collection.Imag(node, number, cur=start,
-                    code=self.code[start:last+1])
+                    span=(start, last+1))
             if self.disp:
                 print "%4d     Imag       " % (start),
                 print "%-20s" % "misc.number",
@@ -88,7 +89,7 @@ Example:
 
         else:
             node = mc.collection.Float(node, number, cur=start,
-                    code=self.code[start:last+1])
+                    span=(start, last+1))
             if self.disp:
                 print "%4d     Float      " % (start),
                 print "%-20s" % "misc.number",
@@ -101,7 +102,7 @@ Example:
         if self.code[k] in "ij":
 
             node = mc.collection.Imag(node, self.code[start:k], cur=start,
-                    code=self.code[start:last+1])
+                    span=(start, last+1))
             k += 1
             if self.disp:
                 print "%4d     Imag       " % (start),
@@ -110,7 +111,7 @@ Example:
 
         else:
             node = mc.collection.Int(node, self.code[start:k], cur=start,
-                    code=self.code[start:last+1])
+                    span=(start, last+1))
             if self.disp:
                 print "%4d     Int        " % (start),
                 print "%-20s" % "misc.number",
@@ -121,7 +122,7 @@ Example:
         if self.code[k] in "ij":
 
             node = mc.collection.Imag(node, self.code[start:k], cur=start,
-                    code=self.code[start:last+1])
+                    span=(start, last+1))
             k += 1
             if self.disp:
                 print "%4d     Imag       " % (start),
@@ -130,7 +131,7 @@ Example:
 
         else:
             node = mc.collection.Float(node, self.code[start:k], cur=start,
-                    code=self.code[start:k])
+                    span=(start, k))
             if self.disp:
                 print "%4d     Float      " % (start),
                 print "%-20s" % "misc.number",
@@ -172,8 +173,8 @@ Example:
     if  "\n" in self.code[cur:end]:
         self.syntaxerror(cur, "no line-feed character in string")
 
-    mc.collection.String(parent, self.code[cur+1:end], cur=cur,
-            code=self.code[cur:end+1])
+    mc.collection.String(parent, self.code[cur+1:end].replace("''", "'"),
+            cur=cur, span=(cur, end+1))
 
     if self.disp:
         print "%4d     String " % cur,
@@ -304,7 +305,7 @@ Example:
         print "%-20s" % "misc.comment",
         print repr(self.code[cur:end])
 
-    if self.code[cur+1] == "{":
+    if lexer.block_comment(self.code, cur) != -1:
         comment = mc.collection.Bcomment(parent, self.code[cur+2:end-1], cur=cur)
     else:
         k = cur-1
@@ -315,7 +316,7 @@ Example:
         else:
             comment = mc.collection.Ecomment(parent, self.code[cur+1:end], cur=cur)
 
-    comment.code = self.code[cur:end+1]
+    comment.span = (cur, end+1)
 
     return end
 
@@ -345,7 +346,7 @@ Returns:
     name = keys[1]
     value = "\n".join(keys[2:])
     verbatim = mc.collection.Verbatim(parent, name, value, cur=cur,
-            code=self.code[cur:end+1])
+            span=(cur, end+1))
 
     return end    
     
@@ -415,7 +416,7 @@ Example:
         L = iterate.space_list(self, cur)
     else:
         L = iterate.comma_list(self, cur)
-    matrix = mc.collection.Matrix(node, cur=cur, code=self.code[cur:end+1])
+    matrix = mc.collection.Matrix(node, cur=cur, span=(cur, end+1))
 
     for array in L:
 
@@ -426,7 +427,7 @@ Example:
             start = cur
 
         vector = mc.collection.Vector(matrix, cur=start,
-                code=self.code[start:end+1])
+                span=(start, end+1))
 
         if self.disp:
             print "%4d     Vector     " % (start),
@@ -497,7 +498,7 @@ Example:
         L = iterate.space_list(self, cur)
     else:
         L = iterate.comma_list(self, cur)
-    cell = mc.collection.Cell(node, cur=cur, code=self.code[cur:end+1])
+    cell = mc.collection.Cell(node, cur=cur, span=(cur, end+1))
 
     for array in L:
 
@@ -526,7 +527,7 @@ def reserved(self, node, start):
     if self.code[k:k+4] == "hold":
 
         statement = mc.collection.Statement(node, cur=start,
-                                            code=self.code[start:newline])
+                                            span=(start, newline))
         
         l = k+4
         while self.code[l] in " \t":
@@ -558,7 +559,7 @@ def reserved(self, node, start):
     if self.code[k:k+4] == "grid":
 
         statement = mc.collection.Statement(node, cur=start,
-                                            code=self.code[k:newline])
+                                            span=(k, newline))
         
         l = k+4
         while self.code[l] in " \t":
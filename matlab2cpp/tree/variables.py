@@ -66,7 +66,7 @@ Example:
 
             end = findend.paren(self, end)
             node = mc.collection.Cset(node, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             if self.disp:
                 print "%4d     Cset       " % cur,
@@ -96,7 +96,7 @@ Example:
         else:
             end = findend.cell(self, k)
             node = mc.collection.Cvar(node, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             if self.disp:
                 print "%4d     Cvar       " % cur,
@@ -132,7 +132,7 @@ Example:
                 print repr(self.code[cur:end])
 
             node = mc.collection.Sset(node, name, value, cur=cur,
-                    code=self.code[cur:end], pointer=1)
+                    span=(cur, end), pointer=1)
 
             last = self.create_list(node, k)
             cur = end-1
@@ -146,7 +146,7 @@ Example:
                 print repr(self.code[cur:end+1])
 
             node = mc.collection.Set(node, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             last = self.create_list(node, k)
             cur = last
@@ -173,7 +173,7 @@ Example:
 
             node = mc.collection.Nset(node, name)
             node.cur = cur
-            node.code = self.code[cur:end+1]
+            node.span = (cur, end+1)
 
             cur = self.create_expression(node, cur)
 
@@ -200,7 +200,7 @@ Example:
                     print repr(self.code[cur:end+1])
 
                 node = mc.collection.Fset(node, name, value=value, cur=cur,
-                        code=self.code[cur:end+1])
+                        span=(cur, end+1))
 
                 cur = self.create_list(node, j)
 
@@ -213,7 +213,7 @@ Example:
                     print repr(self.code[cur:last+1])
 
                 node = mc.collection.Fvar(node, name, value=value, cur=cur,
-                        code=self.code[cur:last+1])
+                        span=(cur, last+1))
 
                 cur = last
 
@@ -226,7 +226,7 @@ Example:
 
 
         node = mc.collection.Var(node, name, cur=cur,
-                code=self.code[cur:last])
+                span=(cur, last))
 
         cur = last-1
 
@@ -295,7 +295,7 @@ Example:
 
             end = findend.paren(self, end)
             node = mc.collection.Cget(parent, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             if self.disp:
                 print "%4d     Cget       " % cur,
@@ -325,7 +325,7 @@ Example:
         else:
             end = findend.cell(self, k)
             node = mc.collection.Cvar(parent, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             if self.disp:
                 print "%4d     Cvar       " % cur,
@@ -361,7 +361,7 @@ Example:
                 print repr(self.code[cur:end])
 
             node = mc.collection.Sget(parent, name, value, cur=cur,
-                    code=self.code[cur:end], pointer=1)
+                    span=(cur, end), pointer=1)
 
             last = self.create_list(node, k)
             cur = end
@@ -375,7 +375,7 @@ Example:
                 print repr(self.code[cur:end+1])
 
             node = mc.collection.Get(parent, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             last = self.create_list(node, k)
             cur = last
@@ -402,7 +402,7 @@ Example:
                 k += 1
 
             node = mc.collection.Nget(parent, name, cur=cur,
-                    code=self.code[cur:end+1])
+                    span=(cur, end+1))
 
             cur = self.create_expression(node, k)
 
@@ -430,7 +430,7 @@ Example:
 
 
                 node = mc.collection.Fget(parent, name, cur=cur,
-                        value=value, code=self.code[cur:end+1])
+                        value=value, span=(cur, end+1))
 
                 j += 1
                 while self.code[j] in " \t":
@@ -449,7 +449,7 @@ Example:
                     print repr(self.code[cur:last])
 
                 node = mc.collection.Fvar(parent, name, value=value,
-                        cur=cur, code=self.code[cur:last])
+                        cur=cur, span=(cur, last))
 
                 cur = last-1
 
@@ -465,7 +465,7 @@ Example:
             print repr(self.code[cur:last])
 
         node = mc.collection.Var(parent, name, cur=cur,
-                code=self.code[cur:last])
+                span=(cur, last))
 
         cur = last-1
 
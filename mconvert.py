@@ -16,7 +16,7 @@ header information will be stored in a `.py` file. Any errors will be stored in
 `.log`.
 """))
 
-parser.add_argument("filename",
+parser.add_argument("filename", nargs="?",
         help="File containing valid Matlab code.").completer=\
                 lambda prefix, **kws: glob("*.m")
 
@@ -61,6 +61,58 @@ parser.add_argument("-o", '--original', action="store_true",
         help="Include original matlab code line as comment before C++ translation")
 parser.add_argument("-n", '--nargin', action="store_true",
         help="Remove if and switch braches which use nargin variable")
+parser.add_argument("-j", '--jobs', type=int, default=1,
+        help="""\
+Number of processes used for loading the file and its dependencies, and for
+translating them.""")
+parser.add_argument("-I", '--path', action="append", metavar="DIR",
+        help="""\
+Directory to search for called functions, after the directory of the file.
+Can be given multiple times, and is searched in order, like Matlab `addpath`.
+Package directories (`+name`) and private directories are included.""")
+parser.add_argument('--cache-dir', dest="cache_dir",
+        help="""\
+Directory for caching parsed programs between runs. Unchanged files are loaded
+from the cache instead of being parsed again.""")
+parser.add_argument('--no-cache', action="store_true",
+        help="Do not use the cache, even if `--cache-dir` is given.")
+parser.add_argument('--incremental', action="store_true",
+        help="""\
+Only convert files where the Matlab code, the supplement file or the datatypes
+of called functions changed since last run, as recorded in
+`<filename>.manifest`. Output files with unchanged content are not rewritten.""")
+parser.add_argument('--summaries', metavar="FILE",
+        help="""\
+Store the datatypes of each function in `FILE` after configuration, and use
+them for functions whose code, supplement file and callees are unchanged, and
+that are called with the same datatypes. Can be shared between projects.""")
+parser.add_argument('--deterministic', action="store_true",
+        help="""\
+Leave out the time stamp from the header of the output files.""")
+parser.add_argument('--configure-limit', type=int, metavar="N",
+        help="""\
+Stop configuring datatypes after `N` passes over the code, in each round and
+for each group of functions calling each other. Variables whose datatype still
+changed in the last pass are reported as warnings in `<filename>.log`.""")
+parser.add_argument('--stats', action="store_true",
+        help="""\
+Print time and calls spent in each phase of the conversion, per program and in
+the most expensive rules.""")
+parser.add_argument('--profile', metavar="FILE",
+        help="""\
+Write the same numbers as `--stats` as JSON to `FILE`.""")
+parser.add_argument('--server', action="store_true",
+        help="""\
+Keep running and answer conversion requests, one JSON object per line, on
+stdin/stdout. Loaded files are kept in memory, and only changed files are
+loaded and translated again. See `matlab2cpp.server` for the protocol.""")
+parser.add_argument('--port', type=int,
+        help="""\
+With `--server`, answer requests on this port on localhost instead of
+stdin/stdout.""")
+parser.add_argument('--poll', type=float, default=1.,
+        help="""\
+With `--server`, seconds between checks for changed files.""")
 
 
 try:
@@ -73,5 +125,13 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
     import matlab2cpp
-    matlab2cpp.main(args)
+
+    if args.server and args.port:
+        matlab2cpp.server.listen(args.port, args.poll)
+    elif args.server:
+        matlab2cpp.server.serve(interval=args.poll)
+    elif args.filename is None:
+        parser.error("too few arguments")
+    else:
+        matlab2cpp.main(args)
 